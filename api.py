@@ -0,0 +1,284 @@
+"""
+Streamlit arayüzünün yanında çalışan hafif, asenkron HTTP API.
+
+Streamlit her etkileşimde tüm betiği yeniden çalıştırıp bütün sorguları yeniden yüklediği için
+eşzamanlı istemciler ve yük testleri bu servisi kullanır. Uç noktalar core_logic fonksiyonlarının
+ince sarmalayıcılarıdır; cevap güncellemeleri ('answer_updated') ve işleme hataları ('query_failed')
+answer_events üzerinden SSE veya WebSocket ile akar.
+
+    POST   /queries                      {"text": "...", "wait": false} -> sorgu oluştur
+    POST   /queries/stream               {"text": "..."} -> cevabı üretilirken SSE ile akıt (plan, yer tutucular, final)
+    GET    /queries/{id}                 güncel cevap, sürümü ve durumu (ready/pending/failed)
+    PUT    /queries/{id}                 {"text": "..."} -> metni değiştir ve yeniden işle
+    POST   /queries/{id}/subscription    cevap güncellemelerine abone ol
+    DELETE /queries/{id}/subscription    aboneliği bırak
+    GET    /events?query_id=1&query_id=2 SSE akışı (query_id verilmezse tüm güncellemeler)
+    GET    /queries/{id}/events          tek sorgu için SSE akışı
+    WS     /ws                           {"action": "watch"|"unwatch"|"watch_all", "query_ids": [...]}
+    GET    /health                       akış istemcisi sayısı ve bağlantı havuzu istatistikleri
+
+Kullanım:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from src import config
+from src.logger_config import setup_logging
+from src.core_logic import astream_new_query, handle_new_query, update_query_text, update_user_query_subscription
+from src.answer_monitor import answer_monitor
+from src.answer_events import answer_events
+from src.database import pool_stats
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+class AnswerEventHub:
+    """
+    Süreç başına tek bir answer_events aboneliğini asyncio istemci kuyruklarına dağıtır. Açık
+    SSE/WebSocket bağlantısı sayısından bağımsız olarak olayları tek bir iş parçacığı bekler.
+    """
+
+    def __init__(self, max_queued: int):
+        self.max_queued = max_queued
+        # İstemci kuyruğu -> izlenen sorgu ID'leri (None = tüm sorgular)
+        self._clients: Dict[asyncio.Queue, Optional[set]] = {}
+        self._subscription = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._subscription = answer_events.subscribe(max_queued=self.max_queued * 4)
+        self._task = asyncio.create_task(self._pump())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._subscription:
+            self._subscription.close()
+
+    async def _pump(self):
+        while True:
+            if self._subscription.closed:
+                # Bus aboneliği düşürdüyse yeniden abone ol; aradaki olaylar kaçmış olabilir
+                self._subscription = answer_events.subscribe(max_queued=self.max_queued * 4)
+                self._fanout({"type": "resync"})
+            event = await asyncio.to_thread(self._subscription.get, 1.0)
+            if event is None:
+                continue
+            for pending in [event] + self._subscription.drain():
+                self._fanout(pending)
+
+    def _fanout(self, event: dict):
+        for queue, query_ids in list(self._clients.items()):
+            if query_ids is None or event.get("query_id") in query_ids or event.get("type") == "resync":
+                self.offer(queue, event)
+
+    def offer(self, queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Yavaş istemci: biriken olaylar atılır, istemci tam yenileme yapmalı
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def connect(self, query_ids: Optional[Iterable[int]]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queued)
+        self._clients[queue] = set(query_ids) if query_ids is not None else None
+        return queue
+
+    def watch(self, queue: asyncio.Queue, query_ids: Optional[Iterable[int]]):
+        if query_ids is None:
+            self._clients[queue] = None
+        elif self._clients.get(queue) is not None:
+            self._clients[queue].update(query_ids)
+
+    def unwatch(self, queue: asyncio.Queue, query_ids: Iterable[int]):
+        if self._clients.get(queue) is not None:
+            self._clients[queue].difference_update(query_ids)
+
+    def disconnect(self, queue: asyncio.Queue):
+        self._clients.pop(queue, None)
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+# Singleton instance
+event_hub = AnswerEventHub(config.API_EVENT_QUEUE_SIZE)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    event_hub.start()
+    yield
+    await event_hub.stop()
+
+app = FastAPI(title="Reactive Answer API", lifespan=lifespan)
+
+class QueryRequest(BaseModel):
+    text: str = Field(min_length=1)
+    wait: bool = False
+
+def _get_answer(query_id: int) -> dict:
+    answer = answer_monitor.get_answers([query_id]).get(query_id)
+    if answer is None:
+        raise HTTPException(status_code=404, detail=f"Query {query_id} not found.")
+    return answer
+
+async def _snapshot_events(query_ids: List[int]) -> List[dict]:
+    """
+    Akış başında izlenen sorguların mevcut sürümleri ve başarısız işlemeleri; abonelikten
+    önceki güncellemeler kaçmaz.
+    """
+    answers = await run_in_threadpool(answer_monitor.get_answers, query_ids)
+    events = []
+    for answer in answers.values():
+        if answer["status"] == "failed":
+            events.append({"type": "query_failed", "query_id": answer["query_id"], "error": answer["error"]})
+        elif answer["version"] is not None:
+            events.append({"type": "answer_updated", "query_id": answer["query_id"], "version": answer["version"],
+                           "updated_at": answer["last_updated"].isoformat()})
+    return events
+
+# Bloklayan core_logic çağrıları senkron uç noktalarda kalır; FastAPI bunları thread havuzunda çalıştırır
+@app.post("/queries", status_code=202)
+def submit_query(request: QueryRequest):
+    query_id = handle_new_query(query_text=request.text, wait=request.wait)
+    if query_id is None:
+        raise HTTPException(status_code=500, detail="Query could not be processed.")
+    return _get_answer(query_id) if request.wait else {"query_id": query_id, "status": "pending"}
+
+@app.post("/queries/stream")
+async def stream_query(request: QueryRequest):
+    async def body():
+        async for event in astream_new_query(request.text):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/queries/{query_id}")
+def get_query_answer(query_id: int):
+    return _get_answer(query_id)
+
+@app.put("/queries/{query_id}", status_code=202)
+def update_query(query_id: int, request: QueryRequest):
+    if update_query_text(query_id, request.text, wait=request.wait) is None:
+        _get_answer(query_id)
+        raise HTTPException(status_code=500, detail="Query could not be updated.")
+    return _get_answer(query_id) if request.wait else {"query_id": query_id, "status": "pending"}
+
+@app.post("/queries/{query_id}/subscription")
+def subscribe_query(query_id: int):
+    if not update_user_query_subscription(query_id=query_id, subscribe=True):
+        raise HTTPException(status_code=404, detail=f"Query {query_id} not found.")
+    return {"query_id": query_id, "is_subscribed": True}
+
+@app.delete("/queries/{query_id}/subscription")
+def unsubscribe_query(query_id: int):
+    if not update_user_query_subscription(query_id=query_id, subscribe=False):
+        raise HTTPException(status_code=404, detail=f"Query {query_id} not found.")
+    return {"query_id": query_id, "is_subscribed": False}
+
+def _format_sse(event: dict) -> str:
+    event_id = f"id: {event['version']}\n" if event.get("version") is not None else ""
+    return f"event: {event['type']}\n{event_id}data: {json.dumps(event)}\n\n"
+
+def _event_stream(query_ids: Optional[List[int]]) -> StreamingResponse:
+    queue = event_hub.connect(query_ids)
+
+    async def body():
+        try:
+            if query_ids:
+                for event in await _snapshot_events(query_ids):
+                    yield _format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), config.API_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Proxy'lerin boşta bağlantıyı kapatmaması için SSE yorum satırı
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format_sse(event)
+        finally:
+            event_hub.disconnect(queue)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/events")
+async def stream_events(query_id: Optional[List[int]] = Query(None)):
+    return _event_stream(query_id)
+
+@app.get("/queries/{query_id}/events")
+async def stream_query_events(query_id: int):
+    return _event_stream([query_id])
+
+@app.websocket("/ws")
+async def websocket_events(websocket: WebSocket):
+    await websocket.accept()
+    queue = event_hub.connect([])
+
+    async def receive():
+        # Tüm gönderimler tek noktadan (aşağıdaki döngü) yapılır; cevaplar da kuyruğa yazılır
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action")
+            try:
+                query_ids = [int(query_id) for query_id in message.get("query_ids", [])]
+            except (TypeError, ValueError):
+                event_hub.offer(queue, {"type": "error", "detail": "query_ids must be a list of integers."})
+                continue
+            if action == "watch":
+                event_hub.watch(queue, query_ids)
+                for event in await _snapshot_events(query_ids):
+                    event_hub.offer(queue, event)
+            elif action == "watch_all":
+                event_hub.watch(queue, None)
+            elif action == "unwatch":
+                event_hub.unwatch(queue, query_ids)
+            else:
+                event_hub.offer(queue, {"type": "error", "detail": f"Unknown action '{action}'."})
+
+    receiver = asyncio.create_task(receive())
+    getter: Optional[asyncio.Future] = None
+    try:
+        while True:
+            getter = getter or asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, timeout=config.API_STREAM_KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                break
+            if getter in done:
+                event, getter = getter.result(), None
+            else:
+                event = {"type": "keepalive"}
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (getter, receiver):
+            if task is not None and not task.done():
+                task.cancel()
+        if receiver.done() and not receiver.cancelled():
+            error = receiver.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.error(f"WebSocket receive loop failed: {error}")
+        event_hub.disconnect(queue)
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "stream_clients": event_hub.client_count(), "db_pool": pool_stats()}
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT)
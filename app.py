@@ -2,18 +2,22 @@ import streamlit as st
 import sys
 import os
 import json
-from datetime import datetime, timezone
 import logging
+from datetime import datetime
 
 # Proje kök dizinini Python path'ine ekle
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-from logger_config import setup_logging
+# Modüller diğer giriş noktaları gibi 'src.' ile import edilir; aksi halde aynı modül iki kez yüklenir ve
+# süreçte ikinci bir engine/bağlantı havuzu ile ikinci bir olay yayıncısı oluşur
+from src.logger_config import setup_logging
 # 'refulfill_answer' import'u kaldırıldı
-from core_logic import handle_new_query, update_user_query_subscription, update_query_text
-from database import get_db, UserQuery, Prediction, TemplatePredictionsLink
-from answer_monitor import answer_monitor
-from sqlalchemy.orm import joinedload
+from src.core_logic import handle_new_query, stream_new_query, update_user_query_subscription, update_query_text
+from src.database import session_scope, UserQuery, Prediction, TemplatePredictionsLink
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from src import config
+from src.answer_events import answer_events
 
 # Loglama ve sayfa ayarları
 setup_logging()
@@ -27,28 +31,170 @@ if 'editing_query_id' not in st.session_state:
     st.session_state.editing_query_id = None
 if 'query_input_value' not in st.session_state:
     st.session_state.query_input_value = ""
-if 'last_answer_check_time' not in st.session_state:
-    st.session_state.last_answer_check_time = datetime.min.replace(tzinfo=timezone.utc)
-
-def get_all_user_queries_with_details():
-    """Tüm kullanıcı sorgularını ve ilgili tüm detayları verimli bir şekilde getirir."""
-    db = next(get_db())
-    try:
-        queries = db.query(UserQuery).options(
-            joinedload(UserQuery.predictions).joinedload(TemplatePredictionsLink.prediction)
-        ).order_by(UserQuery.created_at.desc()).all()
-        return queries
-    finally:
-        db.close()
+if 'pending_toast' not in st.session_state:
+    st.session_state.pending_toast = None
+if 'query_revisions' not in st.session_state:
+    # Bu oturumun olaylarla öğrendiği cevap durumları: sorgu ID -> {"version", "updated_at"} veya {"failed"}
+    st.session_state.query_revisions = {}
+if 'page_cursors' not in st.session_state:
+    # Ziyaret edilen sayfaların başlangıç imleçleri (None = ilk sayfa); geri gitmek için yığın olarak tutulur
+    st.session_state.page_cursors = [None]
+
+QUERY_TEXT_PREFIX_LENGTH = 70
+
+@st.cache_data(ttl=config.QUERY_LIST_CACHE_TTL_SECONDS, show_spinner=False)
+def get_query_page(before_id: int | None, page_size: int) -> tuple[list[dict], int | None]:
+    """
+    Sorgu listesinin bir sayfasını keyset sayfalama ile (ID'ye göre azalan) getirir. Sadece liste
+    için gereken hafif alanlar seçilir; bağlantılar ve prediction değerleri yüklenmez.
+    Dönen ikinci değer bir sonraki sayfanın imlecidir (son sayfada None).
+    """
+    with session_scope() as db:
+        query = db.query(
+            UserQuery.id,
+            func.substr(UserQuery.query_text, 1, QUERY_TEXT_PREFIX_LENGTH).label("text_prefix"),
+            UserQuery.answer_last_updated,
+            UserQuery.is_subscribed,
+            UserQuery.final_answer.isnot(None).label("has_answer"),
+            UserQuery.processing_error.isnot(None).label("failed"),
+        )
+        if before_id is not None:
+            query = query.filter(UserQuery.id < before_id)
+        rows = [dict(row._mapping) for row in query.order_by(UserQuery.id.desc()).limit(page_size + 1).all()]
+    next_cursor = rows[page_size - 1]["id"] if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+@st.cache_data(ttl=config.QUERY_LIST_CACHE_TTL_SECONDS, show_spinner=False)
+def get_query_details(query_id: int, revision: str | None = None) -> dict | None:
+    """
+    Sadece açılan sorgunun tüm detaylarını (bağlı prediction'lar dahil) getirir. `revision`
+    yalnızca önbellek anahtarıdır: cevap güncellendiğinde yeni revizyonla yeniden yüklenir,
+    diğer sorguların ve oturumların önbellek kayıtları silinmez.
+    """
+    with session_scope() as db:
+        query = db.query(UserQuery).options(
+            selectinload(UserQuery.predictions).joinedload(TemplatePredictionsLink.prediction)
+        ).filter(UserQuery.id == query_id).first()
+        if query is None:
+            return None
+        return {
+            "id": query.id,
+            "query_text": query.query_text,
+            "created_at": query.created_at,
+            "answer_last_updated": query.answer_last_updated,
+            "final_answer": query.final_answer,
+            "processing_error": query.processing_error,
+            "is_subscribed": query.is_subscribed,
+            "answer_template_text": query.answer_template_text,
+            "predictions": [{
+                "placeholder_name": link.placeholder_name,
+                "id": link.prediction.id,
+                "prompt": link.prediction.prediction_prompt,
+                "value": link.prediction.predicted_value,
+            } for link in query.predictions],
+        }
+
+def invalidate_query_caches():
+    """Sorgu listesi ve detay önbelleklerini temizler (yerel değişiklik veya kaçırılmış olaylar sonrası)."""
+    get_query_page.clear()
+    get_query_details.clear()
+
+def query_revision(query_id: int) -> str | None:
+    """Olaylardan öğrenilen son cevap durumunun önbellek anahtarı."""
+    revision = st.session_state.query_revisions.get(query_id)
+    if revision is None:
+        return None
+    return "failed" if revision.get("failed") else str(revision["version"])
+
+def apply_query_revision(row: dict) -> dict:
+    """Önbellekteki liste satırını, olaylarla öğrenilen daha yeni cevap durumuyla günceller."""
+    revision = st.session_state.query_revisions.get(row["id"])
+    if revision is None:
+        return row
+    if revision.get("failed"):
+        return {**row, "failed": True}
+    return {**row, "answer_last_updated": datetime.fromisoformat(revision["updated_at"]), "has_answer": True, "failed": False}
 
 def update_subscription_and_rerun(query_id: int, subscribe: bool):
     """Abonelik durumunu günceller ve arayüzü yeniler."""
     update_user_query_subscription(query_id=query_id, subscribe=subscribe)
+    invalidate_query_caches()
     st.session_state.current_query_id = query_id
     st.rerun()
 
+def stream_answer_into_page(query_text: str) -> int | None:
+    """Cevabı bu istekte üretir ve bölümleri hazır oldukça sayfada günceller; sorgu ID'sini döndürür."""
+    status = st.status("Sorgu analiz ediliyor...", expanded=True)
+    answer_area = status.empty()
+    sections, query_id = [], None
+    for event in stream_new_query(query_text):
+        if event["type"] == "created":
+            query_id = event["query_id"]
+            continue
+        if event["type"] == "error":
+            status.update(label="Sorgu işlenirken bir hata oluştu.", state="error")
+            st.error(f"Sorgu işlenirken bir hata oluştu: {event['message']}")
+            return None
+        if event["type"] == "final":
+            answer_area.markdown(event["final_answer"])
+            status.update(label="Cevap hazır.", state="complete")
+            return query_id
+        if event["type"] == "plan":
+            sections = event["sections"]
+            status.update(label="Bilgiler toplanıyor...")
+        elif event["type"] == "placeholder":
+            for index, section in event["sections"].items():
+                sections[index] = section
+        answer_area.markdown("\n".join(section if section is not None else "⏳ *...*" for section in sections))
+    return query_id
+
+def select_query(query_id: int):
+    """Detayları yüklenecek (açık) sorguyu seçer."""
+    st.session_state.current_query_id = query_id
+
 # 'refulfill_and_show_toast' fonksiyonu kaldırıldı
 
+def get_answer_subscription(query_ids: set[int] | None = None):
+    """
+    Bu tarayıcı oturumunun cevap güncelleme aboneliği; boşta kalıp düşürüldüyse yenisi açılır.
+    `query_ids` verilirse abonelik yalnızca bu sorguları (görünen sayfa ve açık sorgu) izler.
+    """
+    if query_ids is not None:
+        st.session_state.watched_query_ids = query_ids
+    subscription = st.session_state.get("answer_subscription")
+    if subscription is None or subscription.closed:
+        subscription = answer_events.subscribe()
+        st.session_state.answer_subscription = subscription
+    subscription.set_query_ids(st.session_state.get("watched_query_ids", set()))
+    return subscription
+
+@st.fragment(run_every=config.ANSWER_EVENTS_UI_REFRESH_SECONDS)
+def watch_answer_updates():
+    """
+    Aboneliğin bellekteki kuyruğunu boşaltır; veritabanına dokunmaz. Abonelik yalnızca izlenen
+    sorguların olaylarını getirir; gelen olay o sorgunun revizyonunu ilerletir ve sayfa yenilenir.
+    Ortak önbellekler sadece 'resync' (kaçırılmış olaylar) geldiğinde temizlenir.
+    """
+    events = get_answer_subscription().drain()
+    if not events:
+        return
+    revisions = st.session_state.query_revisions
+    updated_ids, failed_ids = set(), set()
+    for event in events:
+        if event.get("type") == "answer_updated":
+            revisions[event["query_id"]] = {"version": event["version"], "updated_at": event["updated_at"]}
+            updated_ids.add(event["query_id"])
+        elif event.get("type") == "query_failed":
+            revisions[event["query_id"]] = {"failed": True}
+            failed_ids.add(event["query_id"])
+        elif event.get("type") == "resync":
+            invalidate_query_caches()
+    if updated_ids:
+        st.session_state.pending_toast = f"🎉 {len(updated_ids)} adet cevap güncellendi!"
+    elif failed_ids:
+        st.session_state.pending_toast = f"⚠️ {len(failed_ids)} adet sorgu işlenemedi."
+    st.rerun()
+
 # --- Streamlit Arayüzü ---
 st.title("💡 Reaktif Cevap Sistemi")
 st.markdown("Sorular sorun ve sistemin cevapları nasıl oluşturduğunu görün. Yeni belgeler eklendiğinde **cevaplarınızın** reaktif olarak güncellendiğini izleyin!")
@@ -65,13 +211,27 @@ user_query_input = st.text_input(
     placeholder="Örn: İmar hakkı aktarımı ile kamulaştırma arasındaki farklar nelerdir?"
 )
 
+stream_answer = st.checkbox("Cevabı oluşturulurken göster", value=True,
+                            help="Plan hazır olur olmaz paragrafları, ardından her bilgiyi bulundukça gösterir. Kapalıysa sorgu arka planda işlenir.")
+
 if st.button("Sorguyu Gönder", type="primary"):
-    if user_query_input:
-        with st.spinner("Sorgunuz işleniyor ve ilk cevap oluşturuluyor..."):
+    if user_query_input and stream_answer:
+        query_id = stream_answer_into_page(user_query_input)
+        if query_id:
+            invalidate_query_caches()
+            st.session_state.page_cursors = [None]
+            st.session_state.current_query_id = query_id
+            st.session_state.query_input_value = ""
+            st.rerun()
+    elif user_query_input:
+        with st.spinner("Sorgunuz kaydediliyor..."):
             try:
+                # Cevap arka planda oluşturulur; sorgu listede "bekleniyor" olarak görünür
                 query_id = handle_new_query(query_text=user_query_input)
                 if query_id:
-                    st.success(f"Sorgu başarıyla işlendi! ID: {query_id}")
+                    invalidate_query_caches()
+                    st.session_state.page_cursors = [None]
+                    st.success(f"Sorgu kuyruğa alındı! ID: {query_id}. Cevap hazır olduğunda aşağıda görünecek.")
                     st.session_state.current_query_id = query_id
                     st.session_state.query_input_value = ""
                 else:
@@ -88,45 +248,66 @@ st.divider()
 # Geçmiş Sorgular ve Cevaplar
 st.header("Geçmiş Sorularınız ve Cevaplarınız")
 
-if st.button("🔄 Cevap Güncellemelerini Kontrol Et"):
-    with st.spinner("Güncellenen cevaplar kontrol ediliyor..."):
-        updated_answers = answer_monitor.get_updated_answers_since(st.session_state.last_answer_check_time)
-        st.session_state.last_answer_check_time = datetime.now(timezone.utc)
-        if updated_answers:
-            st.toast(f"🎉 {len(updated_answers)} adet cevap güncellendi!", icon="🎉")
-        else:
-            st.toast("Yeni güncellenen cevap bulunamadı.", icon="ℹ️")
-    st.rerun()
+cursor = st.session_state.page_cursors[-1]
+page, next_cursor = get_query_page(cursor, config.QUERY_LIST_PAGE_SIZE)
+page = [apply_query_revision(row) for row in page]
 
-all_queries = get_all_user_queries_with_details()
+# Cevap güncellemeleri elle kontrol edilmez; görünen sorguların olaylarıyla sayfa kendiliğinden yenilenir
+watched_query_ids = {row["id"] for row in page}
+if st.session_state.current_query_id is not None:
+    watched_query_ids.add(st.session_state.current_query_id)
+get_answer_subscription(watched_query_ids)
+watch_answer_updates()
+if st.session_state.pending_toast:
+    st.toast(st.session_state.pending_toast, icon="🎉")
+    st.session_state.pending_toast = None
 
-if not all_queries:
+if not page and cursor is None:
     st.info("Henüz bir sorgu oluşturulmadı.")
 else:
-    for query in all_queries:
-        is_expanded = st.session_state.current_query_id == query.id
-        with st.expander(f"**Sorgu ID: {query.id}** - *'{query.query_text[:70]}...'*", expanded=is_expanded):
-            
+    for row in page:
+        query_id = row["id"]
+        is_expanded = st.session_state.current_query_id == query_id
+        with st.expander(f"**Sorgu ID: {query_id}** - *'{row['text_prefix']}...'*", expanded=is_expanded):
+            # Expander içeriği kapalıyken de çalıştırılır; detaylar bu yüzden sadece seçilen sorgu için yüklenir
+            if not is_expanded:
+                if row["answer_last_updated"]:
+                    st.caption(f"Son Güncelleme: {row['answer_last_updated'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                elif row["failed"]:
+                    st.caption("❌ Cevap oluşturulamadı.")
+                elif not row["has_answer"]:
+                    st.caption("Cevap bekleniyor.")
+                st.button("🔍 Detayları Göster", key=f"open_{query_id}", on_click=select_query, args=(query_id,))
+                continue
+
+            query = get_query_details(query_id, query_revision(query_id))
+            if query is None:
+                st.warning("Sorgu bulunamadı.")
+                continue
+
             # Düzenleme modu aktifse, düzenleme formunu göster
-            if st.session_state.editing_query_id == query.id:
-                st.subheader(f"Sorgu ID: {query.id} Düzenleniyor")
+            if st.session_state.editing_query_id == query_id:
+                st.subheader(f"Sorgu ID: {query_id} Düzenleniyor")
                 new_text = st.text_area(
                     "Sorgu Metni:", 
-                    value=query.query_text, 
-                    key=f"edit_text_{query.id}",
+                    value=query["query_text"], 
+                    key=f"edit_text_{query_id}",
                     height=150
                 )
                 
                 col1, col2, _ = st.columns([1, 1, 6])
                 with col1:
-                    if st.button("💾 Kaydet", key=f"save_{query.id}", type="primary"):
-                        with st.spinner("Sorgu güncelleniyor ve tüm adımlar yeniden çalıştırılıyor..."):
-                            update_query_text(query_id=query.id, new_query_text=new_text)
+                    if st.button("💾 Kaydet", key=f"save_{query_id}", type="primary"):
+                        with st.spinner("Sorgu güncelleniyor ve yeniden işlenmek üzere kuyruğa alınıyor..."):
+                            update_query_text(query_id=query_id, new_query_text=new_text)
+                            invalidate_query_caches()
+                            # Eski cevabın revizyonu yeniden işlenen sorgunun durumunu gizlemesin
+                            st.session_state.query_revisions.pop(query_id, None)
                             st.session_state.editing_query_id = None # Düzenleme modundan çık
-                            st.session_state.current_query_id = query.id # Güncellenen sorgu açık kalsın
+                            st.session_state.current_query_id = query_id # Güncellenen sorgu açık kalsın
                             st.rerun()
                 with col2:
-                    if st.button("❌ İptal", key=f"cancel_{query.id}"):
+                    if st.button("❌ İptal", key=f"cancel_{query_id}"):
                         st.session_state.editing_query_id = None # Düzenleme modundan çık
                         st.rerun()
             else:
@@ -136,52 +317,66 @@ else:
                     # Sütun düzeni "Yeniden Oluştur" butonu olmadan güncellendi
                     col1, col2, col3 = st.columns([6, 2, 2])
                     with col1:
-                        st.write(f"**Sorulma Zamanı:** {query.created_at.strftime('%Y-%m-%d %H:%M')}")
+                        st.write(f"**Sorulma Zamanı:** {query['created_at'].strftime('%Y-%m-%d %H:%M')}")
                     with col2:
-                        if query.is_subscribed:
-                            st.button(f"🔔 Abonelikten Çık", key=f"unsub_{query.id}", on_click=update_subscription_and_rerun, args=(query.id, False), help="Bu sorunun güncellemelerini takip etmeyi bırak.")
+                        if query["is_subscribed"]:
+                            st.button(f"🔔 Abonelikten Çık", key=f"unsub_{query_id}", on_click=update_subscription_and_rerun, args=(query_id, False), help="Bu sorunun güncellemelerini takip etmeyi bırak.")
                         else:
-                            st.button(f"🔕 Abone Ol", key=f"sub_{query.id}", on_click=update_subscription_and_rerun, args=(query.id, True), help="Bu sorunun güncellemelerini takip et.")
+                            st.button(f"🔕 Abone Ol", key=f"sub_{query_id}", on_click=update_subscription_and_rerun, args=(query_id, True), help="Bu sorunun güncellemelerini takip et.")
                     
                     with col3:
-                        if st.button("✏️ Düzenle", key=f"edit_{query.id}", help="Bu sorgunun metnini değiştirerek tamamen yeniden çalıştır."):
-                            st.session_state.editing_query_id = query.id
+                        if st.button("✏️ Düzenle", key=f"edit_{query_id}", help="Bu sorgunun metnini değiştirerek tamamen yeniden çalıştır."):
+                            st.session_state.editing_query_id = query_id
                             st.rerun()
                     
                     st.markdown("#### Cevap")
-                    if query.answer_last_updated:
-                        st.caption(f"Son Güncelleme: {query.answer_last_updated.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                    if query["answer_last_updated"]:
+                        st.caption(f"Son Güncelleme: {query['answer_last_updated'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
                     
-                    if query.final_answer:
-                        status_emoji = '🟢' if query.is_subscribed else '⚪'
-                        st.markdown(f"{status_emoji} {query.final_answer}")
+                    if query["final_answer"]:
+                        status_emoji = '🟢' if query["is_subscribed"] else '⚪'
+                        st.markdown(f"{status_emoji} {query['final_answer']}")
+                    elif query["processing_error"]:
+                        st.error(f"Cevap oluşturulurken bir hata oluştu: {query['processing_error']}")
                     else:
                         st.warning("Cevap henüz oluşturulmadı veya bekleniyor.")
 
                 with tab2:
                     st.markdown("##### Cevap Planı (Render Plan)")
-                    if query.answer_template_text:
+                    if query["answer_template_text"]:
                         try:
                             # answer_template_text veritabanından string olarak gelebilir
-                            plan_data = json.loads(query.answer_template_text) if isinstance(query.answer_template_text, str) else query.answer_template_text
+                            plan_data = json.loads(query["answer_template_text"]) if isinstance(query["answer_template_text"], str) else query["answer_template_text"]
                             st.json(plan_data)
                         except json.JSONDecodeError:
-                            st.code(query.answer_template_text, language="json")
+                            st.code(query["answer_template_text"], language="json")
                     else:
                         st.info("Cevap planı bulunamadı.")
                     
                     st.markdown("##### İlişkili Tahminler (Predictions)")
-                    if not query.predictions:
+                    if not query["predictions"]:
                         st.info("Bu cevabı oluşturan tahmin bulunamadı.")
                     
-                    for link in query.predictions:
-                        pred = link.prediction
-                        st.markdown(f"**➡️ Yer Tutucu:** `{link.placeholder_name}` (Prediction ID: {pred.id})")
-                        st.text(f"Prompt: {pred.prediction_prompt}")
+                    for pred in query["predictions"]:
+                        st.markdown(f"**➡️ Yer Tutucu:** `{pred['placeholder_name']}` (Prediction ID: {pred['id']})")
+                        st.text(f"Prompt: {pred['prompt']}")
                         st.text("Değer:")
                         
-                        pred_value = pred.predicted_value or {}
+                        pred_value = pred["value"] or {}
                         if isinstance(pred_value, dict) and "error" in pred_value:
                             st.error(f"Bu tahmin için bilgi bulunamadı: {pred_value.get('message', 'Bilinmeyen Hata')}")
                         else:
-                            st.json(pred_value)
\ No newline at end of file
+                            st.json(pred_value)
+
+    # Sayfalama: imleçler yığında tutulur, her sayfa tek bir indeks aralığı taramasıdır
+    col_prev, col_page, col_next = st.columns([1, 6, 1])
+    with col_prev:
+        if len(st.session_state.page_cursors) > 1 and st.button("◀ Önceki", key="page_prev"):
+            st.session_state.page_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Sayfa {len(st.session_state.page_cursors)}")
+    with col_next:
+        if next_cursor is not None and st.button("Sonraki ▶", key="page_next"):
+            st.session_state.page_cursors.append(next_cursor)
+            st.rerun()
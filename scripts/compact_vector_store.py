@@ -0,0 +1,24 @@
+import argparse
+import sys
+import os
+import logging
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.logger_config import setup_logging
+from src.vector_store import vector_store
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove duplicate metadata vectors and migrate legacy ids to content-hash ids.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated and deleted.")
+    args = parser.parse_args()
+
+    logger.info("Starting vector store compaction.")
+    report = vector_store.compact_duplicates(dry_run=args.dry_run)
+    for collection_name, stats in report.items():
+        print(f"{collection_name}: {stats['total']} vectors, {stats['unique']} unique, "
+              f"{stats['migrated']} migrated, {stats['deleted']} {'to delete' if args.dry_run else 'deleted'}")
+    logger.info("Vector store compaction finished.")
@@ -0,0 +1,53 @@
+# scripts/index_document_chunks.py
+
+import argparse
+import sys
+import os
+import logging
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.logger_config import setup_logging
+from src.database import get_db, Document
+from src.chunking import chunk_markdown
+from src.processing import create_embeddings
+from src.vector_store import vector_store
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+def index_document_chunks_flow(batch_size: int):
+    """
+    Mevcut dokümanların `raw_markdown_content` gövdelerini parçalara ayırıp 'document_chunks'
+    koleksiyonuna yazar. ID'ler içerikten türetildiği için tekrar çalıştırmak kopya oluşturmaz.
+    """
+    logger.info("Starting document chunk indexing.")
+    db = next(get_db())
+    try:
+        last_id, documents_done, chunks_done = 0, 0, 0
+        while True:
+            documents = db.query(Document).filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+            entries = [
+                (doc.id, doc.source_url, chunk)
+                for doc in documents for chunk in chunk_markdown(doc.raw_markdown_content or "", config.CHUNK_MAX_TOKENS)
+            ]
+            if entries:
+                vector_store.add_document_chunks(entries, create_embeddings([chunk["text"] for _, _, chunk in entries]))
+            last_id = documents[-1].id
+            documents_done += len(documents)
+            chunks_done += len(entries)
+            logger.info(f"Indexed {chunks_done} chunks from {documents_done} documents.")
+        logger.info("Document chunk indexing finished.")
+    except Exception as e:
+        logger.error(f"Error during document chunk indexing: {e}", exc_info=True)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunk and embed the bodies of already ingested documents.")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE, help="Documents embedded per forward pass.")
+    args = parser.parse_args()
+    index_document_chunks_flow(args.batch_size)
@@ -4,7 +4,8 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.logger_config import setup_logging
-from src.core_logic import handle_new_document
+from src.core_logic import handle_new_document, ingest_document_task
+from src.task_queue import task_queue
 import logging
 
 setup_logging()
@@ -13,9 +14,14 @@ logger = logging.getLogger(__name__)
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest a new document into the system.")
     parser.add_argument("--file", type=str, required=True, help="Path to the markdown document.")
-    parser.add_argument("--url", type=str, required=True, help="Source URL of the document.")
+    parser.add_argument("--enqueue", action="store_true", help="Submit the document to the background task queue instead of processing it inline.")
     
     args = parser.parse_args()
     
     logger.info(f"Received request to ingest file: {args.file}")
-    handle_new_document(file_path=args.file, source_url=args.url)
\ No newline at end of file
+    if args.enqueue:
+        ingest_document_task.delay(args.file)
+        # Süreç içi kuyrukta görev bitmeden çıkılmamalı; Celery'de hemen döner
+        task_queue.join()
+    else:
+        handle_new_document(file_path=args.file)
\ No newline at end of file
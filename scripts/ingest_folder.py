@@ -8,8 +8,9 @@ import logging
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src import config
 from src.logger_config import setup_logging
-from src.core_logic import handle_new_document
+from src.ingestion_pipeline import IngestionPipeline
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -49,6 +50,8 @@ def get_files_sorted_by_pub_date(directory: str) -> list[Path]:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest all documents from a folder sorted by publication date.")
     parser.add_argument("--dir", type=str, default="documents", help="Path to the directory containing markdown documents.")
+    parser.add_argument("--workers", type=int, default=config.INGEST_WORKERS, help="Number of concurrent prediction update workers.")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE, help="Number of documents embedded in a single forward pass.")
     args = parser.parse_args()
     
     logger.info(f"Starting ingestion process for directory: '{args.dir}'")
@@ -58,8 +61,8 @@ if __name__ == "__main__":
         logger.info("No documents with valid 'publication_date' found to process.")
     else:
         logger.info(f"Found {len(files_to_process)} documents to process in chronological order.")
-        # SADE VE DOĞRU DÖNGÜ
-        for file_path in files_to_process:
-            handle_new_document(file_path=str(file_path))
+        # Aşamalı pipeline; aynı prediction'a ait güncellemeler kronolojik sırayı korur
+        pipeline = IngestionPipeline(workers=args.workers, batch_size=args.batch_size)
+        pipeline.run(files_to_process)
 
     logger.info("Ingestion process finished.")
\ No newline at end of file
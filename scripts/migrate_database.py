@@ -0,0 +1,33 @@
+import argparse
+import sys
+import os
+import logging
+
+# Proje kök dizinini Python path'ine ekle
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.logger_config import setup_logging
+from src.database import engine
+from src.migrations import MIGRATIONS, applied_versions, run_migrations, rollback_migration, supports_migrations
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or roll back schema migrations (indexes and constraints).")
+    parser.add_argument("--status", action="store_true", help="Only list migrations and whether they are applied.")
+    parser.add_argument("--rollback", metavar="VERSION", help="Roll back the given migration version.")
+    args = parser.parse_args()
+
+    if not supports_migrations(engine):
+        print(f"Schema migrations only apply to PostgreSQL; '{engine.dialect.name}' databases are created by setup_database.py.")
+    elif args.status:
+        done = set(applied_versions(engine))
+        for migration in MIGRATIONS:
+            print(f"[{'x' if migration.version in done else ' '}] {migration.version}: {migration.description}")
+    elif args.rollback:
+        rollback_migration(engine, args.rollback)
+        print(f"Rolled back {args.rollback}.")
+    else:
+        applied = run_migrations(engine)
+        print(f"Applied {len(applied)} migrations: {', '.join(applied)}" if applied else "Database schema is up to date.")
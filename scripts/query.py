@@ -3,11 +3,12 @@ import argparse
 import sys
 import os
 import logging
+import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.logger_config import setup_logging
-from src.core_logic import handle_new_query, update_user_query_subscription
+from src.core_logic import handle_new_query, stream_new_query, update_user_query_subscription
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -35,6 +36,29 @@ def load_last_query_id() -> int | None:
         logger.error(f"Failed to load last query ID: {e}")
         return None
 
+def stream_query(query_text: str) -> int | None:
+    """Cevap bölümlerini hazır oldukça yazdırır; ilk içeriğe kadar geçen süreyi raporlar."""
+    started_at = time.perf_counter()
+    query_id = None
+    for event in stream_new_query(query_text):
+        elapsed = time.perf_counter() - started_at
+        if event["type"] == "created":
+            query_id = event["query_id"]
+        elif event["type"] == "plan":
+            print(f"\n--- CEVAP PLANI ({elapsed:.1f}s, ID: {query_id}) ---")
+            for section in event["sections"]:
+                print(section if section is not None else "[...]")
+        elif event["type"] == "placeholder":
+            print(f"\n--- {event['placeholder']} ({elapsed:.1f}s) ---")
+            for section in event["sections"].values():
+                print(section)
+        elif event["type"] == "final":
+            print(f"\n--- NİHAİ CEVAP ({elapsed:.1f}s, ID: {query_id}) ---\n{event['final_answer']}\n-----------------------\n")
+        elif event["type"] == "error":
+            print(f"Sorgu işlenirken bir hata oluştu: {event['message']}")
+            return None
+    return query_id
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Interact with the Reactive RAG system.")
     
@@ -44,6 +68,7 @@ if __name__ == "__main__":
     # 'query' alt komutu
     query_parser = subparsers.add_parser("query", help="Ask a question to the system.")
     query_parser.add_argument("--text", type=str, required=True, help="The query text.") # --text mecburi
+    query_parser.add_argument("--stream", action="store_true", help="Print the answer section by section as it is produced.")
     
     # 'subscribe' alt komutu
     subscribe_parser = subparsers.add_parser("subscribe", help="Subscribe to updates for a query.")
@@ -58,9 +83,14 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
-    if args.action == "query":
+    if args.action == "query" and args.stream:
+        user_query_id = stream_query(args.text)
+        if user_query_id:
+            save_last_query_id(user_query_id)
+
+    elif args.action == "query":
         logger.info(f"Starting a new query process for: '{args.text}'")
-        user_query_id = handle_new_query(query_text=args.text)
+        user_query_id = handle_new_query(query_text=args.text, wait=True)
         if user_query_id:
             print(f"Sorgu başarıyla işlendi. ID: {user_query_id}")
             save_last_query_id(user_query_id)
@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 def reset_databases():
     """
-    Tüm PostgreSQL tablolarını ve ChromaDB koleksiyonlarını siler ve yeniden oluşturur.
+    Tüm PostgreSQL tablolarını ve vektör deposunu (Chroma koleksiyonları veya pgvector tabloları) siler ve yeniden oluşturur.
     Bu işlem geri alınamaz!
     """
 
@@ -29,33 +29,15 @@ def reset_databases():
         logger.error(f"Failed to reset PostgreSQL database: {e}", exc_info=True)
         print(f"❌ Error during PostgreSQL reset: {e}")
 
-    # --- ChromaDB Resetleme ---
-    # Not: PersistentClient, init sırasında koleksiyon referanslarını alır.
-    # Koleksiyonları sildiğimizde, bu referanslar geçersiz kalabilir.
-    # Bu nedenle, silme ve yeniden oluşturma sonrası referansları güncelleyeceğiz.
+    # --- Vektör Deposu Resetleme ---
+    # Not: reset(), silme sonrası koleksiyon/tablo referanslarını singleton üzerinde de yeniler.
     try:
-        logger.info("Deleting ChromaDB collections...")
-        # Check if collections exist before trying to delete (avoids ValueError if already deleted)
-        if "documents" in vector_store.client.list_collections():
-            vector_store.client.delete_collection(name="documents")
-        if "predictions" in vector_store.client.list_collections():
-            vector_store.client.delete_collection(name="predictions")
-        logger.info("ChromaDB 'documents' and 'predictions' collections deleted.")
-        print("✅ ChromaDB collections have been deleted successfully.")
-    except Exception as e: # Catching generic Exception for robustness
-        logger.warning(f"Error during ChromaDB collection deletion (might not exist): {e}")
-        print(f"ℹ️ Error during ChromaDB collection deletion, possibly collections did not exist: {e}")
-
-    # Koleksiyonları sildikten/boşalttıktan sonra yeniden oluştur ve referansları güncelle
-    try:
-        logger.info("Re-creating ChromaDB collections and updating singleton references...")
-        vector_store.document_collection = vector_store.client.get_or_create_collection(name="documents")
-        vector_store.prediction_collection = vector_store.client.get_or_create_collection(name="predictions")
-        logger.info("ChromaDB 'documents' and 'predictions' collections re-created and references updated.")
-        print("✅ ChromaDB collections have been re-created and references updated successfully.")
+        logger.info(f"Resetting vector store ({type(vector_store).__name__})...")
+        vector_store.reset()
+        print("✅ Vector store has been reset successfully.")
     except Exception as e:
-        logger.error(f"Failed to re-create ChromaDB collections or update references: {e}", exc_info=True)
-        print(f"❌ Error during ChromaDB collection re-creation or reference update: {e}")
+        logger.error(f"Failed to reset vector store: {e}", exc_info=True)
+        print(f"❌ Error during vector store reset: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,237 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src import config
+from src.database import engine
+
+logger = logging.getLogger(__name__)
+
+def answer_version(updated_at: datetime) -> int:
+    """Cevap sürümü: answer_last_updated'in mikro saniye cinsinden zaman damgası (monoton artan)."""
+    return round(updated_at.timestamp() * 1_000_000)
+
+class Subscription:
+    """
+    Bir istemcinin cevap güncelleme olaylarını aldığı sınırlı kuyruk.
+    `query_ids` verilirse yalnızca o sorguların olayları iletilir. Kuyruk doluysa en eski
+    olay atılır; istemci 'resync' olayı veya atılan olay sayısı üzerinden tam yenileme yapabilir.
+    """
+
+    def __init__(self, bus: "LocalAnswerEventBus", query_ids: Optional[Iterable[int]], max_queued: int):
+        self._bus = bus
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queued)
+        self.query_ids = set(query_ids) if query_ids else None
+        self.dropped = 0
+        self.closed = False
+        self.last_read = time.monotonic()
+
+    def _offer(self, event: dict):
+        if self.query_ids is not None and event.get("query_id") not in self.query_ids and event.get("type") != "resync":
+            return
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def set_query_ids(self, query_ids: Optional[Iterable[int]]):
+        """İzlenen sorguları değiştirir; None tüm sorgular, boş küme yalnızca 'resync' demektir."""
+        self.query_ids = set(query_ids) if query_ids is not None else None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Bir sonraki olayı bekler; süre dolarsa None döner."""
+        self.last_read = time.monotonic()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[dict]:
+        """Bekleyen tüm olayları beklemeden döndürür."""
+        self.last_read = time.monotonic()
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def __iter__(self) -> Iterator[dict]:
+        while not self.closed:
+            event = self.get(timeout=1.0)
+            if event is not None:
+                yield event
+
+    def close(self):
+        self.closed = True
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LocalAnswerEventBus:
+    """
+    Süreç içi yayın/abonelik. Olaylar {"type": "answer_updated", "query_id", "version",
+    "updated_at"} sözlükleridir. Uzun süre okunmayan abonelikler (kapatılmamış tarayıcı
+    oturumları) `idle_seconds` sonra otomatik olarak düşürülür.
+    """
+
+    def __init__(self, idle_seconds: float = 600.0):
+        self.idle_seconds = idle_seconds
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, query_ids: Optional[Iterable[int]] = None, max_queued: int = 1000) -> Subscription:
+        subscription = Subscription(self, query_ids, max_queued)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish_updates(self, updates: Iterable[Tuple[int, datetime]]):
+        """(query_id, answer_last_updated) çiftleri için güncelleme olaylarını yayınlar."""
+        events = [
+            {"type": "answer_updated", "query_id": int(query_id), "version": answer_version(updated_at),
+             "updated_at": updated_at.isoformat()}
+            for query_id, updated_at in updates
+        ]
+        if events:
+            self.publish(events)
+
+    def publish(self, events: List[dict]):
+        self._dispatch(events)
+
+    def _dispatch(self, events: List[dict]):
+        now = time.monotonic()
+        with self._lock:
+            expired = {s for s in self._subscribers if now - s.last_read > self.idle_seconds}
+            self._subscribers -= expired
+            subscribers = list(self._subscribers)
+        for subscription in expired:
+            subscription.closed = True
+        if expired:
+            logger.info(f"Dropped {len(expired)} idle answer event subscriptions.")
+        for subscription in subscribers:
+            for event in events:
+                subscription._offer(event)
+
+class PostgresAnswerEventBus(LocalAnswerEventBus):
+    """
+    Olayları PostgreSQL NOTIFY ile süreçler arasında yayınlar. Her süreçte ilk abonelikte tek
+    bir dinleyici iş parçacığı, havuz dışı ayrı bir bağlantıyla LISTEN yapar ve gelen olayları
+    yerel aboneliklere dağıtır; böylece binlerce açık oturum tek bir bağlantıyı paylaşır ve
+    tabloyu taramaz. NOTIFY başarısız olursa olaylar yalnızca bu süreç içinde dağıtılır.
+    """
+
+    # PostgreSQL NOTIFY yükü 8000 baytla sınırlıdır
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, engine, channel: str, idle_seconds: float = 600.0):
+        super().__init__(idle_seconds)
+        self.engine = engine
+        self.channel = channel
+        self._listener: Optional[threading.Thread] = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, events: List[dict]):
+        payloads = [json.dumps(event, separators=(",", ":")) for event in events]
+        payloads = [p for p in payloads if len(p.encode("utf-8")) <= self.MAX_PAYLOAD_BYTES]
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                             {"channel": self.channel, "payloads": payloads})
+        except Exception as e:
+            logger.warning(f"NOTIFY on '{self.channel}' failed, delivering {len(events)} answer events in-process only: {e}")
+            self._dispatch(events)
+
+    def subscribe(self, query_ids: Optional[Iterable[int]] = None, max_queued: int = 1000) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(query_ids, max_queued)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="answer-events-listener", daemon=True)
+                self._listener.start()
+
+    def _connect(self):
+        # Havuzdan bağımsız, kalıcı bir DBAPI (psycopg2) bağlantısı
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        connection = self.engine.dialect.dbapi.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _listen(self):
+        backoff = 1.0
+        reconnecting = False
+        while True:
+            connection = None
+            try:
+                connection = self._connect()
+                logger.info(f"Listening for answer events on channel '{self.channel}'.")
+                if reconnecting:
+                    # Bağlantı koptuğu sürede kaçırılan olaylar olabilir; istemciler tam yenileme yapmalı
+                    self._dispatch([{"type": "resync"}])
+                backoff = 1.0
+                while True:
+                    if select.select([connection], [], [], 5.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    events = []
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        try:
+                            events.append(json.loads(notify.payload))
+                        except ValueError:
+                            logger.warning(f"Ignoring malformed answer event payload: {notify.payload[:100]}")
+                    if events:
+                        self._dispatch(events)
+            except Exception as e:
+                logger.error(f"Answer event listener failed, reconnecting in {backoff:.0f}s: {e}")
+                reconnecting = True
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+def create_answer_event_bus() -> LocalAnswerEventBus:
+    backend = config.ANSWER_EVENTS_BACKEND.lower()
+    if backend == "postgres":
+        if engine.dialect.name == "postgresql":
+            return PostgresAnswerEventBus(engine, config.ANSWER_EVENTS_CHANNEL, config.ANSWER_EVENTS_IDLE_SECONDS)
+        logger.warning(f"ANSWER_EVENTS_BACKEND=postgres needs a PostgreSQL database ('{engine.dialect.name}' found), using in-process events.")
+    elif backend != "local":
+        logger.warning(f"Unknown ANSWER_EVENTS_BACKEND '{config.ANSWER_EVENTS_BACKEND}', using in-process events.")
+    return LocalAnswerEventBus(config.ANSWER_EVENTS_IDLE_SECONDS)
+
+# Singleton instance
+answer_events = create_answer_event_bus()
@@ -1,7 +1,8 @@
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
-from src.database import get_db, UserQuery
+from typing import List, Dict, Any, Iterable
+from src.database import session_scope, UserQuery
+from src.answer_events import answer_version
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +14,7 @@ class AnswerMonitor:
         """
         Verilen zamandan sonra güncellenmiş ve abone olunmuş cevapları (UserQuery'leri) getirir.
         """
-        db = next(get_db())
-        try:
+        with session_scope() as db:
             updated_queries = db.query(UserQuery).filter(
                 UserQuery.is_subscribed == True,
                 UserQuery.answer_last_updated > last_check_time
@@ -30,7 +30,28 @@ class AnswerMonitor:
             if updated_answers_data:
                 logger.info(f"Found {len(updated_answers_data)} updated answers since {last_check_time}.")
             return updated_answers_data
-        finally:
-            db.close()
 
-answer_monitor = AnswerMonitor()
\ No newline at end of file
+    def get_answers(self, query_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Verilen sorguların güncel cevaplarını ID'ye göre getirir. `version`, cevap güncelleme
+        olaylarındaki sürümle karşılaştırılabilir. Cevabı henüz oluşmamış sorgular 'pending',
+        arka planda işlenemeyen sorgular 'failed' (hata mesajı `error` alanında) döner.
+        """
+        query_ids = list(set(query_ids))
+        if not query_ids:
+            return {}
+        with session_scope() as db:
+            rows = db.query(UserQuery.id, UserQuery.query_text, UserQuery.final_answer, UserQuery.is_subscribed,
+                            UserQuery.answer_last_updated, UserQuery.processing_error).filter(UserQuery.id.in_(query_ids)).all()
+            return {row.id: {
+                "query_id": row.id,
+                "query_text": row.query_text,
+                "final_answer": row.final_answer,
+                "status": "ready" if row.final_answer is not None else "failed" if row.processing_error else "pending",
+                "error": row.processing_error,
+                "is_subscribed": row.is_subscribed,
+                "last_updated": row.answer_last_updated,
+                "version": answer_version(row.answer_last_updated) if row.answer_last_updated else None,
+            } for row in rows}
+
+answer_monitor = AnswerMonitor()
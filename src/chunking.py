@@ -0,0 +1,101 @@
+import math
+import re
+from typing import List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+# Alt-kelime tokenizer'ları kelime başına ortalama bir token'dan fazlasını üretir (Türkçe'de daha da fazla)
+TOKENS_PER_WORD = 1.3
+
+def estimate_tokens(text: str) -> int:
+    """Model tokenizer'ı yüklemeden kelime/noktalama sayısından yaklaşık token sayısı."""
+    return math.ceil(len(_TOKEN_RE.findall(text)) * TOKENS_PER_WORD)
+
+def _blocks(content: str) -> List[Tuple[int, int, Optional[str]]]:
+    """
+    Markdown içeriğini paragraf bloklarına ayırır: (başlangıç, bitiş, bölüm başlığı).
+    Başlık satırları yeni bir bölüm başlatır ve kendileri blok olarak dönmez.
+    """
+    blocks = []
+    heading = None
+    start = None
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        match = _HEADING_RE.match(stripped)
+        if not stripped or match:
+            if start is not None:
+                blocks.append((start, offset, heading))
+                start = None
+            if match:
+                heading = match.group(2)
+        elif start is None:
+            start = offset
+        offset += len(line)
+    if start is not None:
+        blocks.append((start, offset, heading))
+    return blocks
+
+def _split_block(content: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Sınırı aşan bir bloğu önce cümle, gerekirse kelime sınırlarından parçalara böler."""
+    pieces = []
+    sentence_start = start
+    for match in _SENTENCE_RE.finditer(content, start, end):
+        pieces.append((sentence_start, match.start()))
+        sentence_start = match.end()
+    pieces.append((sentence_start, end))
+
+    spans = []
+    for piece_start, piece_end in pieces:
+        if estimate_tokens(content[piece_start:piece_end]) <= max_tokens:
+            spans.append((piece_start, piece_end))
+            continue
+        words = list(re.finditer(r"\S+", content[piece_start:piece_end]))
+        step = max(1, int(max_tokens / TOKENS_PER_WORD))
+        for i in range(0, len(words), step):
+            window = words[i:i + step]
+            spans.append((piece_start + window[0].start(), piece_start + window[-1].end()))
+    return spans
+
+def chunk_markdown(content: str, max_tokens: int = 300) -> List[dict]:
+    """
+    Markdown gövdesini başlık ve paragraf sınırlarına saygı duyan, en fazla ~`max_tokens`
+    token'lık parçalara ayırır. Aynı bölümdeki ardışık paragraflar sınır dolana kadar
+    birleştirilir; bölüm değişince yeni parça başlar.
+
+    Dönen her parça: index, start/end (içerikteki karakter ofsetleri), heading, tokens ve
+    embed edilecek text (bölüm başlığı + parça metni).
+    """
+    def body_budget(heading: Optional[str]) -> int:
+        # Başlık her parçanın başına eklendiği için gövde bütçesinden düşülür
+        return max(1, max_tokens - (estimate_tokens(heading) if heading else 0))
+
+    spans: List[Tuple[int, int, Optional[str]]] = []
+    for start, end, heading in _blocks(content or ""):
+        if estimate_tokens(content[start:end]) <= body_budget(heading):
+            spans.append((start, end, heading))
+        else:
+            spans.extend((s, e, heading) for s, e in _split_block(content, start, end, body_budget(heading)))
+
+    chunks = []
+    current: Optional[List] = None
+    for start, end, heading in spans:
+        tokens = estimate_tokens(content[start:end])
+        if current and current[2] == heading and current[3] + tokens <= body_budget(heading):
+            current[1], current[3] = end, current[3] + tokens
+            continue
+        if current:
+            chunks.append(current)
+        current = [start, end, heading, tokens]
+    if current:
+        chunks.append(current)
+
+    result = []
+    for index, (start, end, heading, _) in enumerate(chunks):
+        body = content[start:end].strip()
+        text = f"{heading}\n{body}" if heading else body
+        result.append({"index": index, "start": start, "end": end, "heading": heading,
+                       "text": text, "tokens": estimate_tokens(text)})
+    return result
@@ -6,12 +6,97 @@ load_dotenv()
 
 # --- API ve Veritabanı Ayarları ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None   # OpenAI uyumlu yerel/sahte sunucular için
 POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
-CHROMA_DB_PATH = "./chroma_db"
+
+# --- Veritabanı Bağlantı Havuzu ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))              # Havuzda açık tutulan bağlantı sayısı
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))        # Yoğunlukta geçici olarak açılabilecek ek bağlantı sayısı
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # Boş bağlantı için en fazla bekleme süresi (saniye)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # Bu süreden eski bağlantılar yenilenir (saniye, -1 = kapalı)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")  # Kopmuş bağlantıları kullanmadan önce algıla
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
 
 # --- Model Ayarları ---
 DECOMPOSER_MODEL = os.getenv("DECOMPOSER_MODEL", "gpt-4.1")      # Sorgu ayrıştırma için
 WORKER_MODEL = os.getenv("WORKER_MODEL", "gpt-4.1-mini")      # Prediction doldurma için
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))       # Asenkron gateway için eşzamanlı istek limiti
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+ORCHESTRATION_FAST_PATH = os.getenv("ORCHESTRATION_FAST_PATH", "true").lower() in ("1", "true", "yes")  # Tek görevli sorgu, aynı dilde daha önce cevaplanmış tek bir prediction'a eşlenirse kayıtlı planı yeniden kullan
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "Qwen/Qwen3-Embedding-0.6B")
+
+# --- LLM Cevap Önbelleği ---
+# SQLAlchemy URL'si (ör. sqlite:///llm_cache.db veya POSTGRES_DB_URL). Boş bırakılırsa önbellek kapalıdır.
+LLM_CACHE_URL = os.getenv("LLM_CACHE_URL", "")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+# --- Embedding Önbelleği ---
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")  # Boş bırakılırsa sadece bellek katmanı kullanılır
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+
+# --- Ingest Ayarları ---
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))        # Paralel prediction güncelleme iş parçacığı sayısı
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "16"))  # Tek forward pass'te embed edilecek doküman sayısı
+RERANK_SEARCH_DEPTH = int(os.getenv("RERANK_SEARCH_DEPTH", "50"))          # Doküman->prediction eşlemesinde her sorgu vektörü için aday parça sayısı
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "200"))    # Mesafe eşiğini geçen adaylardan yeniden sıralanacak en fazla sayı (0 = sınırsız)
+
+# --- Doküman Arama ---
+DOCUMENT_SEARCH_DEPTH = int(os.getenv("DOCUMENT_SEARCH_DEPTH", "20"))           # Her sorgu vektörü için aday parça sayısı
+DOCUMENT_SEARCH_FUSION = os.getenv("DOCUMENT_SEARCH_FUSION", "rrf")             # "rrf" veya "weighted"
+DOCUMENT_SEARCH_RRF_K = float(os.getenv("DOCUMENT_SEARCH_RRF_K", "60"))
+DOCUMENT_SEARCH_TEXT_WEIGHT = float(os.getenv("DOCUMENT_SEARCH_TEXT_WEIGHT", "1.0"))  # Metin vektörünün anahtar kelimelere göre ağırlığı
+
+# --- Doküman Parçalama (Chunking) ---
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "300"))              # Bir gövde parçasının yaklaşık üst sınırı (token)
+CHUNK_SEARCH_DEPTH = int(os.getenv("CHUNK_SEARCH_DEPTH", "30"))           # Her sorgu vektörü için aday parça sayısı
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))     # fulfill_prediction'a verilecek bağlamın token bütçesi
+
+# --- Vektör Deposu ---
+# "chroma": yerel kalıcı dizin (CHROMA_DB_PATH), "pgvector": POSTGRES_DB_URL'deki tablolar (pgvector eklentisi)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1024"))                 # pgvector sütun boyutu
+PGVECTOR_INDEX_TYPE = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw")           # "hnsw" veya "ivfflat"
+PGVECTOR_IVF_LISTS = int(os.getenv("PGVECTOR_IVF_LISTS", "100"))
+PGVECTOR_EF_SEARCH = int(os.getenv("PGVECTOR_EF_SEARCH", "100"))
+
+# --- Doküman Vektörü Sıkıştırma ---
+# Saklama hassasiyeti: "float32" veya "float16" (sadece pgvector); depo desteklemiyorsa başlangıçta hata verilir
+DOCUMENT_VECTOR_PRECISION = os.getenv("DOCUMENT_VECTOR_PRECISION", "float32")
+DOCUMENT_VECTOR_DIM = int(os.getenv("DOCUMENT_VECTOR_DIM", "0"))              # > 0 ise Matryoshka kesme (ör. 256); 0 = tam boyut
+DOCUMENT_RESCORE_FACTOR = int(os.getenv("DOCUMENT_RESCORE_FACTOR", "4"))      # Sıkıştırılmış aramada tam hassasiyetle yeniden puanlanacak aday çarpanı
+
+# --- Prediction İndeksi ---
+# true ise prediction vektörleri süreç içinde NumPy matrisinde tutulur ve aramalar Chroma yerine oradan yapılır
+PREDICTION_INDEX_ENABLED = os.getenv("PREDICTION_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# --- Cevap Yeniden Oluşturma ---
+# > 0 ise, bu süre içinde art arda gelen dokümanların tetiklediği yeniden oluşturmalar birleştirilir
+ANSWER_REGENERATION_DEBOUNCE_SECONDS = float(os.getenv("ANSWER_REGENERATION_DEBOUNCE_SECONDS", "0"))
+
+# --- Cevap Güncelleme Olayları ---
+# "postgres": LISTEN/NOTIFY ile süreçler arası (varsayılan), "local": sadece süreç içi yayın/abonelik
+ANSWER_EVENTS_BACKEND = os.getenv("ANSWER_EVENTS_BACKEND", "postgres")
+ANSWER_EVENTS_CHANNEL = os.getenv("ANSWER_EVENTS_CHANNEL", "answer_updates")
+ANSWER_EVENTS_IDLE_SECONDS = float(os.getenv("ANSWER_EVENTS_IDLE_SECONDS", "600"))      # Bu süre okunmayan abonelikler düşürülür
+ANSWER_EVENTS_UI_REFRESH_SECONDS = float(os.getenv("ANSWER_EVENTS_UI_REFRESH_SECONDS", "2"))  # Arayüzün abonelik kuyruğunu boşaltma aralığı
+
+# --- Arayüz Sorgu Listesi ---
+QUERY_LIST_PAGE_SIZE = int(os.getenv("QUERY_LIST_PAGE_SIZE", "25"))                       # Sayfa başına listelenen sorgu sayısı
+QUERY_LIST_CACHE_TTL_SECONDS = float(os.getenv("QUERY_LIST_CACHE_TTL_SECONDS", "30"))     # Liste/detay önbelleği süresi; cevap güncellemelerinde erken temizlenir
+
+# --- HTTP API (api.py) ---
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_EVENT_QUEUE_SIZE = int(os.getenv("API_EVENT_QUEUE_SIZE", "256"))              # İstemci başına bekleyen olay sınırı; aşılırsa 'resync' gönderilir
+API_STREAM_KEEPALIVE_SECONDS = float(os.getenv("API_STREAM_KEEPALIVE_SECONDS", "15"))  # SSE/WebSocket bağlantılarında boşta bekleme sinyali aralığı
+
+# --- Arka Plan Görev Kuyruğu ---
+# "local": süreç içi thread havuzu (varsayılan, testler için), "celery": Redis broker'lı Celery worker'ları
+TASK_QUEUE_BACKEND = os.getenv("TASK_QUEUE_BACKEND", "local")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+LOCAL_TASK_WORKERS = int(os.getenv("LOCAL_TASK_WORKERS", "4"))
 
 # --- Loglama Ayarları ---
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
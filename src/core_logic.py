@@ -1,20 +1,179 @@
+import asyncio
+import atexit
 import logging
+import threading
+import time
+from typing import AsyncIterator, Iterator
 import frontmatter
-from sqlalchemy.orm import Session, joinedload
-from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import flag_modified
+from datetime import date, datetime, timezone
 import json
+import numpy as np
 
+from src import config
 from src.vector_store import vector_store
-from src.processing import create_embedding, get_cosine_similarity, calculate_keyword_set_similarity
-from src.database import get_db, Document, Prediction, UserQuery, TemplatePredictionsLink
-from src.llm_gateway import llm_gateway
+from src.chunking import chunk_markdown
+from src.processing import create_embeddings, encode_normalized, normalize_rows, keyword_set_scores, embedding_cache
+from src.database import session_scope, thread_session_scope, Document, Prediction, UserQuery, TemplatePredictionsLink
+from src.llm_gateway import llm_gateway, async_llm_gateway, llm_response_cache
+from src.metrics import stage_timer
+from src.answer_events import answer_events
+from src.task_queue import task_queue
 
 logger = logging.getLogger(__name__)
 
+# Tek bir toplu çeviri çağrısına konacak kaynak verinin yaklaşık üst sınırı (karakter)
+MAX_TRANSLATION_BATCH_CHARS = 12000
+
+def _chunk_translation_batch(predictions: list[Prediction], source_language: str) -> list[list[Prediction]]:
+    """Prediction'ları, serileştirilmiş kaynak içerikleri MAX_TRANSLATION_BATCH_CHARS'ı aşmayacak gruplara böler."""
+    chunks, current, current_size = [], [], 0
+    for pred in predictions:
+        size = len(json.dumps(pred.predicted_value["content"][source_language], ensure_ascii=False))
+        if current and current_size + size > MAX_TRANSLATION_BATCH_CHARS:
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(pred)
+        current_size += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+@stage_timer.timed("translations")
+def _ensure_translations(db: Session, user_queries: list[UserQuery]):
+    """
+    Verilen sorguların cevaplarında ihtiyaç duyulan eksik çevirileri, cevaplar birleştirilmeden
+    ÖNCE toplu olarak üretir ve prediction'lara yazar.
+
+    - Her (prediction, hedef dil) çifti bir kez çevrilir; prediction içeriği güncellendiğinde
+      temel dil dışındaki içerikler silindiği için çeviri bir sonraki ihtiyaçta yeniden yapılır.
+    - Aynı (kaynak dil, hedef dil) çiftine düşen tüm değerler tek bir LLM çağrısında çevrilir;
+      farklı dil çiftleri eşzamanlı çalışır.
+    """
+    needed: dict[tuple[str, str], dict[int, Prediction]] = {}
+    for user_query in user_queries:
+        target_lang = user_query.language
+        for link in user_query.predictions:
+            prediction = link.prediction
+            if not prediction or not prediction.predicted_value or not prediction.predicted_value.get("is_translatable", False):
+                continue
+            content_dict = prediction.predicted_value.get("content", {})
+            base_language = getattr(prediction, "base_language_code", "en")
+            if target_lang in content_dict or base_language not in content_dict:
+                continue
+            needed.setdefault((base_language, target_lang), {})[prediction.id] = prediction
+
+    if not needed:
+        return
+
+    requests, owners = [], []
+    for (source_lang, target_lang), predictions in needed.items():
+        for chunk in _chunk_translation_batch(list(predictions.values()), source_lang):
+            requests.append({
+                "values": {str(pred.id): pred.predicted_value["content"][source_lang] for pred in chunk},
+                "target_language_code": target_lang,
+                "source_language_code": source_lang,
+            })
+            owners.append((target_lang, chunk))
+    logger.info(f"Translating {sum(len(chunk) for _, chunk in owners)} prediction values in {len(requests)} batched calls.")
+
+    predictions_to_update = []
+    for (target_lang, chunk), translated in zip(owners, async_llm_gateway.translate_values_concurrently(requests)):
+        for pred in chunk:
+            translated_data = translated.get(str(pred.id))
+            if isinstance(translated_data, dict) and "error" in translated_data:
+                logger.warning(f"Translation of Prediction ID {pred.id} to '{target_lang}' failed.")
+                continue
+            pred.predicted_value["content"][target_lang] = translated_data
+            # MutableDict iç içe sözlükteki değişikliği izlemez; sütun açıkça kirli işaretlenmeli
+            flag_modified(pred, "predicted_value")
+            predictions_to_update.append(pred)
+
+    if predictions_to_update:
+        db.add_all(predictions_to_update)
+        db.commit()
+
+@stage_timer.timed("_assemble_final_answer")
 def _assemble_final_answer(db: Session, user_query: UserQuery) -> str:
     """
     LLM'den gelen yapısal "render planını" ve prediction verilerini işleyerek
-    nihai, kullanıcı dostu metni oluşturur.
+    nihai, kullanıcı dostu metni oluşturur. Eksik çeviriler önce toplu olarak üretilir.
+    """
+    _ensure_translations(db, [user_query])
+    return _render_final_answer(user_query)
+
+def _needs_translation(prediction: Prediction, target_lang: str) -> bool:
+    """Prediction değeri hedef dilde yok ama temel dilden çevrilebiliyorsa True."""
+    pred_value_wrapper = prediction.predicted_value or {}
+    content_dict = pred_value_wrapper.get("content", {})
+    base_language = getattr(prediction, "base_language_code", "en")
+    return pred_value_wrapper.get("is_translatable", False) and target_lang not in content_dict and base_language in content_dict
+
+def _placeholder_value(prediction: Prediction | None, target_lang: str):
+    """Bir prediction'ın hedef dildeki değeri; bulunamazsa hata sözlüğü."""
+    final_value_for_placeholder = None
+
+    if prediction and prediction.predicted_value:
+        pred_value_wrapper = prediction.predicted_value
+        is_translatable = pred_value_wrapper.get("is_translatable", False)
+        content_dict = pred_value_wrapper.get("content", {})
+        base_language = getattr(prediction, "base_language_code", "en")
+
+
+        if not is_translatable:
+            final_value_for_placeholder = content_dict.get(base_language)
+        else:
+            if target_lang in content_dict:
+                final_value_for_placeholder = content_dict[target_lang]
+            elif base_language in content_dict:
+                final_value_for_placeholder = {"error": "translation_failed", "message": f"Could not translate to {target_lang}"}
+            else:
+                final_value_for_placeholder = {"error": "source_data_missing", "message": "Kaynak veri mevcut değil."}
+
+    if final_value_for_placeholder is None:
+        return {"error": "not_found", "message": "Bilgi Bulunamadı."}
+    return final_value_for_placeholder
+
+def _render_step(step: dict, context: dict) -> list[str]:
+    """Render planının tek bir adımını, yer tutucu değerleri (context) ile metin parçalarına dönüştürür."""
+    parts = []
+    step_type = step.get("type")
+
+    if step_type == "paragraph":
+        parts.append(step.get("content", ""))
+
+    elif step_type == "list":
+        placeholder = step.get("placeholder")
+        item_template = step.get("item_template", "")
+        empty_message = step.get("empty_message", "İlgili bilgi bulunamadı.") 
+        data_items = context.get(placeholder)
+
+        if isinstance(data_items, dict) and "error" in data_items:
+            parts.append(empty_message)
+        elif isinstance(data_items, list) and len(data_items) > 0:
+            for item in data_items:
+                if isinstance(item, dict):
+                    try:
+                        formatted_item = item_template.format(**item)
+                        parts.append(formatted_item)
+                    except KeyError as e:
+                        logger.warning(f"Şablon anahtarı {e} veri içinde bulunamadı. Ham şablon ekleniyor. Veri: {item}")
+                        parts.append(item_template)
+                else:
+                    parts.append(str(item))
+        else:
+            parts.append(empty_message)
+    else:
+        logger.warning(f"Unknown render plan step type: {step_type}")
+        parts.append(f"[**Bilinmeyen plan tipi:** `{step_type}`]")
+    return parts
+
+def _render_final_answer(user_query: UserQuery) -> str:
+    """
+    Render planını mevcut prediction verileriyle şablonlar. LLM çağrısı yapmaz;
+    çevirilerin _ensure_translations ile önceden hazırlanmış olması beklenir.
     """
     try:
         if isinstance(user_query.answer_template_text, str):
@@ -28,130 +187,126 @@ def _assemble_final_answer(db: Session, user_query: UserQuery) -> str:
     if not render_plan:
         return "[**Cevap planı oluşturulamadı.**]"
 
-    context = {}
-    predictions_to_update = []
     target_lang = user_query.language
-
-    for link in user_query.predictions:
-        prediction = link.prediction
-        final_value_for_placeholder = None
-
-        if prediction and prediction.predicted_value:
-            pred_value_wrapper = prediction.predicted_value
-            is_translatable = pred_value_wrapper.get("is_translatable", False)
-            content_dict = pred_value_wrapper.get("content", {})
-            base_language = getattr(prediction, "base_language_code", "en")
-
-
-            if not is_translatable:
-                final_value_for_placeholder = content_dict.get(base_language)
-            else:
-                if target_lang in content_dict:
-                    final_value_for_placeholder = content_dict[target_lang]
-                elif base_language in content_dict:
-                    source_data = content_dict[base_language]
-                    translated_data = llm_gateway.translate_value(source_data, target_lang, base_language)
-                    
-                    if not (isinstance(translated_data, dict) and "error" in translated_data):
-                        final_value_for_placeholder = translated_data
-                        prediction.predicted_value["content"][target_lang] = translated_data
-                        predictions_to_update.append(prediction)
-                    else:
-                        final_value_for_placeholder = translated_data
-                else:
-                    final_value_for_placeholder = {"error": "source_data_missing", "message": "Kaynak veri mevcut değil."}
-        
-        if isinstance(final_value_for_placeholder, dict) and "error" in final_value_for_placeholder:
-            context[link.placeholder_name] = final_value_for_placeholder 
-        elif final_value_for_placeholder is None:
-            context[link.placeholder_name] = {"error": "not_found", "message": "Bilgi Bulunamadı."} 
-        else:
-            context[link.placeholder_name] = final_value_for_placeholder
-
-    if predictions_to_update:
-        db.add_all(predictions_to_update)
-        db.commit()
+    context = {link.placeholder_name: _placeholder_value(link.prediction, target_lang) for link in user_query.predictions}
 
     final_answer_parts = []
     try:
         for step in render_plan:
-            step_type = step.get("type")
-
-            if step_type == "paragraph":
-                final_answer_parts.append(step.get("content", ""))
-
-            elif step_type == "list":
-                placeholder = step.get("placeholder")
-                item_template = step.get("item_template", "")
-                empty_message = step.get("empty_message", "İlgili bilgi bulunamadı.") 
-                data_items = context.get(placeholder)
-
-                if isinstance(data_items, dict) and "error" in data_items:
-                    final_answer_parts.append(empty_message)
-                elif isinstance(data_items, list) and len(data_items) > 0:
-                    for item in data_items:
-                        if isinstance(item, dict):
-                            try:
-                                formatted_item = item_template.format(**item)
-                                final_answer_parts.append(formatted_item)
-                            except KeyError as e:
-                                logger.warning(f"Şablon anahtarı {e} veri içinde bulunamadı. Ham şablon ekleniyor. Veri: {item}")
-                                final_answer_parts.append(item_template)
-                        else:
-                            final_answer_parts.append(str(item))
-                else:
-                    final_answer_parts.append(empty_message)
-            else:
-                logger.warning(f"Unknown render plan step type: {step_type}")
-                final_answer_parts.append(f"[**Bilinmeyen plan tipi:** `{step_type}`]")
-        
+            final_answer_parts.extend(_render_step(step, context))
         return "\n".join(final_answer_parts)
     except Exception as e:
         logger.error(f"Error processing render plan for UserQuery ID {user_query.id}: {e}", exc_info=True)
         return "[**Cevap oluşturulurken şablon işleme hatası oluştu.** Lütfen sistem yöneticinizle iletişime geçin.]"
 
+def _load_prediction_vectors(predictions: list[Prediction]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Prediction'ların prompt ve anahtar kelime vektörlerini vektör deposundan toplu olarak getirir.
+    Depoda vektörü bulunmayan kayıtlar (ör. eski veriler) için embedding hesaplanır.
+    Dönüş: (normalize prompt matrisi, normalize anahtar kelime matrisi, her anahtar kelimenin
+    ait olduğu prediction'ın sıra indeksi)
+    """
+    stored = vector_store.get_prediction_embeddings([pred.id for pred in predictions])
+
+    prompt_rows, keyword_rows, owner_index = [], [], []
+    to_encode = []  # (tür, prediction sırası, metin)
+    for i, pred in enumerate(predictions):
+        entry = stored.get(pred.id, {})
+        if "prompt_text" in entry:
+            prompt_rows.append(entry["prompt_text"])
+        else:
+            prompt_rows.append(None)
+            to_encode.append(("prompt_text", i, pred.prediction_prompt))
+
+        stored_keywords = entry.get("keyword")
+        if stored_keywords is not None and len(stored_keywords):
+            keyword_rows.extend(stored_keywords)
+            owner_index.extend([i] * len(stored_keywords))
+        else:
+            to_encode.extend(("keyword", i, kw) for kw in (pred.keywords or []) if kw)
+
+    if to_encode:
+        logger.info(f"{len(to_encode)} prediction vectors missing from the vector store; encoding them.")
+        for (kind, i, _), emb in zip(to_encode, create_embeddings([text for _, _, text in to_encode])):
+            if kind == "prompt_text":
+                prompt_rows[i] = emb
+            else:
+                keyword_rows.append(emb)
+                owner_index.append(i)
+
+    prompt_embs = normalize_rows(np.vstack(prompt_rows))
+    if keyword_rows:
+        keyword_embs = normalize_rows(np.vstack(keyword_rows))
+    else:
+        keyword_embs = np.zeros((0, prompt_embs.shape[1]), dtype=np.float32)
+    return prompt_embs, keyword_embs, np.array(owner_index, dtype=np.int64)
+
+@stage_timer.timed("rerank")
 def _find_and_rerank_relevant_predictions(db: Session, summary: str, keywords: list[str], top_k: int = 10) -> list[int]:
     """
     Bir doküman için en alakalı Prediction'ları bulur (ön eleme + yeniden sıralama).
+
+    Ön eleme sabit bir ilk-N yerine mesafe eşiğiyle yapılır: yeniden sıralamadaki en düşük
+    birleşik skoru (MIN_COMBINED_SCORE) hiçbir şekilde geçemeyecek adaylar vektör yüklenmeden
+    elenir. Eşik, normalize vektörlerde mesafe = 2 - 2·kosinüs olmasından türetilir:
+      - anahtar kelime skoru 0 ise, özet benzerliği MIN_COMBINED_SCORE / PROMPT_SUMMARY_WEIGHT'i geçmeli;
+      - anahtar kelime skoru yalnızca KEYWORD_MATCH_THRESHOLD'u geçen eşleşmelerden oluşur.
+    Parça mesafeleri prompt ve anahtar kelime vektörlerinin en iyisi olduğu için eleme
+    tutucudur. Eşiği geçen aday sayısı RERANK_MAX_CANDIDATES ile sınırlanır.
     """
-    initial_candidate_limit = max(50, top_k * 5) 
+    KEYWORD_MATCH_THRESHOLD = 0.7
+
+    PROMPT_SUMMARY_WEIGHT = 0.7
+    KEYWORD_MATCH_WEIGHT = 0.3
 
-    initial_candidate_ids = vector_store.find_similar_predictions(
-        query_text=summary, 
-        query_keywords=keywords, 
-        top_k=initial_candidate_limit 
+    MIN_COMBINED_SCORE = 0.1
+
+    # Aday arama, eleme ve satır getirme tek adımda (pgvector'de tek SQL sorgusu)
+    candidate_predictions = vector_store.find_candidate_predictions(
+        db,
+        query_text=summary,
+        query_keywords=keywords,
+        top_k=max(config.RERANK_SEARCH_DEPTH, top_k),
+        limit=config.RERANK_MAX_CANDIDATES or None,
+        max_text_distance=2.0 * (1.0 - MIN_COMBINED_SCORE / PROMPT_SUMMARY_WEIGHT),
+        max_keyword_distance=2.0 * (1.0 - KEYWORD_MATCH_THRESHOLD),
     )
-    if not initial_candidate_ids:
+    if not candidate_predictions:
         logger.info("No initial candidates found from vector search for reranking.")
         return []
-        
-    candidate_predictions = db.query(Prediction).filter(Prediction.id.in_(initial_candidate_ids)).all()
     reranked_predictions = []
-    
-    KEYWORD_MATCH_THRESHOLD = 0.7 
-    
-    PROMPT_SUMMARY_WEIGHT = 0.7
-    KEYWORD_MATCH_WEIGHT = 0.3
-    
-    MIN_COMBINED_SCORE = 0.1 
 
-    for pred in candidate_predictions:
-        prompt_summary_score = get_cosine_similarity(pred.prediction_prompt, summary)
-        
-        keyword_match_score_avg = calculate_keyword_set_similarity(pred.keywords or [], keywords, similarity_threshold=KEYWORD_MATCH_THRESHOLD)
-        
-        combined_score = (prompt_summary_score * PROMPT_SUMMARY_WEIGHT) + \
-                         (keyword_match_score_avg * KEYWORD_MATCH_WEIGHT)
-        
+    # Doküman tarafı: özet ve anahtar kelimeler bir kez encode edilir
+    doc_keywords = [kw for kw in keywords if kw]
+    doc_side = encode_normalized(([summary] if summary else []) + doc_keywords)
+    summary_emb = doc_side[:1] if summary else doc_side[:0]
+    doc_keyword_embs = doc_side[1:] if summary else doc_side
+
+    # Aday tarafı: vektörler Chroma'da zaten saklı, yeniden hesaplanmaz
+    prompt_embs, cand_keyword_embs, owner_index = _load_prediction_vectors(candidate_predictions)
+
+    if len(summary_emb):
+        prompt_summary_scores = (prompt_embs @ summary_emb.T)[:, 0]
+    else:
+        prompt_summary_scores = np.zeros(len(candidate_predictions), dtype=np.float32)
+    keyword_match_scores = keyword_set_scores(
+        cand_keyword_embs, owner_index, len(candidate_predictions),
+        doc_keyword_embs, similarity_threshold=KEYWORD_MATCH_THRESHOLD
+    )
+    combined_scores = (prompt_summary_scores * PROMPT_SUMMARY_WEIGHT) + \
+                      (keyword_match_scores * KEYWORD_MATCH_WEIGHT)
+
+    for pred, prompt_summary_score, keyword_match_score_avg, combined_score in zip(
+            candidate_predictions, prompt_summary_scores, keyword_match_scores, combined_scores):
         if combined_score < MIN_COMBINED_SCORE:
             logger.debug(f"Prediction ID {pred.id} (Prompt: '{pred.prediction_prompt[:20]}...') skipped due to low combined score: {combined_score:.4f}")
             continue
 
         reranked_predictions.append({
             "id": pred.id, 
-            "score": combined_score,
-            "prompt_summary_score": prompt_summary_score, 
-            "keyword_match_score_avg": keyword_match_score_avg 
+            "score": float(combined_score),
+            "prompt_summary_score": float(prompt_summary_score), 
+            "keyword_match_score_avg": float(keyword_match_score_avg) 
         })
         
     reranked_predictions.sort(key=lambda x: x["score"], reverse=True)
@@ -161,105 +316,378 @@ def _find_and_rerank_relevant_predictions(db: Session, summary: str, keywords: l
     
     return final_ids
 
-def handle_new_document(file_path: str):
+def _parse_publication_date(value) -> datetime | None:
     """
-    Yeni bir dokümanı işler. İlgili prediction'ları günceller, eski çevirileri geçersiz kılar
-    ve abone olan kullanıcı cevaplarını yeniden oluşturur.
+    Frontmatter'daki pub_date değerini (ISO metni, tarih veya zaman damgası) saat dilimli
+    datetime'a çevirir. PostgreSQL metni kendisi dönüştürür, SQLite ise sadece datetime kabul eder.
     """
-    logger.info(f"Starting ingestion for document: {file_path}")
-    db: Session = next(get_db())
+    if value is None or value == "":
+        return None
     try:
-        post = frontmatter.load(file_path)
-        metadata = post.metadata
-        content = post.content
-        source_url = metadata.get('url')
-        if not source_url or db.query(Document).filter_by(source_url=source_url).first():
-            logger.warning(f"Skipping document: {source_url} (missing URL or already exists).")
-            return
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+        elif isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+    except ValueError:
+        logger.warning(f"Ignoring unparseable publication date: {value!r}")
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _parse_document_file(file_path: str) -> dict:
+    """Bir markdown dokümanının frontmatter'ını ve içeriğini ingest için ayrıştırır."""
+    post = frontmatter.load(file_path)
+    metadata = post.metadata
+    keywords = list(set([str(k) for k in metadata.get('keywords', [])] + [str(e.get('value', e)) for e in metadata.get('entities', [])]))
+    return {
+        "file_path": str(file_path),
+        "source_url": metadata.get('url'),
+        "publication_date": _parse_publication_date(metadata.get('pub_date')),
+        "content": post.content,
+        "summary": metadata.get('summary', ''),
+        "keywords": keywords,
+        "chunks": chunk_markdown(post.content, config.CHUNK_MAX_TOKENS),
+    }
+
+def _document_meta_items(parsed_doc: dict) -> list[tuple[str, str]]:
+    """Vektör deposuna yazılacak (meta_type, value) çiftlerini döndürür."""
+    meta_to_embed = {"summary": [parsed_doc["summary"]], "keywords": parsed_doc["keywords"]}
+    return [(meta_type, value) for meta_type, values in meta_to_embed.items() for value in values if value]
+
+def _document_embedding_texts(parsed_doc: dict) -> tuple[list[str], int]:
+    """Metadata değerleri ve gövde parçalarının metinlerini tek batch için birleştirir; metadata sayısını da döndürür."""
+    meta_values = [value for _, value in _document_meta_items(parsed_doc)]
+    return meta_values + [chunk["text"] for chunk in parsed_doc.get("chunks", [])], len(meta_values)
+
+def _store_document(db: Session, parsed_doc: dict, meta_embeddings: list[list[float]] | None = None,
+                    chunk_embeddings: list[list[float]] | None = None) -> Document:
+    """
+    Dokümanı PostgreSQL'e, metadata ve gövde parçası vektörlerini vektör deposuna yazar.
+    Vektörler verilmezse _document_embedding_texts sırasıyla tek batch'te hesaplanır.
+    """
+    new_doc = Document(source_url=parsed_doc["source_url"], raw_markdown_content=parsed_doc["content"], publication_date=parsed_doc["publication_date"])
+    db.add(new_doc); db.commit(); db.refresh(new_doc)
+
+    meta_items = _document_meta_items(parsed_doc)
+    chunks = parsed_doc.get("chunks", [])
+    if meta_embeddings is None or chunk_embeddings is None:
+        texts, meta_count = _document_embedding_texts(parsed_doc)
+        embeddings = create_embeddings(texts)
+        meta_embeddings, chunk_embeddings = embeddings[:meta_count], embeddings[meta_count:]
+    vector_store.add_document_metas(
+        [(new_doc.id, parsed_doc["source_url"], meta_type, value) for meta_type, value in meta_items],
+        meta_embeddings
+    )
+    if chunks:
+        vector_store.add_document_chunks([(new_doc.id, parsed_doc["source_url"], chunk) for chunk in chunks], chunk_embeddings)
+    return new_doc
 
-        new_doc = Document(source_url=source_url, raw_markdown_content=content, publication_date=metadata.get('pub_date'))
-        db.add(new_doc); db.commit(); db.refresh(new_doc)
-        
-        summary = metadata.get('summary', '')
-        keywords = list(set([str(k) for k in metadata.get('keywords', [])] + [str(e.get('value', e)) for e in metadata.get('entities', [])]))
-        meta_to_embed = {"summary": [summary], "keywords": keywords}
-        for meta_type, values in meta_to_embed.items():
-            for value in values:
-                if value:
-                    vector_store.add_document_meta(new_doc.id, source_url, meta_type, value, create_embedding(value))
-        
-        relevant_prediction_ids = _find_and_rerank_relevant_predictions(db, summary, keywords)
-        if not relevant_prediction_ids:
-            logger.info("No relevant predictions to update.")
-            return
+def _gather_context_chunks(prompt: str, keywords: list[str]) -> list[str]:
+    """
+    Yeni bir prediction'ı doldurmak için doküman gövdelerinden CONTEXT_TOKEN_BUDGET'a sığan en
+    alakalı parçaları döndürür. Parçaları henüz indekslenmemiş arşivlerde metadata
+    (özet/anahtar kelime) eşleşmelerine geri düşülür.
+    """
+    passages = vector_store.query_document_passages(prompt, keywords, max_tokens=config.CONTEXT_TOKEN_BUDGET)
+    if passages:
+        return [p["text"] for p in passages]
+    return [h['text'] for h in vector_store.query_document_metas(prompt, keywords, n_results=5)]
+
+def _build_update_request(pred: Prediction, content: str) -> dict | None:
+    """Prediction için update_prediction argümanlarını hazırlar; kaynak içerik yoksa None döner."""
+    base_language = getattr(pred, "base_language_code", "en")
+    source_content = pred.predicted_value.get("content", {}).get(base_language)
+    if source_content is None:
+        return None
+    return {
+        "prediction_prompt": pred.prediction_prompt,
+        "current_value_content": source_content,
+        "new_context_chunks": [content],
+        "base_language": base_language,
+    }
+
+def _apply_update_result(db: Session, pred: Prediction, update_result: dict) -> bool:
+    """
+    LLM'den gelen artımlı güncelleme sonucunu Prediction'a uygular.
+    Esaslı bir güncelleme yapıldıysa True döner (commit çağıranın sorumluluğundadır).
+    """
+    base_language = getattr(pred, "base_language_code", "en")
+    status = (update_result.get("status") or "").strip().lower()
+    if status in ["no_change", "error"]:
+        logger.info(f"Prediction {pred.id} update is not required (no change or error).")
+        return False
 
-        relevant_predictions = db.query(Prediction).filter(Prediction.id.in_(relevant_prediction_ids)).all()
-        updated_prediction_ids = []
-        
-        for pred in relevant_predictions:
-            base_language = getattr(pred, "base_language_code", "en")
-            source_content = pred.predicted_value.get("content", {}).get(base_language)
-            if source_content is None:
-                continue
+    new_data = update_result.get("data")
+    logger.info(f"Prediction {pred.id} requires a substantive update.")
 
-            logger.info(f"Performing INCREMENTAL update for Prediction ID {pred.id}.")
-            update_result = llm_gateway.update_prediction(pred.prediction_prompt, source_content, [content], base_language)
-            
-            status = (update_result.get("status") or "").strip().lower()
-            if status in ["no_change", "error"]:
-                logger.info(f"Prediction {pred.id} update is not required (no change or error).")
-                continue
+    pred.predicted_value["content"][base_language] = new_data
+    pred.predicted_value["is_translatable"] = update_result.get("is_translatable", False)
+    
+    keys_to_delete = [lang for lang in pred.predicted_value["content"] if lang != base_language]
+    if keys_to_delete:
+        for lang in keys_to_delete:
+            del pred.predicted_value["content"][lang]
+
+    pred.last_updated = datetime.now(timezone.utc)
+    db.add(pred)
+    return True
+
+def _apply_document_to_prediction(db: Session, pred: Prediction, content: str) -> bool:
+    """Tek bir Prediction'ı yeni doküman içeriğiyle (senkron LLM çağrısıyla) artımlı olarak günceller."""
+    request = _build_update_request(pred, content)
+    if request is None:
+        return False
+    logger.info(f"Performing INCREMENTAL update for Prediction ID {pred.id}.")
+    return _apply_update_result(db, pred, llm_gateway.update_prediction(**request))
+
+# Cevap yeniden oluşturma aşamasında tek seferde yüklenip güncellenen sorgu sayısı
+REGENERATION_CHUNK_SIZE = 200
+
+@stage_timer.timed("regenerate_answers")
+def _regenerate_answers_for_predictions(db: Session, updated_prediction_ids: list[int]) -> int:
+    """
+    Güncellenen prediction'lara bağlı, abone olunmuş sorguların cevaplarını yeniden oluşturur.
 
-            new_data = update_result.get("data")
-            logger.info(f"Prediction {pred.id} requires a substantive update.")
+    Sorgular bağlantıları ve prediction'larıyla birlikte tek sorguda (eager load) ve
+    REGENERATION_CHUNK_SIZE'lık parçalar halinde yüklenir; abone olmayanlar SQL'de elenir.
+    Her parçanın cevapları toplu bir UPDATE ile yazılır.
+    """
+    if not updated_prediction_ids:
+        return 0
+
+    affected_query_ids = db.query(TemplatePredictionsLink.query_id)\
+                           .filter(TemplatePredictionsLink.prediction_id.in_(updated_prediction_ids))\
+                           .distinct()\
+                           .scalar_subquery()
+
+    regenerated = 0
+    last_id = 0
+    while True:
+        chunk = db.query(UserQuery)\
+                  .options(selectinload(UserQuery.predictions).joinedload(TemplatePredictionsLink.prediction))\
+                  .filter(UserQuery.id.in_(affected_query_ids), UserQuery.is_subscribed == True, UserQuery.id > last_id)\
+                  .order_by(UserQuery.id.asc())\
+                  .limit(REGENERATION_CHUNK_SIZE)\
+                  .all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        # Parçadaki tüm sorgular için gereken çeviriler döngüden önce tek seferde hazırlanır
+        _ensure_translations(db, chunk)
+
+        now = datetime.now(timezone.utc)
+        db.bulk_update_mappings(UserQuery, [
+            {"id": query.id, "final_answer": _render_final_answer(query), "answer_last_updated": now}
+            for query in chunk
+        ])
+        db.commit()
+        # Abonelere bildirim yalnızca commit'ten sonra: olayı alan istemci yeni cevabı okuyabilmeli
+        answer_events.publish_updates((query.id, now) for query in chunk)
+        regenerated += len(chunk)
 
-            pred.predicted_value["content"][base_language] = new_data
-            pred.predicted_value["is_translatable"] = update_result.get("is_translatable", False)
-            
-            keys_to_delete = [lang for lang in pred.predicted_value["content"] if lang != base_language]
-            if keys_to_delete:
-                for lang in keys_to_delete:
-                    del pred.predicted_value["content"][lang]
+    logger.info(f"Reactive update of {regenerated} final answers finished.")
+    return regenerated
 
-            pred.last_updated = datetime.now(timezone.utc)
-            db.add(pred)
-            updated_prediction_ids.append(pred.id)
+class AnswerRegenerator:
+    """
+    Cevap yeniden oluşturma isteklerini birleştirir (coalescing).
 
-        if not updated_prediction_ids:
-            logger.info("No predictions were substantively updated.")
+    `debounce_seconds` > 0 ise, kısa aralıklarla gelen dokümanların güncellediği prediction
+    ID'leri bir pencerede biriktirilir ve pencere kapanınca tek bir yeniden oluşturma
+    çalıştırılır; böylece aynı sorgu art arda defalarca birleştirilmez. Bekleme, ilk
+    istekten itibaren en fazla `max_delay_seconds` sürer. `debounce_seconds` 0 ise
+    istekler anında (senkron) işlenir.
+    """
+
+    def __init__(self, debounce_seconds: float = 0.0, max_delay_seconds: float = 10.0):
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: set[int] = set()
+        self._first_request_at: float | None = None
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def request(self, prediction_ids: list[int]):
+        if not prediction_ids:
+            return
+        if self.debounce_seconds <= 0:
+            self._run(set(prediction_ids))
             return
-            
-        db.commit()
-        
-        distinct_query_ids_to_update = db.query(TemplatePredictionsLink.query_id)\
-                                             .filter(TemplatePredictionsLink.prediction_id.in_(updated_prediction_ids))\
-                                             .distinct()\
-                                             .all()
-        
-        query_ids_list = [q_id[0] for q_id in distinct_query_ids_to_update]
 
-        queries_to_update = db.query(UserQuery).filter(UserQuery.id.in_(query_ids_list)).all()
-        
-        for query in queries_to_update:
-            if query.is_subscribed:
-                query.final_answer = _assemble_final_answer(db, query)
-                query.answer_last_updated = datetime.now(timezone.utc)
-                db.add(query)
-        db.commit()
-        logger.info(f"Reactive update of {len(queries_to_update)} final answers finished.")
+        with self._lock:
+            self._pending.update(prediction_ids)
+            now = time.monotonic()
+            if self._first_request_at is None:
+                self._first_request_at = now
+            delay = min(self.debounce_seconds, max(0.0, self._first_request_at + self.max_delay_seconds - now))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+        logger.debug(f"Answer regeneration deferred; {len(self._pending)} predictions pending.")
+
+    def flush(self):
+        """Bekleyen tüm prediction ID'leri için cevapları şimdi yeniden oluşturur."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            self._first_request_at = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            self._run(pending)
+
+    def _run(self, prediction_ids: set[int]):
+        with self._flush_lock:
+            try:
+                with thread_session_scope() as db:
+                    _regenerate_answers_for_predictions(db, sorted(prediction_ids))
+            except Exception as e:
+                logger.error(f"Error regenerating answers: {e}", exc_info=True)
+
+answer_regenerator = AnswerRegenerator(debounce_seconds=config.ANSWER_REGENERATION_DEBOUNCE_SECONDS)
+
+@stage_timer.timed("handle_new_document")
+def handle_new_document(file_path: str):
+    """
+    Yeni bir dokümanı işler. İlgili prediction'ları günceller, eski çevirileri geçersiz kılar
+    ve abone olan kullanıcı cevaplarını yeniden oluşturur.
+    """
+    logger.info(f"Starting ingestion for document: {file_path}")
+    try:
+        with session_scope() as db:
+            parsed_doc = _parse_document_file(file_path)
+            source_url = parsed_doc["source_url"]
+            if not source_url or db.query(Document).filter_by(source_url=source_url).first():
+                logger.warning(f"Skipping document: {source_url} (missing URL or already exists).")
+                return
+
+            _store_document(db, parsed_doc)
         
+            relevant_prediction_ids = _find_and_rerank_relevant_predictions(db, parsed_doc["summary"], parsed_doc["keywords"])
+            if not relevant_prediction_ids:
+                logger.info("No relevant predictions to update.")
+                return
+
+            relevant_predictions = db.query(Prediction).filter(Prediction.id.in_(relevant_prediction_ids)).all()
+            pending = [(pred, _build_update_request(pred, parsed_doc["content"])) for pred in relevant_predictions]
+            pending = [(pred, request) for pred, request in pending if request is not None]
+
+            # Birbirinden bağımsız güncellemeler eşzamanlı çalışır
+            logger.info(f"Performing INCREMENTAL update for {len(pending)} predictions concurrently.")
+            update_results = async_llm_gateway.update_predictions_concurrently([request for _, request in pending])
+            updated_prediction_ids = [
+                pred.id for (pred, _), update_result in zip(pending, update_results)
+                if _apply_update_result(db, pred, update_result)
+            ]
+
+            if not updated_prediction_ids:
+                logger.info("No predictions were substantively updated.")
+                return
+            
+            db.commit()
+            answer_regenerator.request(updated_prediction_ids)
     except Exception as e:
         logger.error(f"Error in handle_new_document: {e}", exc_info=True)
-        db.rollback()
     finally:
-        db.close()
+        embedding_cache.log_stats("handle_new_document")
         
+# Orkestrasyon LLM çağrısı yerine yerel planın kullanıldığı sorguların sayacı
+_orchestration_counters = {"llm": 0, "fast_path": 0}
+_orchestration_counters_lock = threading.Lock()
+
+def _count_orchestration(path: str):
+    with _orchestration_counters_lock:
+        _orchestration_counters[path] += 1
+
+@stage_timer.timed("orchestrate_fast_path")
+def _build_default_plan(db: Session, user_query: UserQuery, potential_tasks: list[dict],
+                        candidates_map: dict[str, list[dict]], language: str) -> dict | None:
+    """
+    Sorgu tek bir göreve ayrıştıysa ve bu görevin tek bir güçlü adayı varsa, aynı prediction'ı
+    tek başına kullanan, aynı dildeki önceki bir sorgunun render planını yeniden kullanır. Plan
+    orkestratörün o dil için ürettiği plandır; yalnızca yer tutucu adı bu sorguya taşınır.
+    Diğer tüm durumlarda (birden fazla görev, yeni prediction, belirsiz eşleme, kayıtlı plan
+    yok) None döner ve plan LLM ile kurulur.
+    """
+    if len(potential_tasks) != 1:
+        return None
+    candidates = candidates_map.get(potential_tasks[0]["prompt"], [])
+    if len(candidates) != 1:
+        return None
+    prediction_id = candidates[0]["id"]
+
+    single_prediction_queries = (
+        db.query(TemplatePredictionsLink.query_id)
+        .group_by(TemplatePredictionsLink.query_id)
+        .having(func.count(TemplatePredictionsLink.id) == 1)
+    )
+    rows = (
+        db.query(UserQuery.answer_template_text, TemplatePredictionsLink.placeholder_name)
+        .join(TemplatePredictionsLink, TemplatePredictionsLink.query_id == UserQuery.id)
+        .filter(TemplatePredictionsLink.prediction_id == prediction_id,
+                UserQuery.language == language,
+                UserQuery.id != user_query.id,
+                UserQuery.id.in_(single_prediction_queries))
+        .order_by(UserQuery.id.desc())
+        .limit(5)
+        .all()
+    )
+    for render_plan, placeholder in rows:
+        if render_plan and any(step.get("placeholder") == placeholder for step in render_plan):
+            return {"render_plan": [dict(step) for step in render_plan],
+                    "predictions": [{"placeholder_name": placeholder, "reuse_prediction_id": prediction_id}]}
+    return None
+
+def orchestration_stats() -> dict:
+    """
+    Orkestrasyonun LLM ile ve hızlı yoldan yapıldığı sorgu sayıları. Kazanılan süre, gözlenen
+    ortalama LLM orkestrasyon süresi ile hızlı yol süresinin farkı üzerinden tahmin edilir.
+    """
+    with _orchestration_counters_lock:
+        counters = dict(_orchestration_counters)
+    timings = stage_timer.summary()
+    llm_mean = timings.get("orchestrate_tasks_and_plan", {}).get("mean", 0.0)
+    fast_mean = timings.get("orchestrate_fast_path", {}).get("mean", 0.0)
+    total = counters["llm"] + counters["fast_path"]
+    return {
+        "llm_calls": counters["llm"],
+        "fast_path": counters["fast_path"],
+        "fast_path_ratio": counters["fast_path"] / total if total else 0.0,
+        "llm_mean_seconds": llm_mean,
+        "estimated_seconds_saved": counters["fast_path"] * max(llm_mean - fast_mean, 0.0),
+    }
+
+def log_orchestration_stats(label: str):
+    stats = orchestration_stats()
+    logger.info(f"[{label}] Orchestration: {stats['fast_path']} fast-path / {stats['llm_calls']} LLM "
+                f"({stats['fast_path_ratio']:.0%} avoided), ~{stats['estimated_seconds_saved']:.1f}s saved "
+                f"(LLM mean {stats['llm_mean_seconds']:.2f}s).")
+
+@stage_timer.timed("_process_query_logic")
 def _process_query_logic(db: Session, user_query: UserQuery):
     """
     Bir UserQuery objesi alır ve Analist-Orkestratör mantığını çalıştırarak
     cevabı oluşturur ve veritabanını günceller. Hem yeni hem de güncellenen
     sorgular için ortak mantığı içerir.
     """
+    for _ in _process_query_steps(db, user_query):
+        pass
+
+def _process_query_steps(db: Session, user_query: UserQuery) -> Iterator[dict]:
+    """
+    _process_query_logic'in adım adım çalışan hali. Cevap parçalarını hazır oldukça verir:
+
+    - {"type": "plan", "sections": [...]}: orkestrasyon biter bitmez; render planının her adımı
+      için metin (paragraflar hemen dolu) veya henüz doldurulmamış yer tutucular için None.
+    - {"type": "placeholder", "placeholder": ..., "sections": {adım indeksi: metin}}: bir
+      prediction (yeniden kullanılan veya fulfill_prediction ile yeni doldurulan) hazır olduğunda.
+    - {"type": "final", "final_answer": ...}: cevap birleştirilip kaydedildikten sonra.
+    """
+    started_at = time.perf_counter()
     query_text = user_query.query_text
 
     # AŞAMA 1: ANALİZ
@@ -277,12 +705,13 @@ def _process_query_logic(db: Session, user_query: UserQuery):
     for task in potential_tasks:
         prompt = task['prompt']
         keywords = task['keywords']
-        candidate_ids = vector_store.find_similar_predictions(prompt, keywords, top_k=3)
-        if candidate_ids:
-            candidates = db.query(Prediction).filter(Prediction.id.in_(candidate_ids)).all()
+        candidates = vector_store.find_candidate_predictions(db, prompt, keywords, top_k=3)
+        if candidates:
             strong_candidates = []
-            for cand in candidates:
-                similarity = get_cosine_similarity(prompt, cand.prediction_prompt)
+            prompt_emb = encode_normalized([prompt])[0]
+            cand_prompt_embs, _, _ = _load_prediction_vectors(candidates)
+            similarities = cand_prompt_embs @ prompt_emb
+            for cand, similarity in zip(candidates, similarities):
                 if similarity >= SEMANTIC_MATCH_THRESHOLD:
                     strong_candidates.append({"id": cand.id, "prompt": cand.prediction_prompt})
             candidates_map[prompt] = strong_candidates
@@ -290,7 +719,14 @@ def _process_query_logic(db: Session, user_query: UserQuery):
             candidates_map[prompt] = []
 
     # AŞAMA 3: ORKESTRASYON
-    decomposition = llm_gateway.orchestrate_tasks_and_plan(query_text, potential_tasks, candidates_map)
+    # Tek görev daha önce cevaplanmış tek bir prediction'a eşleniyorsa kayıtlı plan LLM'siz yeniden kullanılır
+    decomposition = (_build_default_plan(db, user_query, potential_tasks, candidates_map, user_lang)
+                     if config.ORCHESTRATION_FAST_PATH else None)
+    if decomposition is not None:
+        _count_orchestration("fast_path")
+    else:
+        _count_orchestration("llm")
+        decomposition = llm_gateway.orchestrate_tasks_and_plan(query_text, potential_tasks, candidates_map)
     render_plan = decomposition.get('render_plan', [])
     prediction_specs = decomposition.get('predictions', [])
 
@@ -299,122 +735,273 @@ def _process_query_logic(db: Session, user_query: UserQuery):
 
     user_query.answer_template_text = render_plan
 
+    # Planın hemen gösterilebilen kısmı: yer tutucusu olmayan adımlar
+    context = {}
+    steps_by_placeholder: dict[str, list[int]] = {}
+    sections = []
+    for index, step in enumerate(render_plan):
+        if step.get("type") == "list":
+            steps_by_placeholder.setdefault(step.get("placeholder"), []).append(index)
+            sections.append(None)
+        else:
+            sections.append("\n".join(_render_step(step, context)))
+    stage_timer.record("query.time_to_first_content", time.perf_counter() - started_at)
+    yield {"type": "plan", "query_id": user_query.id, "sections": sections}
+
+    def placeholder_event(placeholder: str, value) -> dict:
+        context[placeholder] = value
+        return {"type": "placeholder", "query_id": user_query.id, "placeholder": placeholder,
+                "sections": {index: "\n".join(_render_step(render_plan[index], context))
+                             for index in steps_by_placeholder.get(placeholder, [])}}
+
     # AŞAMA 4: PLANI UYGULAMA
+    # Yeniden kullanılan prediction'lar hemen hazırdır (çeviri gerekenler birleştirme aşamasında dolar)
+    new_prediction_metas: list[tuple[int, str, str]] = []
+    new_specs, fulfill_requests = [], []
     for spec in prediction_specs:
         placeholder = spec['placeholder_name']
-        prediction = None
         if "reuse_prediction_id" in spec:
             prediction = db.query(Prediction).get(spec["reuse_prediction_id"])
-        
+            if prediction:
+                db.add(TemplatePredictionsLink(query_id=user_query.id, prediction_id=prediction.id, placeholder_name=placeholder))
+                if not _needs_translation(prediction, user_lang):
+                    yield placeholder_event(placeholder, _placeholder_value(prediction, user_lang))
         elif "new_prediction_prompt" in spec:
-            prompt = spec["new_prediction_prompt"]
-            keywords = spec.get("keywords", [])
-            
-            context_hits = vector_store.query_document_metas(prompt, keywords, n_results=5)
-            if context_hits:
-                context_texts = [h['text'] for h in context_hits]
-                llm_output = llm_gateway.fulfill_prediction(prompt, context_texts)
+            # Yeni prediction'lar için bağlam toplanır ve tüm doldurma çağrıları eşzamanlı yapılır
+            context_chunks = _gather_context_chunks(spec["new_prediction_prompt"], spec.get("keywords", []))
+            if context_chunks:
+                new_specs.append(spec)
+                fulfill_requests.append({"prediction_prompt": spec["new_prediction_prompt"], "context_chunks": context_chunks})
             else:
-                llm_output = {"is_translatable": False, "data": {"error": "not_found", "message": "Kaynak dokümanlarda bilgi bulunamadı."}}
-            
-            new_value = {
-                "is_translatable": llm_output.get("is_translatable", False),
-                "content": {user_lang: llm_output.get("data")}
-            }
-            
-            # Prediction objesi, isimlendirilmiş argümanlarla (keyword arguments) oluşturuldu.
-            prediction = Prediction(
-                prediction_prompt=prompt,
-                predicted_value=new_value,
-                base_language_code=user_lang,
-                keywords=keywords,
-                status="FULFILLED",
-                last_updated=datetime.now(timezone.utc)
-            )
-            db.add(prediction)
-            db.commit()
-            db.refresh(prediction)
-            vector_store.add_prediction_meta(prediction.id, "prompt_text", prompt, create_embedding(prompt))
-            for kw in keywords:
-                if kw:
-                    vector_store.add_prediction_meta(prediction.id, "keyword", kw, create_embedding(kw))
+                yield placeholder_event(placeholder, _store_new_prediction(db, user_query, spec, None, new_prediction_metas))
 
-        if prediction:
-            db.add(TemplatePredictionsLink(query_id=user_query.id, prediction_id=prediction.id, placeholder_name=placeholder))
+    for request_index, llm_output in async_llm_gateway.fulfill_predictions_as_completed(fulfill_requests):
+        spec = new_specs[request_index]
+        yield placeholder_event(spec['placeholder_name'], _store_new_prediction(db, user_query, spec, llm_output, new_prediction_metas))
 
     db.commit()
+    # Yeni prediction'ların prompt ve anahtar kelimeleri tek forward pass ile embed edilip tek yazımda kaydedilir
+    if new_prediction_metas:
+        vector_store.add_prediction_metas(new_prediction_metas, create_embeddings([value for _, _, value in new_prediction_metas]))
     db.refresh(user_query, ['predictions'])
 
     # AŞAMA 5: CEVABI BİRLEŞTİR
     user_query.final_answer = _assemble_final_answer(db, user_query)
     user_query.answer_last_updated = datetime.now(timezone.utc)
+    user_query.processing_error = None
     db.commit()
+    answer_events.publish_updates([(user_query.id, user_query.answer_last_updated)])
+    embedding_cache.log_stats("_process_query_logic")
+    if llm_response_cache is not None:
+        llm_response_cache.log_stats("_process_query_logic")
+    log_orchestration_stats("_process_query_logic")
+    yield {"type": "final", "query_id": user_query.id, "final_answer": user_query.final_answer}
+
+def _store_new_prediction(db: Session, user_query: UserQuery, spec: dict, llm_output: dict | None,
+                          new_prediction_metas: list[tuple[int, str, str]]):
+    """
+    fulfill_prediction çıktısından yeni bir Prediction oluşturup sorguya bağlar ve yer tutucunun
+    kullanıcı dilindeki değerini döndürür. Embed edilecek prompt/anahtar kelimeler listeye eklenir.
+    """
+    prompt = spec["new_prediction_prompt"]
+    keywords = spec.get("keywords", [])
+    user_lang = user_query.language
 
-def handle_new_query(query_text: str) -> int | None:
-    """Yeni bir kullanıcı sorgusu oluşturur ve işler."""
-    logger.info(f"Handling new query: '{query_text}'")
-    db: Session = next(get_db())
+    llm_output = llm_output or {"is_translatable": False, "data": {"error": "not_found", "message": "Kaynak dokümanlarda bilgi bulunamadı."}}
+    
+    new_value = {
+        "is_translatable": llm_output.get("is_translatable", False),
+        "content": {user_lang: llm_output.get("data")}
+    }
+    
+    # Prediction objesi, isimlendirilmiş argümanlarla (keyword arguments) oluşturuldu.
+    prediction = Prediction(
+        prediction_prompt=prompt,
+        predicted_value=new_value,
+        base_language_code=user_lang,
+        keywords=keywords,
+        status="FULFILLED",
+        last_updated=datetime.now(timezone.utc)
+    )
+    db.add(prediction)
+    db.commit()
+    db.refresh(prediction)
+    new_prediction_metas.append((prediction.id, "prompt_text", prompt))
+    new_prediction_metas.extend((prediction.id, "keyword", kw) for kw in keywords if kw)
+
+    db.add(TemplatePredictionsLink(query_id=user_query.id, prediction_id=prediction.id, placeholder_name=spec['placeholder_name']))
+    return _placeholder_value(prediction, user_lang)
+
+# --- Arka plan görevleri ---
+# Uzun LLM zincirleri istek sürecini (Streamlit/CLI) bloklamamak için görev kuyruğunda çalışır.
+# Görev argümanları JSON ile serileştirilebilir olmalıdır (yalnızca ID'ler ve dosya yolları).
+
+def _record_query_failure(query_id: int, error: Exception):
+    """
+    İşleme hatasını sorguya yazar ve 'query_failed' olayını yayınlar; böylece arayüz ve API
+    başarısız sorguyu hâlâ işlenmekte olan sorgudan ayırt edebilir.
+    """
+    message = f"{type(error).__name__}: {error}"
     try:
-        user_query = UserQuery(query_text=query_text, is_subscribed=True)
-        db.add(user_query)
-        db.commit()
-        db.refresh(user_query)
-        
-        _process_query_logic(db, user_query)
+        with session_scope() as db:
+            db.query(UserQuery).filter(UserQuery.id == query_id).update({"processing_error": message}, synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        logger.error(f"Could not record failure of query ID {query_id}: {e}", exc_info=True)
+        return
+    answer_events.publish([{"type": "query_failed", "query_id": query_id, "error": message}])
+
+@task_queue.task
+def process_query_task(query_id: int) -> int | None:
+    """Kaydedilmiş bir UserQuery için Analist-Orkestratör mantığını çalıştırır; hata sorguya kaydedilir."""
+    try:
+        with thread_session_scope() as db:
+            user_query = db.query(UserQuery).filter(UserQuery.id == query_id).first()
+            if not user_query:
+                logger.warning(f"process_query_task: UserQuery ID {query_id} not found.")
+                return None
+            _process_query_logic(db, user_query)
+            return user_query.id
+    except Exception as e:
+        logger.error(f"Error processing query ID {query_id}: {e}", exc_info=True)
+        _record_query_failure(query_id, e)
+        return None
+
+@task_queue.task
+def ingest_document_task(file_path: str):
+    handle_new_document(file_path)
 
-        print(f"\n--- NİHAİ CEVAP (ID: {user_query.id}) ---\n{user_query.final_answer}\n-----------------------\n")
-        return user_query.id
+def handle_new_query(query_text: str, wait: bool = False) -> int | None:
+    """
+    Yeni bir kullanıcı sorgusu oluşturur ve ID'sini döndürür.
+
+    Varsayılan olarak cevap, görev kuyruğunda arka planda oluşturulur; sorgu o zamana kadar
+    `final_answer` alanı boş olarak bekler. `wait=True` ise işlem bu süreçte tamamlanır.
+    """
+    logger.info(f"Handling new query: '{query_text}'")
+    try:
+        with session_scope() as db:
+            user_query = UserQuery(query_text=query_text, is_subscribed=True)
+            db.add(user_query)
+            db.commit()
+            db.refresh(user_query)
+            query_id = user_query.id
     except Exception as e:
         logger.error(f"Error in handle_new_query: {e}", exc_info=True)
-        db.rollback()
         return None
+
+    return _run_query_processing(query_id, wait)
+
+def stream_new_query(query_text: str) -> Iterator[dict]:
+    """
+    Yeni bir sorgu oluşturur ve cevabı bu süreçte, parça parça üreterek verir (bkz.
+    _process_query_steps). İlk olay {"type": "created", "query_id": ...}; hata durumunda
+    akış {"type": "error", "message": ...} ile biter. Jeneratör erken kapatılırsa işlem yarıda kalır.
+    """
+    logger.info(f"Streaming new query: '{query_text}'")
+    query_id = None
+    try:
+        with session_scope() as db:
+            user_query = UserQuery(query_text=query_text, is_subscribed=True)
+            db.add(user_query)
+            db.commit()
+            db.refresh(user_query)
+            query_id = user_query.id
+            yield {"type": "created", "query_id": query_id}
+            yield from _process_query_steps(db, user_query)
+    except Exception as e:
+        logger.error(f"Error streaming query ID {query_id}: {e}", exc_info=True)
+        if query_id is not None:
+            _record_query_failure(query_id, e)
+        yield {"type": "error", "query_id": query_id, "message": str(e)}
+
+async def astream_new_query(query_text: str) -> AsyncIterator[dict]:
+    """
+    stream_new_query'nin asenkron karşılığı. Jeneratörün tamamı tek bir özel iş parçacığında
+    çalışır, böylece veritabanı oturumu iş parçacıkları arasında taşınmaz; olaylar event loop'a
+    bir asyncio kuyruğu üzerinden aktarılır. Tüketici erken çıkarsa jeneratör bir sonraki adımda durur.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def hand_over(item):
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, item)
+        except RuntimeError:
+            # Event loop kapandı; tüketici yok
+            stop.set()
+
+    def produce():
+        steps = stream_new_query(query_text)
+        try:
+            for event in steps:
+                if stop.is_set():
+                    break
+                hand_over(event)
+        finally:
+            steps.close()
+            hand_over(done)
+
+    threading.Thread(target=produce, name="query-stream", daemon=True).start()
+    try:
+        while (event := await events.get()) is not done:
+            yield event
     finally:
-        db.close()
+        stop.set()
 
-def update_query_text(query_id: int, new_query_text: str) -> int | None:
-    """Mevcut bir sorgunun metnini günceller ve tüm süreci yeniden çalıştırır."""
+def update_query_text(query_id: int, new_query_text: str, wait: bool = False) -> int | None:
+    """Mevcut bir sorgunun metnini günceller ve tüm süreci (varsayılan olarak arka planda) yeniden çalıştırır."""
     logger.info(f"Updating UserQuery ID {query_id} with new text: '{new_query_text}'")
-    db: Session = next(get_db())
     try:
-        user_query = db.query(UserQuery).filter(UserQuery.id == query_id).first()
-        if not user_query:
-            logger.warning(f"Update failed: UserQuery ID {query_id} not found.")
-            return None
+        with session_scope() as db:
+            user_query = db.query(UserQuery).filter(UserQuery.id == query_id).first()
+            if not user_query:
+                logger.warning(f"Update failed: UserQuery ID {query_id} not found.")
+                return None
         
-        # 1. Eski bağlantıları temizle
-        db.query(TemplatePredictionsLink).filter(TemplatePredictionsLink.query_id == query_id).delete(synchronize_session=False)
+            # 1. Eski bağlantıları temizle
+            db.query(TemplatePredictionsLink).filter(TemplatePredictionsLink.query_id == query_id).delete(synchronize_session=False)
         
-        # 2. Sorgu metnini güncelle
-        user_query.query_text = new_query_text
-        db.commit()
-        db.refresh(user_query)
-
-        # 3. Ana mantığı güncellenmiş obje ile yeniden çalıştır
-        _process_query_logic(db, user_query)
-
-        print(f"\n--- GÜNCELLENMİŞ CEVAP (ID: {user_query.id}) ---\n{user_query.final_answer}\n-----------------------\n")
-        return user_query.id
+            # 2. Sorgu metnini güncelle, eski cevap yeni cevap gelene kadar bekliyor olarak işaretlenir
+            user_query.query_text = new_query_text
+            user_query.final_answer = None
+            user_query.processing_error = None
+            db.commit()
     except Exception as e:
         logger.error(f"Error updating query ID {query_id}: {e}", exc_info=True)
-        db.rollback()
         return None
-    finally:
-        db.close()
 
-def update_user_query_subscription(query_id: int, subscribe: bool):
-    """Kullanıcının bir sorgu için güncelleme aboneliğini değiştirir."""
-    db: Session = next(get_db())
+    # 3. Ana mantığı güncellenmiş sorgu ile yeniden çalıştır
+    return _run_query_processing(query_id, wait)
+
+def _run_query_processing(query_id: int, wait: bool) -> int | None:
+    if not wait:
+        process_query_task.delay(query_id)
+        logger.info(f"UserQuery ID {query_id} enqueued for processing.")
+        return query_id
+
+    if process_query_task(query_id) is None:
+        return None
+    with session_scope() as db:
+        final_answer = db.query(UserQuery.final_answer).filter(UserQuery.id == query_id).scalar()
+        print(f"\n--- NİHAİ CEVAP (ID: {query_id}) ---\n{final_answer}\n-----------------------\n")
+    return query_id
+
+def update_user_query_subscription(query_id: int, subscribe: bool) -> bool:
+    """Kullanıcının bir sorgu için güncelleme aboneliğini değiştirir; sorgu bulunamazsa False döner."""
     try:
-        user_query = db.query(UserQuery).filter(UserQuery.id == query_id).first()
-        if user_query:
-            user_query.is_subscribed = subscribe
-            db.add(user_query)
-            db.commit()
-            logger.info(f"UserQuery ID {query_id} subscription status updated to {subscribe}.")
-        else:
-            logger.warning(f"UserQuery ID {query_id} not found for subscription update.")
+        with session_scope() as db:
+            user_query = db.query(UserQuery).filter(UserQuery.id == query_id).first()
+            if user_query:
+                user_query.is_subscribed = subscribe
+                db.add(user_query)
+                db.commit()
+                logger.info(f"UserQuery ID {query_id} subscription status updated to {subscribe}.")
+                return True
+            else:
+                logger.warning(f"UserQuery ID {query_id} not found for subscription update.")
     except Exception as e:
         logger.error(f"Error updating subscription: {e}", exc_info=True)
-        db.rollback()
-    finally:
-        db.close()
\ No newline at end of file
+    return False
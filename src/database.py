@@ -1,9 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON, DateTime
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON, DateTime, Index, LargeBinary, text
 from sqlalchemy.ext.mutable import MutableDict, MutableList
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
+from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session, relationship, Session
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import func
+from contextlib import contextmanager
+from typing import Dict, Iterator
 from src import config
+from src.metrics import stage_timer
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -31,14 +37,22 @@ class UserQuery(Base):
     answer_template_text = Column(MutableList.as_mutable(JSON), nullable=True) 
     final_answer = Column(Text, nullable=True)
     answer_last_updated = Column(DateTime(timezone=True), nullable=True)
+    # Arka planda işleme başarısız olduysa hata mesajı; cevabı bekleyen sorgudan ayırt etmek için
+    processing_error = Column(Text, nullable=True)
 
     predictions = relationship("TemplatePredictionsLink", back_populates="user_query", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # AnswerMonitor.get_updated_answers_since: sadece abone olunmuş sorgular taranır
+        Index("ix_userqueries_subscribed_answer_last_updated", "answer_last_updated", postgresql_where=text("is_subscribed")),
+    )
+
 class Prediction(Base):
     __tablename__ = "predictions"
     id = Column(Integer, primary_key=True)
     base_language_code = Column(String(8), nullable=False, default="en")    
-    prediction_prompt = Column(String, nullable=False, unique=True)
+    # Teklik, PostgreSQL'de uzun prompt'larda B-tree satır sınırına takılmamak için md5 özeti üzerinden sağlanır (aşağıda)
+    prediction_prompt = Column(String, nullable=False)
     predicted_value = Column(MutableDict.as_mutable(JSON), nullable=True)
     status = Column(String, nullable=True)
     last_updated = Column(DateTime(timezone=True), nullable=True)
@@ -49,6 +63,16 @@ class Prediction(Base):
     
     user_queries = relationship("TemplatePredictionsLink", back_populates="prediction")
 
+    __table_args__ = (
+        Index("ix_predictions_status", "status"),
+    )
+
+# md5() PostgreSQL'e özgüdür; diğer veritabanlarında (ör. SQLite ile benchmark) teklik doğrudan prompt üzerinden sağlanır
+Index("ux_predictions_prompt_md5", func.md5(Prediction.prediction_prompt), unique=True).ddl_if(dialect="postgresql")
+Index("ux_predictions_prompt", Prediction.prediction_prompt, unique=True).ddl_if(
+    callable_=lambda ddl, target, bind, dialect=None, **kw: dialect is not None and dialect.name != "postgresql"
+)
+
 
 class TemplatePredictionsLink(Base):
     __tablename__ = 'template_predictions_link'
@@ -60,11 +84,68 @@ class TemplatePredictionsLink(Base):
     user_query = relationship("UserQuery", back_populates="predictions")
     prediction = relationship("Prediction", back_populates="user_queries")
 
-engine = create_engine(config.POSTGRES_DB_URL)
+    __table_args__ = (
+        Index("ix_template_predictions_link_prediction_query", "prediction_id", "query_id"),
+        Index("ix_template_predictions_link_query_id", "query_id"),
+    )
+
+class DocumentFullVector(Base):
+    """
+    Doküman ve parça vektörleri kesilmiş/düşük hassasiyetli saklandığında, aday yeniden
+    puanlamasında kullanılan tam boyutlu, normalize float32 kopyaları. ID, vektör deposundaki
+    parça ID'sidir; tablo indekslenmez, sadece ID ile okunur.
+    """
+    __tablename__ = 'document_full_vectors'
+    id = Column(String(255), primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)
+
+class InstrumentedQueuePool(QueuePool):
+    """Havuzdan bağlantı alma (checkout) bekleme süresini 'db.pool_checkout_wait' aşaması olarak kaydeder."""
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stage_timer.record("db.pool_checkout_wait", time.perf_counter() - started_at)
+
+engine = create_engine(
+    config.POSTGRES_DB_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Paralel yollardaki (ingest güncelleme iş parçacıkları, yerel görev kuyruğu) iş parçacığı başına oturum
+ScopedSession = scoped_session(SessionLocal)
+
+_pool_counters = {"connects": 0, "checkouts": 0, "invalidations": 0}
+_pool_counters_lock = threading.Lock()
+
+def _count_pool_event(name: str):
+    def listener(*args):
+        with _pool_counters_lock:
+            _pool_counters[name] += 1
+    return listener
+
+event.listen(engine, "connect", _count_pool_event("connects"))
+event.listen(engine, "checkout", _count_pool_event("checkouts"))
+event.listen(engine, "invalidate", _count_pool_event("invalidations"))
 
 def create_tables():
+    from src.migrations import run_migrations, stamp_migrations
+
+    existing_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
+    if existing_tables.isdisjoint(Base.metadata.tables):
+        # Şema modellerden yeni oluşturuldu; migration'lar DDL çalıştırılmadan uygulanmış sayılır
+        stamp_migrations(engine)
+    else:
+        # Mevcut PostgreSQL veritabanlarını modellerdeki indeks ve sütunlara getirir
+        run_migrations(engine)
     logger.info("Database tables created or already exist.")
 
 def get_db():
@@ -72,4 +153,67 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Kısa ömürlü bir oturum açar; hata durumunda rollback yapar ve her durumda kapatıp
+    bağlantıyı havuza iade eder. Commit, önceden olduğu gibi çağıranın sorumluluğundadır.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+_thread_state = threading.local()
+
+@contextmanager
+def thread_session_scope() -> Iterator[Session]:
+    """
+    session_scope'un iş parçacığı başına (scoped) oturum kullanan hali. Aynı iş parçacığında
+    iç içe çağrılar aynı oturumu paylaşır; en dıştaki çağrı bitince oturum kapatılır.
+    """
+    db = ScopedSession()
+    depth = getattr(_thread_state, "depth", 0)
+    _thread_state.depth = depth + 1
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        _thread_state.depth = depth
+        if depth == 0:
+            ScopedSession.remove()
+
+def pool_stats() -> Dict[str, float]:
+    """Bağlantı havuzunun anlık durumu ve checkout bekleme süresi yüzdelikleri."""
+    pool = engine.pool
+    wait = stage_timer.summary().get("db.pool_checkout_wait", {})
+    with _pool_counters_lock:
+        counters = dict(_pool_counters)
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_connections": pool.size() + config.DB_MAX_OVERFLOW,
+        **counters,
+        "checkout_wait_p50_ms": wait.get("p50", 0.0) * 1000,
+        "checkout_wait_p95_ms": wait.get("p95", 0.0) * 1000,
+        "checkout_wait_p99_ms": wait.get("p99", 0.0) * 1000,
+    }
+
+def log_pool_stats(label: str):
+    s = pool_stats()
+    logger.info(
+        f"[{label}] DB pool: {s['checked_out']} checked out / {s['checked_in']} idle "
+        f"(size {s['pool_size']}, overflow {s['overflow']}, max {s['max_connections']}), "
+        f"{s['connects']} connects, {s['checkouts']} checkouts, {s['invalidations']} invalidations, "
+        f"checkout wait p95 {s['checkout_wait_p95_ms']:.1f} ms."
+    )
\ No newline at end of file
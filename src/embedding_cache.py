@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: dosya kilidi yok, disk katmanı tek süreç varsayar
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Embedding vektörleri için içerik adresli, iki katmanlı (bellek + disk) önbellek.
+    Anahtar, model adı ve metnin SHA-256 özetidir; aynı metin aynı model ile
+    tekrar tekrar encode edilmez.
+
+    Disk katmanı iki dosyadan oluşur:
+      - vectors.f32: satır satır eklenen, memory-map ile okunan float32 matris
+      - index.tsv:   "<anahtar>\t<satır>" biçiminde ofset indeksi
+
+    Birden fazla süreç aynı dizini paylaşabilir: yazmalar write.lock üzerindeki
+    fcntl.flock altında yapılır ve satır numarası dosyanın gerçek sonundan alınır.
+    Diğer süreçlerin eklediği satırlar, bilinmeyen bir anahtar sorulduğunda index.tsv'nin
+    yeni kısmı okunarak yüklenir.
+    """
+
+    MATRIX_FILE = "vectors.f32"
+    INDEX_FILE = "index.tsv"
+    META_FILE = "meta.json"
+    LOCK_FILE = "write.lock"
+
+    def __init__(self, model_name: str, cache_dir: Optional[str] = None, max_memory_items: int = 10000):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk_index: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._index_offset = 0  # index.tsv'nin okunmuş bayt sayısı
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            self._load_disk_index()
+
+    # --- Anahtar üretimi ---
+
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    # --- Disk katmanı ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Aynı dizini paylaşan süreçler arasında yazmaları sıraya sokan özel kilit."""
+        with open(self._path(self.LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self) -> bool:
+        """meta.json'ı okur; önbellek başka bir modele aitse disk katmanını kapatıp False döner."""
+        meta_path = self._path(self.META_FILE)
+        if self._dim is None and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model_name") != self.model_name:
+                logger.warning(f"Embedding cache at '{self.cache_dir}' belongs to model '{meta.get('model_name')}', ignoring disk tier.")
+                self.cache_dir = None
+                return False
+            self._dim = meta.get("dim")
+        return True
+
+    def _load_disk_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self._read_meta():
+            self._refresh_disk_index()
+            logger.info(f"Embedding cache disk tier loaded with {len(self._disk_index)} vectors from '{self.cache_dir}'.")
+
+    def _refresh_disk_index(self) -> bool:
+        """
+        index.tsv'ye son okumadan beri eklenen satırları (diğer süreçlerin yazdıkları dahil)
+        indekse ekler. Yeni satır bulunduysa True döner.
+        """
+        if not self._read_meta() or not self._dim:
+            return False
+        index_path = self._path(self.INDEX_FILE)
+        if not os.path.exists(index_path) or os.path.getsize(index_path) <= self._index_offset:
+            return False
+
+        with open(index_path, "rb") as f:
+            f.seek(self._index_offset)
+            chunk = f.read()
+        # Satırlar vektörler yazıldıktan sonra eklenir; matris boyutu indeks okunduktan sonra alınmalı
+        matrix_rows = os.path.getsize(self._path(self.MATRIX_FILE)) // (self._dim * 4)
+        # Henüz tamamlanmamış son satır bir sonraki okumaya bırakılır
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._index_offset += len(complete)
+        found = False
+        for line in complete.decode("utf-8").splitlines():
+            parts = line.split("\t")
+            # Yarım yazılmış satırları (ör. süreç kesintisi) yok say
+            if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < matrix_rows:
+                self._disk_index[parts[0]] = int(parts[1])
+                found = True
+        if found:
+            self._matrix = None
+        return found
+
+    def _open_matrix(self) -> Optional[np.memmap]:
+        if self._matrix is None and self._disk_index:
+            rows = max(self._disk_index.values()) + 1
+            self._matrix = np.memmap(self._path(self.MATRIX_FILE), dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def _write_to_disk(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._file_lock():
+            # Kilit beklenirken diğer süreçler meta.json'ı oluşturmuş veya aynı vektörleri yazmış olabilir
+            self._refresh_disk_index()
+            if self.cache_dir is None:
+                return
+            items = {key: vector for key, vector in items.items() if key not in self._disk_index}
+            if not items:
+                return
+            if self._dim is None:
+                self._dim = int(next(iter(items.values())).shape[0])
+                with open(self._path(self.META_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"model_name": self.model_name, "dim": self._dim}, f)
+
+            row_bytes = self._dim * 4
+            index_lines = []
+            with open(self._path(self.MATRIX_FILE), "ab") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end % row_bytes:
+                    # Kesintiye uğramış bir yazmanın yarım satırı: kesilip üzerine yazılır
+                    end -= end % row_bytes
+                    f.truncate(end)
+                next_row = end // row_bytes
+                for key, vector in items.items():
+                    f.write(np.asarray(vector, dtype=np.float32).tobytes())
+                    index_lines.append(f"{key}\t{next_row}\n")
+                    next_row += 1
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._path(self.INDEX_FILE), "a", encoding="utf-8") as f:
+                f.writelines(index_lines)
+            # Kendi yazdığımız satırlar da indeks dosyasından okunur; ofset takibi tek yoldan ilerler
+            self._refresh_disk_index()
+        # Matris büyüdü; bir sonraki okumada yeniden map'lenecek
+        self._matrix = None
+
+    # --- Bellek katmanı ---
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # --- Genel API ---
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Her metin için önbellekteki vektörü ya da None döndürür."""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            refreshed = False
+            for text in texts:
+                key = self.make_key(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results.append(vector)
+                    continue
+                if key not in self._disk_index and self.cache_dir and not refreshed:
+                    # Diğer süreçlerin eklediği satırlar çağrı başına en fazla bir kez yüklenir
+                    self._refresh_disk_index()
+                    refreshed = True
+                if key in self._disk_index and self._open_matrix() is not None:
+                    vector = np.array(self._matrix[self._disk_index[key]])
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Yeni hesaplanan vektörleri her iki katmana da yazar."""
+        with self._lock:
+            new_disk_items = {}
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                if self.cache_dir and key not in self._disk_index:
+                    new_disk_items[key] = vector
+            if self.cache_dir:
+                try:
+                    self._write_to_disk(new_disk_items)
+                except OSError as e:
+                    logger.warning(f"Failed to persist embeddings to disk cache: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._disk_index),
+        }
+
+    def log_stats(self, label: str):
+        s = self.stats()
+        logger.info(
+            f"[{label}] Embedding cache: {s['memory_hits']} memory hits, {s['disk_hits']} disk hits, "
+            f"{s['misses']} misses (hit rate {s['hit_rate']:.1%})."
+        )
@@ -0,0 +1,253 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List
+
+from src import config
+from src.core_logic import (
+    _parse_document_file, _document_embedding_texts, _store_document, _find_and_rerank_relevant_predictions,
+    _apply_document_to_prediction, _regenerate_answers_for_predictions
+)
+from src.database import session_scope, thread_session_scope, pool_stats, log_pool_stats, Document, Prediction
+from src.processing import create_embeddings, embedding_cache
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class KeyedSerialExecutor:
+    """
+    Aynı anahtara sahip görevleri gönderim sırasıyla (birbiri ardına), farklı anahtarlara
+    sahip görevleri ise paralel çalıştıran küçük bir iş havuzu. Bir Prediction'a ait
+    güncellemelerin doküman yayın sırasını korumasını sağlar.
+    """
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pred-update")
+        self._tails: Dict[Hashable, Future] = {}
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable, *args) -> Future:
+        result = Future()
+
+        def run():
+            try:
+                result.set_result(fn(*args))
+            except BaseException as e:
+                result.set_exception(e)
+            finally:
+                with self._lock:
+                    if self._tails.get(key) is result:
+                        del self._tails[key]
+                    self._pending.discard(result)
+
+        with self._lock:
+            previous = self._tails.get(key)
+            self._tails[key] = result
+            self._pending.add(result)
+
+        if previous is None:
+            self._executor.submit(run)
+        else:
+            # Aynı anahtardaki önceki görev bitince kuyruğa girer (bitmişse hemen çağrılır)
+            previous.add_done_callback(lambda _: self._executor.submit(run))
+        return result
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def join(self):
+        """Zincirlenmiş görevler dahil tüm işler bitene kadar bekler ve havuzu kapatır."""
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                break
+            wait(pending)
+        self._executor.shutdown(wait=True)
+
+class IngestionPipeline:
+    """
+    Bir klasördeki dokümanları aşamalı ve kısmen paralel olarak içeri aktarır:
+
+      1. parse/dedupe  -> frontmatter ayrıştırma, URL tekilleştirme
+      2. embedding     -> metadata ve gövde parçaları batch_size dokümanlık gruplar halinde tek forward pass ile
+      3. store         -> PostgreSQL + vektör deposu yazımı ve prediction yeniden sıralaması (tek yazıcı)
+      4. update        -> prediction güncellemeleri `workers` iş parçacığında; aynı prediction'a
+                          ait güncellemeler doküman sırasını korur
+
+    Cevaplar, tüm güncellemeler bittikten sonra etkilenen prediction'lar için bir kez yeniden oluşturulur.
+    """
+
+    def __init__(self, workers: int = config.INGEST_WORKERS, batch_size: int = config.INGEST_BATCH_SIZE,
+                 report_interval: float = 5.0):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.report_interval = report_interval
+
+        self._embed_queue: "queue.Queue" = queue.Queue(maxsize=self.batch_size * 4)
+        self._store_queue: "queue.Queue" = queue.Queue(maxsize=self.batch_size * 4)
+        self._updates = KeyedSerialExecutor(self.workers)
+        self._updated_prediction_ids: set = set()
+        self._stats_lock = threading.Lock()
+        self._done = threading.Event()
+        self.stats: Dict[str, Any] = {
+            "total": 0, "parsed": 0, "skipped": 0, "stored": 0, "failed": 0,
+            "updates_submitted": 0, "updates_applied": 0, "answers_regenerated": 0,
+        }
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # --- Aşama 1: ayrıştırma ve tekilleştirme ---
+
+    def _parse_stage(self, file_paths: List[str]):
+        seen_urls = set()
+        try:
+            with session_scope() as db:
+                for file_path in file_paths:
+                    try:
+                        parsed_doc = _parse_document_file(file_path)
+                        source_url = parsed_doc["source_url"]
+                        if not source_url or source_url in seen_urls or db.query(Document.id).filter_by(source_url=source_url).first():
+                            logger.warning(f"Skipping document: {source_url} (missing URL or already exists).")
+                            self._count("skipped")
+                            continue
+                        seen_urls.add(source_url)
+                        self._count("parsed")
+                        self._embed_queue.put(parsed_doc)
+                    except Exception as e:
+                        logger.error(f"Could not parse document {file_path}: {e}", exc_info=True)
+                        self._count("failed")
+        finally:
+            self._embed_queue.put(_STOP)
+
+    # --- Aşama 2: batch embedding ---
+
+    def _embed_stage(self):
+        finished = False
+        while not finished:
+            # İlk dokümanı bekle, ardından kuyrukta hazır olanlarla batch'i doldur
+            batch = []
+            item = self._embed_queue.get()
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._embed_queue.get_nowait()
+                except queue.Empty:
+                    break
+            finished = item is _STOP
+            if not batch:
+                continue
+
+            doc_texts = [_document_embedding_texts(doc) for doc in batch]
+            try:
+                flat_embeddings = create_embeddings([text for texts, _ in doc_texts for text in texts])
+            except Exception as e:
+                logger.error(f"Batch embedding failed for {len(batch)} documents: {e}", exc_info=True)
+                self._count("failed", len(batch))
+                continue
+            offset = 0
+            for doc, (texts, meta_count) in zip(batch, doc_texts):
+                embeddings = flat_embeddings[offset:offset + len(texts)]
+                self._store_queue.put((doc, embeddings[:meta_count], embeddings[meta_count:]))
+                offset += len(texts)
+        self._store_queue.put(_STOP)
+
+    # --- Aşama 3: yazım ve yeniden sıralama ---
+
+    def _store_stage(self):
+        with session_scope() as db:
+            while True:
+                item = self._store_queue.get()
+                if item is _STOP:
+                    break
+                parsed_doc, meta_embeddings, chunk_embeddings = item
+                try:
+                    _store_document(db, parsed_doc, meta_embeddings, chunk_embeddings)
+                    self._count("stored")
+                    relevant_prediction_ids = _find_and_rerank_relevant_predictions(db, parsed_doc["summary"], parsed_doc["keywords"])
+                except Exception as e:
+                    logger.error(f"Failed to store document {parsed_doc['source_url']}: {e}", exc_info=True)
+                    db.rollback()
+                    self._count("failed")
+                    continue
+                for prediction_id in relevant_prediction_ids:
+                    self._updates.submit(prediction_id, self._update_prediction, prediction_id, parsed_doc["content"])
+                    self._count("updates_submitted")
+
+    # --- Aşama 4: prediction güncellemeleri ---
+
+    def _update_prediction(self, prediction_id: int, content: str):
+        try:
+            with thread_session_scope() as db:
+                pred = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+                if pred and _apply_document_to_prediction(db, pred, content):
+                    db.commit()
+                    with self._stats_lock:
+                        self._updated_prediction_ids.add(prediction_id)
+                        self.stats["updates_applied"] += 1
+        except Exception as e:
+            logger.error(f"Failed to update Prediction ID {prediction_id}: {e}", exc_info=True)
+
+    # --- Raporlama ---
+
+    def _report(self, started_at: float):
+        elapsed = max(time.monotonic() - started_at, 1e-9)
+        with self._stats_lock:
+            s = dict(self.stats)
+        pool = pool_stats()
+        logger.info(
+            f"Ingestion progress: {s['stored']}/{s['total']} stored, {s['skipped']} skipped, {s['failed']} failed "
+            f"({s['stored'] / elapsed:.2f} docs/s) | queues: embed={self._embed_queue.qsize()} "
+            f"store={self._store_queue.qsize()} update={self._updates.pending_count()} | "
+            f"db connections {pool['checked_out']}/{pool['max_connections']} (checkout wait p95 {pool['checkout_wait_p95_ms']:.1f} ms) | "
+            f"updates applied {s['updates_applied']}/{s['updates_submitted']}"
+        )
+
+    def _reporter(self, started_at: float):
+        while not self._done.wait(self.report_interval):
+            self._report(started_at)
+
+    def run(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Verilen dosyaları (yayın sırasına göre sıralanmış olmalı) içeri aktarır ve istatistikleri döndürür."""
+        started_at = time.monotonic()
+        self.stats["total"] = len(file_paths)
+        logger.info(f"Starting ingestion pipeline for {len(file_paths)} documents (workers={self.workers}, batch_size={self.batch_size}).")
+
+        stages = [
+            threading.Thread(target=self._parse_stage, args=([str(p) for p in file_paths],), name="ingest-parse"),
+            threading.Thread(target=self._embed_stage, name="ingest-embed"),
+            threading.Thread(target=self._store_stage, name="ingest-store"),
+        ]
+        reporter = threading.Thread(target=self._reporter, args=(started_at,), name="ingest-report", daemon=True)
+        reporter.start()
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+        self._updates.join()
+
+        if self._updated_prediction_ids:
+            try:
+                with session_scope() as db:
+                    self.stats["answers_regenerated"] = _regenerate_answers_for_predictions(db, sorted(self._updated_prediction_ids))
+            except Exception as e:
+                logger.error(f"Failed to regenerate answers after ingestion: {e}", exc_info=True)
+
+        self._done.set()
+        self._report(started_at)
+        elapsed = time.monotonic() - started_at
+        self.stats["elapsed_seconds"] = elapsed
+        self.stats["docs_per_second"] = self.stats["stored"] / elapsed if elapsed > 0 else 0.0
+        embedding_cache.log_stats("ingestion_pipeline")
+        log_pool_stats("ingestion_pipeline")
+        logger.info(f"Ingestion pipeline finished in {elapsed:.1f}s ({self.stats['docs_per_second']:.2f} docs/s).")
+        return self.stats
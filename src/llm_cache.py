@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, Column, Float, Integer, MetaData, String, Table, Text, delete, select, update, func
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+llm_response_cache_table = Table(
+    "llm_response_cache", _metadata,
+    Column("key", String(64), primary_key=True),
+    Column("model", String(128), nullable=False),
+    Column("response", Text, nullable=False),
+    Column("prompt_tokens", Integer, nullable=False, default=0),
+    Column("completion_tokens", Integer, nullable=False, default=0),
+    Column("latency_seconds", Float, nullable=False, default=0.0),
+    Column("created_at", Float, nullable=False, index=True),
+    Column("last_accessed", Float, nullable=False, index=True),
+    Column("hit_count", Integer, nullable=False, default=0),
+)
+
+class LLMResponseCache:
+    """
+    LLM cevapları için (model, prompt, response_format) özetine göre anahtarlanan,
+    SQL tabanlı (SQLite veya PostgreSQL) kalıcı önbellek. Aynı veritabanını kullanan
+    tüm süreçler önbelleği paylaşır.
+
+    - TTL: `ttl_seconds`'dan eski kayıtlar okunurken geçersiz sayılır ve silinir.
+    - Boyut: kayıt sayısı `max_entries`'i aştığında en uzun süredir kullanılmayanlar silinir.
+    """
+
+    EVICTION_CHECK_EVERY = 50
+
+    def __init__(self, db_url: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.engine = create_engine(db_url, pool_pre_ping=True)
+        _metadata.create_all(self.engine)
+
+        self._lock = threading.Lock()
+        self._puts_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+        self.saved_latency_seconds = 0.0
+        logger.info(f"LLM response cache initialized (ttl={ttl_seconds}s, max_entries={max_entries}).")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, response_format: Optional[Dict[str, Any]]) -> str:
+        payload = json.dumps([model, prompt, response_format], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str, response_format: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Önbellekteki ham cevap metnini döndürür; yoksa veya süresi dolmuşsa None."""
+        key = self.make_key(model, prompt, response_format)
+        now = time.time()
+        try:
+            with self.engine.begin() as conn:
+                row = conn.execute(select(llm_response_cache_table).where(llm_response_cache_table.c.key == key)).first()
+                if row is None:
+                    self._record_miss()
+                    return None
+                if now - row.created_at > self.ttl_seconds:
+                    conn.execute(delete(llm_response_cache_table).where(llm_response_cache_table.c.key == key))
+                    self._record_miss()
+                    return None
+                conn.execute(
+                    update(llm_response_cache_table)
+                    .where(llm_response_cache_table.c.key == key)
+                    .values(last_accessed=now, hit_count=llm_response_cache_table.c.hit_count + 1)
+                )
+        except Exception as e:
+            logger.warning(f"LLM response cache read failed, treating as miss: {e}")
+            self._record_miss()
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.saved_prompt_tokens += row.prompt_tokens
+            self.saved_completion_tokens += row.completion_tokens
+            self.saved_latency_seconds += row.latency_seconds
+        logger.debug(f"LLM response cache hit for model '{model}' (saved {row.prompt_tokens + row.completion_tokens} tokens, {row.latency_seconds:.2f}s).")
+        return row.response
+
+    def put(self, model: str, prompt: str, response_format: Optional[Dict[str, Any]], response: str,
+            prompt_tokens: int = 0, completion_tokens: int = 0, latency_seconds: float = 0.0):
+        key = self.make_key(model, prompt, response_format)
+        now = time.time()
+        values = dict(
+            model=model, response=response, prompt_tokens=prompt_tokens or 0, completion_tokens=completion_tokens or 0,
+            latency_seconds=latency_seconds, created_at=now, last_accessed=now, hit_count=0
+        )
+        try:
+            with self.engine.begin() as conn:
+                # Başka bir süreç aynı anahtarı yazmış olabilir; üzerine yaz
+                conn.execute(delete(llm_response_cache_table).where(llm_response_cache_table.c.key == key))
+                conn.execute(llm_response_cache_table.insert().values(key=key, **values))
+        except Exception as e:
+            logger.warning(f"LLM response cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._puts_since_eviction += 1
+            should_evict = self._puts_since_eviction >= self.EVICTION_CHECK_EVERY
+            if should_evict:
+                self._puts_since_eviction = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Süresi dolan ve boyut limitini aşan kayıtları siler; silinen kayıt sayısını döndürür."""
+        removed = 0
+        try:
+            with self.engine.begin() as conn:
+                removed += conn.execute(
+                    delete(llm_response_cache_table).where(llm_response_cache_table.c.created_at < time.time() - self.ttl_seconds)
+                ).rowcount or 0
+                count = conn.execute(select(func.count()).select_from(llm_response_cache_table)).scalar() or 0
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    oldest = select(llm_response_cache_table.c.key).order_by(llm_response_cache_table.c.last_accessed.asc()).limit(overflow)
+                    removed += conn.execute(
+                        delete(llm_response_cache_table).where(llm_response_cache_table.c.key.in_(oldest.scalar_subquery()))
+                    ).rowcount or 0
+        except Exception as e:
+            logger.warning(f"LLM response cache eviction failed: {e}")
+        if removed:
+            logger.info(f"Evicted {removed} entries from LLM response cache.")
+        return removed
+
+    def _record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "saved_prompt_tokens": self.saved_prompt_tokens,
+                "saved_completion_tokens": self.saved_completion_tokens,
+                "saved_latency_seconds": self.saved_latency_seconds,
+            }
+
+    def log_stats(self, label: str):
+        s = self.stats()
+        logger.info(
+            f"[{label}] LLM response cache: {s['hits']} hits, {s['misses']} misses (hit rate {s['hit_rate']:.1%}), "
+            f"saved {s['saved_prompt_tokens'] + s['saved_completion_tokens']} tokens and {s['saved_latency_seconds']:.1f}s."
+        )
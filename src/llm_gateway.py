@@ -1,23 +1,22 @@
+import asyncio
+import concurrent.futures
 import json
-from openai import OpenAI
+import threading
+import time
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from src import config
+from src.metrics import stage_timer
+from src.llm_cache import LLMResponseCache
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Awaitable, Iterable, Iterator, Tuple
 
 logger = logging.getLogger(__name__)
 
-class LLMGateway:
-    def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        logger.info("OpenAI client initialized.")
+# --- Prompt şablonları (senkron ve asenkron gateway ortak kullanır) ---
 
-    def decompose_query_into_tasks(self, user_query: str) -> Dict[str, Any]:
-        """
-        Kullanıcının sorgusunu analiz eder ve onu bir veya daha fazla atomik,
-        makine tarafından yürütülebilir göreve (task) ayırır.
-        """
-        logger.info("Decomposing query into potential tasks...")
-        meta_prompt = f"""
+def _decompose_prompt(user_query: str) -> str:
+    meta_prompt = f"""
         ROLE:
         You are an expert system analyst. Your job is to break down a user's query into a series of clear, specific, and atomic tasks required to answer it.
 
@@ -48,41 +47,21 @@ class LLMGateway:
           ]
         }}
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=config.DECOMPOSER_MODEL,
-                messages=[{"role": "system", "content": meta_prompt}],
-                response_format={"type": "json_object"}
-            )
-            analysis_result = json.loads(response.choices[0].message.content)
-            # Analiz sonucunu, daha sonra orkestratörde dili bulmak için task'lere ekleyelim
-            if 'potential_tasks' in analysis_result:
-                for task in analysis_result['potential_tasks']:
-                    task['__parent_analysis__'] = {'user_language_code': analysis_result.get('user_language_code')}
-            return analysis_result
-        except Exception as e:
-            logger.error(f"Error during query task decomposition: {e}", exc_info=True)
-            return {"user_language_code": "en", "potential_tasks": []}
-
-    def orchestrate_tasks_and_plan(self, user_query: str, potential_tasks: List[Dict], candidates_map: Dict[str, List[Dict]]) -> Dict[str, Any]:
-        """
-        Gereken görevleri, mevcut aday Prediction'ları ve orijinal sorguyu alarak
-        nihai bir render planı ve görev listesi oluşturur.
-        """
-        logger.info("Orchestrating final plan...")
+    return meta_prompt
 
-        candidates_text = "Analysis of available data:\n"
-        for task in potential_tasks:
-            prompt = task['prompt']
-            candidates_text += f"- For the required task '{prompt}':\n"
-            if prompt in candidates_map and candidates_map[prompt]:
-                for candidate in candidates_map[prompt]:
-                    candidates_text += f"  - Found existing Prediction [ID: {candidate['id']}, Prompt: \"{candidate['prompt']}\"]\n"
-            else:
-                candidates_text += "  - No existing predictions found. A new one must be created.\n"
+def _orchestrate_prompt(user_query: str, potential_tasks: List[Dict], candidates_map: Dict[str, List[Dict]]) -> str:
+    candidates_text = "Analysis of available data:\n"
+    for task in potential_tasks:
+        prompt = task['prompt']
+        candidates_text += f"- For the required task '{prompt}':\n"
+        if prompt in candidates_map and candidates_map[prompt]:
+            for candidate in candidates_map[prompt]:
+                candidates_text += f"  - Found existing Prediction [ID: {candidate['id']}, Prompt: \"{candidate['prompt']}\"]\n"
+        else:
+            candidates_text += "  - No existing predictions found. A new one must be created.\n"
 
 
-        meta_prompt = f"""
+    meta_prompt = f"""
         ROLE:
         You are an expert system orchestrator. Your job is to create a final execution plan to answer a user's query, using a list of required tasks and a list of available, pre-existing data points (Predictions).
 
@@ -125,30 +104,11 @@ class LLMGateway:
           ]
         }}
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=config.DECOMPOSER_MODEL,
-                messages=[{"role": "system", "content": meta_prompt}],
-                response_format={"type": "json_object"}
-            )
-            final_plan = json.loads(response.choices[0].message.content)
-            
-            # Analiz adımından gelen dili nihai plana ekle
-            user_language_code = "en"
-            if potential_tasks and '__parent_analysis__' in potential_tasks[0]:
-                user_language_code = potential_tasks[0]['__parent_analysis__'].get('user_language_code', 'en')
-            
-            final_plan['user_language_code'] = user_language_code
-            return final_plan
+    return meta_prompt
 
-        except Exception as e:
-            logger.error(f"Error during plan orchestration: {e}", exc_info=True)
-            return {{"render_plan": [], "predictions": [], "user_language_code": "en"}}
-
-    def fulfill_prediction(self, prediction_prompt: str, context_chunks: List[str]) -> Dict[str, Any]:
-        logger.info(f"Fulfilling prediction... Model: {config.WORKER_MODEL}")
-        context_str = "\n---\n".join(context_chunks)
-        rag_prompt = f"""
+def _fulfill_prompt(prediction_prompt: str, context_chunks: List[str]) -> str:
+    context_str = "\n---\n".join(context_chunks)
+    rag_prompt = f"""
         ROLE:
         You are a precise, data extraction engine. You will answer the TASK based on the CONTEXT.
 
@@ -172,25 +132,11 @@ class LLMGateway:
             `{{"is_translatable": false, "data": {{"error": "not_found"}}}}`
         5.  NEVER add explanations. Your output must be ONLY the specified JSON object.
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=config.WORKER_MODEL,
-                messages=[{"role": "system", "content": rag_prompt}],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            logger.error(f"Error during prediction fulfillment: {e}", exc_info=True)
-            return {"is_translatable": False, "data": {"error": str(e)}}
+    return rag_prompt
 
-    def translate_value(self, value_to_translate: Any, target_language_code: str, source_language_code: str = "en") -> Any:
-        # Bu fonksiyonun içeriği değişmedi
-        logger.info(f"Translating value from '{source_language_code}' to '{target_language_code}'...")
-        if not isinstance(value_to_translate, (dict, list)):
-            return value_to_translate
-
-        value_str = json.dumps(value_to_translate, ensure_ascii=False)
-        prompt = f"""
+def _translate_prompt(value_to_translate: Any, target_language_code: str, source_language_code: str) -> str:
+    value_str = json.dumps(value_to_translate, ensure_ascii=False)
+    prompt = f"""
         ROLE: You are a high-fidelity translation service.
         TASK: Translate the following JSON data structure from source language '{source_language_code}' to target language '{target_language_code}'.
         IMPORTANT:
@@ -201,23 +147,13 @@ class LLMGateway:
         JSON TO TRANSLATE:
         {value_str}
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=config.WORKER_MODEL,
-                messages=[{"role": "system", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            logger.error(f"Failed to translate value: {e}", exc_info=True)
-            return {"error": "translation_failed", "message": f"Could not translate to {target_language_code}"}
+    return prompt
 
-    def update_prediction(self, prediction_prompt: str, current_value_content: Any, new_context_chunks: List[str],base_language: str = "en") -> Dict[str, Any]:
-        logger.info(f"Incrementally updating prediction... Model: {config.WORKER_MODEL}")
-        new_context_str = "\n---\n".join(new_context_chunks)
-        current_value_str = json.dumps(current_value_content, ensure_ascii=False, indent=2)
+def _update_prompt(prediction_prompt: str, current_value_content: Any, new_context_chunks: List[str]) -> str:
+    new_context_str = "\n---\n".join(new_context_chunks)
+    current_value_str = json.dumps(current_value_content, ensure_ascii=False, indent=2)
 
-        update_prompt = f"""
+    update_prompt = f"""
         ROLE:
         You are an intelligence update analyst. Your task is to update an existing finding based on new information.
 
@@ -238,15 +174,287 @@ class LLMGateway:
         1.  Carefully analyze the NEW INFORMATION in relation to the ORIGINAL TASK.
         ... (rest of the prompt is unchanged) ...
         """
-        try:
+    return update_prompt
+
+def _attach_parent_analysis(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    # Analiz sonucunu, daha sonra orkestratörde dili bulmak için task'lere ekleyelim
+    if 'potential_tasks' in analysis_result:
+        for task in analysis_result['potential_tasks']:
+            task['__parent_analysis__'] = {'user_language_code': analysis_result.get('user_language_code')}
+    return analysis_result
+
+def _attach_plan_language(final_plan: Dict[str, Any], potential_tasks: List[Dict]) -> Dict[str, Any]:
+    # Analiz adımından gelen dili nihai plana ekle
+    user_language_code = "en"
+    if potential_tasks and '__parent_analysis__' in potential_tasks[0]:
+        user_language_code = potential_tasks[0]['__parent_analysis__'].get('user_language_code', 'en')
+    
+    final_plan['user_language_code'] = user_language_code
+    return final_plan
+
+RESPONSE_FORMAT = {"type": "json_object"}
+
+# Opsiyonel, süreçler arası paylaşılan LLM cevap önbelleği (LLM_CACHE_URL ile açılır)
+llm_response_cache = LLMResponseCache(
+    config.LLM_CACHE_URL,
+    ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+    max_entries=config.LLM_CACHE_MAX_ENTRIES
+) if config.LLM_CACHE_URL else None
+
+def _cache_response(cache: LLMResponseCache | None, model: str, prompt: str, response, latency_seconds: float):
+    if cache is None:
+        return
+    usage = getattr(response, "usage", None)
+    cache.put(
+        model, prompt, RESPONSE_FORMAT, response.choices[0].message.content,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0), completion_tokens=getattr(usage, "completion_tokens", 0),
+        latency_seconds=latency_seconds
+    )
+
+class LLMGateway:
+    def __init__(self, cache: LLMResponseCache | None = llm_response_cache):
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+        self.cache = cache
+        logger.info("OpenAI client initialized.")
+
+    def _chat_json(self, model: str, prompt: str, stage: str) -> Dict[str, Any]:
+        if self.cache is not None:
+            cached = self.cache.get(model, prompt, RESPONSE_FORMAT)
+            if cached is not None:
+                return json.loads(cached)
+
+        started_at = time.perf_counter()
+        with stage_timer.time(stage):
             response = self.client.chat.completions.create(
-                model=config.WORKER_MODEL,
-                messages=[{"role": "system", "content": update_prompt}],
-                response_format={"type": "json_object"}
+                model=model,
+                messages=[{"role": "system", "content": prompt}],
+                response_format=RESPONSE_FORMAT
             )
-            return json.loads(response.choices[0].message.content)
+        result = json.loads(response.choices[0].message.content)
+        # Sadece geçerli JSON dönen cevaplar önbelleğe alınır
+        _cache_response(self.cache, model, prompt, response, time.perf_counter() - started_at)
+        return result
+
+    def decompose_query_into_tasks(self, user_query: str) -> Dict[str, Any]:
+        """
+        Kullanıcının sorgusunu analiz eder ve onu bir veya daha fazla atomik,
+        makine tarafından yürütülebilir göreve (task) ayırır.
+        """
+        logger.info("Decomposing query into potential tasks...")
+        try:
+            return _attach_parent_analysis(self._chat_json(config.DECOMPOSER_MODEL, _decompose_prompt(user_query), stage="decompose_query_into_tasks"))
+        except Exception as e:
+            logger.error(f"Error during query task decomposition: {e}", exc_info=True)
+            return {"user_language_code": "en", "potential_tasks": []}
+
+    def orchestrate_tasks_and_plan(self, user_query: str, potential_tasks: List[Dict], candidates_map: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """
+        Gereken görevleri, mevcut aday Prediction'ları ve orijinal sorguyu alarak
+        nihai bir render planı ve görev listesi oluşturur.
+        """
+        logger.info("Orchestrating final plan...")
+        try:
+            final_plan = self._chat_json(config.DECOMPOSER_MODEL, _orchestrate_prompt(user_query, potential_tasks, candidates_map), stage="orchestrate_tasks_and_plan")
+            return _attach_plan_language(final_plan, potential_tasks)
+        except Exception as e:
+            logger.error(f"Error during plan orchestration: {e}", exc_info=True)
+            return {"render_plan": [], "predictions": [], "user_language_code": "en"}
+
+    def fulfill_prediction(self, prediction_prompt: str, context_chunks: List[str]) -> Dict[str, Any]:
+        logger.info(f"Fulfilling prediction... Model: {config.WORKER_MODEL}")
+        try:
+            return self._chat_json(config.WORKER_MODEL, _fulfill_prompt(prediction_prompt, context_chunks), stage="fulfill_prediction")
+        except Exception as e:
+            logger.error(f"Error during prediction fulfillment: {e}", exc_info=True)
+            return {"is_translatable": False, "data": {"error": str(e)}}
+
+    def translate_value(self, value_to_translate: Any, target_language_code: str, source_language_code: str = "en") -> Any:
+        logger.info(f"Translating value from '{source_language_code}' to '{target_language_code}'...")
+        if not isinstance(value_to_translate, (dict, list)):
+            return value_to_translate
+        try:
+            return self._chat_json(config.WORKER_MODEL, _translate_prompt(value_to_translate, target_language_code, source_language_code), stage="translate_value")
+        except Exception as e:
+            logger.error(f"Failed to translate value: {e}", exc_info=True)
+            return {"error": "translation_failed", "message": f"Could not translate to {target_language_code}"}
+
+    def update_prediction(self, prediction_prompt: str, current_value_content: Any, new_context_chunks: List[str],base_language: str = "en") -> Dict[str, Any]:
+        logger.info(f"Incrementally updating prediction... Model: {config.WORKER_MODEL}")
+        try:
+            return self._chat_json(config.WORKER_MODEL, _update_prompt(prediction_prompt, current_value_content, new_context_chunks), stage="update_prediction")
+        except Exception as e:
+            logger.error(f"Error during prediction update: {e}", exc_info=True)
+            return {"status": "error", "message": str(e)}
+
+class AsyncLLMGateway:
+    """
+    LLMGateway'in AsyncOpenAI üzerine kurulu asenkron karşılığı.
+
+    - Eşzamanlı istek sayısı LLM_MAX_CONCURRENCY ile sınırlandırılır (semaphore).
+    - Tüm istekler tek bir paylaşılan HTTP bağlantı havuzunu kullanır.
+    - İstemci, arka planda çalışan kalıcı bir event loop'a bağlıdır; böylece senkron
+      kod (Streamlit, CLI) `run_concurrently` ile çağrıları paralel yürütebilir ve
+      bağlantılar çağrılar arasında yeniden kullanılır.
+    """
+
+    def __init__(self, max_concurrency: int = config.LLM_MAX_CONCURRENCY, cache: LLMResponseCache | None = llm_response_cache):
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=httpx.Timeout(config.LLM_REQUEST_TIMEOUT)
+        )
+        self.client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL, http_client=self._http_client)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        logger.info(f"AsyncOpenAI client initialized (max concurrency: {max_concurrency}).")
+
+    # --- Event loop yönetimi ---
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro: Awaitable) -> Any:
+        """Bir coroutine'i gateway'in event loop'unda çalıştırır ve sonucunu senkron olarak döndürür."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+    async def gather(self, coros: Iterable[Awaitable]) -> List[Any]:
+        """Bağımsız çağrıları eşzamanlı yürütür; sonuçlar girdi sırasıyla döner."""
+        return list(await asyncio.gather(*coros))
+
+    def run_concurrently(self, coros: Iterable[Awaitable]) -> List[Any]:
+        """Senkron koddan fan-out: tüm çağrıları paralel çalıştırır ve hepsi bitince sonuçları döndürür."""
+        coros = list(coros)
+        if not coros:
+            return []
+        return self.run(self.gather(coros))
+
+    def run_as_completed(self, coros: Iterable[Awaitable]) -> Iterator[Tuple[int, Any]]:
+        """
+        Senkron koddan fan-out: tüm çağrıları paralel başlatır ve her biri bittiği anda
+        (girdi sırasındaki indeksiyle) döndürür. Jeneratör erken kapatılırsa kalan çağrılar iptal edilir.
+        """
+        loop = self._get_loop()
+        futures = {asyncio.run_coroutine_threadsafe(coro, loop): index for index, coro in enumerate(coros)}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def aclose(self):
+        await self.client.close()
+
+    async def _chat_json(self, model: str, prompt: str, stage: str) -> Dict[str, Any]:
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, model, prompt, RESPONSE_FORMAT)
+            if cached is not None:
+                return json.loads(cached)
+
+        started_at = time.perf_counter()
+        # Süre, semaphore bekleme süresini de içerir (çağıranın gördüğü gecikme)
+        with stage_timer.time(stage):
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "system", "content": prompt}],
+                    response_format=RESPONSE_FORMAT
+                )
+        result = json.loads(response.choices[0].message.content)
+        await asyncio.to_thread(_cache_response, self.cache, model, prompt, response, time.perf_counter() - started_at)
+        return result
+
+    # --- LLMGateway ile aynı imzalara sahip asenkron çağrılar ---
+
+    async def decompose_query_into_tasks(self, user_query: str) -> Dict[str, Any]:
+        logger.info("Decomposing query into potential tasks (async)...")
+        try:
+            return _attach_parent_analysis(await self._chat_json(config.DECOMPOSER_MODEL, _decompose_prompt(user_query), stage="decompose_query_into_tasks"))
+        except Exception as e:
+            logger.error(f"Error during query task decomposition: {e}", exc_info=True)
+            return {"user_language_code": "en", "potential_tasks": []}
+
+    async def orchestrate_tasks_and_plan(self, user_query: str, potential_tasks: List[Dict], candidates_map: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        logger.info("Orchestrating final plan (async)...")
+        try:
+            final_plan = await self._chat_json(config.DECOMPOSER_MODEL, _orchestrate_prompt(user_query, potential_tasks, candidates_map), stage="orchestrate_tasks_and_plan")
+            return _attach_plan_language(final_plan, potential_tasks)
+        except Exception as e:
+            logger.error(f"Error during plan orchestration: {e}", exc_info=True)
+            return {"render_plan": [], "predictions": [], "user_language_code": "en"}
+
+    async def fulfill_prediction(self, prediction_prompt: str, context_chunks: List[str]) -> Dict[str, Any]:
+        logger.info(f"Fulfilling prediction (async)... Model: {config.WORKER_MODEL}")
+        try:
+            return await self._chat_json(config.WORKER_MODEL, _fulfill_prompt(prediction_prompt, context_chunks), stage="fulfill_prediction")
+        except Exception as e:
+            logger.error(f"Error during prediction fulfillment: {e}", exc_info=True)
+            return {"is_translatable": False, "data": {"error": str(e)}}
+
+    async def translate_value(self, value_to_translate: Any, target_language_code: str, source_language_code: str = "en") -> Any:
+        logger.info(f"Translating value from '{source_language_code}' to '{target_language_code}' (async)...")
+        if not isinstance(value_to_translate, (dict, list)):
+            return value_to_translate
+        try:
+            return await self._chat_json(config.WORKER_MODEL, _translate_prompt(value_to_translate, target_language_code, source_language_code), stage="translate_value")
+        except Exception as e:
+            logger.error(f"Failed to translate value: {e}", exc_info=True)
+            return {"error": "translation_failed", "message": f"Could not translate to {target_language_code}"}
+
+    async def translate_values(self, values: Dict[str, Any], target_language_code: str, source_language_code: str = "en") -> Dict[str, Any]:
+        """
+        Birden fazla değeri tek bir LLM çağrısıyla çevirir. Değerler, anahtarları korunan tek
+        bir JSON nesnesi olarak gönderilir. Çevrilemeyen (cevapta eksik kalan) anahtarlar için
+        hata sözlüğü döner; dict/list olmayan değerler translate_value'daki gibi aynen döner.
+        """
+        results = {key: value for key, value in values.items() if not isinstance(value, (dict, list))}
+        translatable = {key: value for key, value in values.items() if key not in results}
+        if not translatable:
+            return results
+
+        translated = await self.translate_value(translatable, target_language_code, source_language_code)
+        failure = {"error": "translation_failed", "message": f"Could not translate to {target_language_code}"}
+        for key in translatable:
+            if isinstance(translated, dict) and key in translated:
+                results[key] = translated[key]
+            else:
+                results[key] = failure
+        return results
+
+    async def update_prediction(self, prediction_prompt: str, current_value_content: Any, new_context_chunks: List[str], base_language: str = "en") -> Dict[str, Any]:
+        logger.info(f"Incrementally updating prediction (async)... Model: {config.WORKER_MODEL}")
+        try:
+            return await self._chat_json(config.WORKER_MODEL, _update_prompt(prediction_prompt, current_value_content, new_context_chunks), stage="update_prediction")
         except Exception as e:
             logger.error(f"Error during prediction update: {e}", exc_info=True)
             return {"status": "error", "message": str(e)}
 
-llm_gateway = LLMGateway()
\ No newline at end of file
+    # --- Fan-out yardımcıları ---
+
+    def update_predictions_concurrently(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Birden fazla bağımsız prediction güncellemesini paralel çalıştırır.
+        Her istek update_prediction'ın argümanlarını içeren bir sözlüktür.
+        """
+        return self.run_concurrently(self.update_prediction(**req) for req in requests)
+
+    def fulfill_predictions_concurrently(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Birden fazla bağımsız prediction doldurma çağrısını paralel çalıştırır."""
+        return self.run_concurrently(self.fulfill_prediction(**req) for req in requests)
+
+    def fulfill_predictions_as_completed(self, requests: List[Dict[str, Any]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Doldurma çağrılarını paralel çalıştırır; (istek indeksi, sonuç) çiftlerini tamamlanma sırasıyla verir."""
+        return self.run_as_completed(self.fulfill_prediction(**req) for req in requests)
+
+    def translate_values_concurrently(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Birden fazla toplu çeviri çağrısını (ör. farklı dil çiftleri) paralel çalıştırır."""
+        return self.run_concurrently(self.translate_values(**req) for req in requests)
+
+llm_gateway = LLMGateway()
+async_llm_gateway = AsyncLLMGateway()
\ No newline at end of file
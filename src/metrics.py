@@ -0,0 +1,83 @@
+import functools
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class StageTimer:
+    """
+    Pipeline aşamalarının süre örneklerini toplayan, süreç genelinde paylaşılan kayıt.
+    Her aşama için son `max_samples` ölçüm saklanır ve yüzdelik dilimler (p50/p95/p99)
+    bu örnekler üzerinden hesaplanır.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started_at)
+
+    def timed(self, stage: str):
+        """Fonksiyon süresini verilen aşama adıyla kaydeden dekoratör."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(sorted_values: list, pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        # nearest-rank yöntemi
+        index = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+        return sorted_values[index]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Her aşama için adet, ortalama ve p50/p95/p99 (saniye) döndürür."""
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p50": self._percentile(values, 50),
+                "p95": self._percentile(values, 95),
+                "p99": self._percentile(values, 99),
+            }
+            for stage, values in snapshot.items()
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<32} {'count':>7} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+        for stage, s in sorted(self.summary().items()):
+            lines.append(
+                f"{stage:<32} {s['count']:>7} {s['mean'] * 1000:>10.1f} {s['p50'] * 1000:>10.1f} "
+                f"{s['p95'] * 1000:>10.1f} {s['p99'] * 1000:>10.1f}"
+            )
+        return "\n".join(lines)
+
+# Singleton instance
+stage_timer = StageTimer()
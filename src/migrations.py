@@ -0,0 +1,141 @@
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Migration adımları (CONCURRENTLY, TIMESTAMPTZ, md5) PostgreSQL'e özgüdür; diğer veritabanlarında
+# şema tamamen create_all ile oluşturulur ve migration çalıştırıcısı atlanır
+MIGRATION_DIALECT = "postgresql"
+
+class Migration:
+    """
+    Sürümlenmiş, idempotent bir şema değişikliği. `up`/`down` ifadeleri tek tek ve
+    işlem (transaction) dışında çalıştırılır; böylece büyük tablolarda indeksler
+    CREATE INDEX CONCURRENTLY ile yazmaları kilitlemeden oluşturulabilir.
+    """
+
+    def __init__(self, version: str, description: str, up: List[str], down: List[str]):
+        self.version = version
+        self.description = description
+        self.up = up
+        self.down = down
+
+# Yeni veritabanlarında aynı indeksler ve sütunlar src/database.py modellerinden create_all ile oluşur;
+# buradaki adımlar mevcut veritabanlarını aynı duruma getirir ve IF NOT EXISTS ile tekrar çalıştırılabilir.
+MIGRATIONS = [
+    Migration(
+        "0001_hot_path_indexes",
+        "Secondary indexes for ingest, answer monitor and prediction maintenance queries",
+        up=[
+            # Ingest: prediction -> etkilenen sorgular (prediction_id, query_id) üzerinden index-only scan
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_template_predictions_link_prediction_query "
+            "ON template_predictions_link (prediction_id, query_id)",
+            # Sorgu -> link'ler (selectinload, yeniden işleme sırasında silme, CASCADE)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_template_predictions_link_query_id "
+            "ON template_predictions_link (query_id)",
+            # AnswerMonitor: sadece abone olunmuş sorgular, güncellenme zamanına göre
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_userqueries_subscribed_answer_last_updated "
+            "ON userqueries (answer_last_updated) WHERE is_subscribed",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_predictions_status ON predictions (status)",
+            # Sınırsız uzunluktaki prompt üzerindeki B-tree UNIQUE kısıtı, uzun metinlerde indeks satır
+            # boyutu sınırına takılır; teklik md5 özeti üzerinden korunur
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_predictions_prompt_md5 ON predictions (md5(prediction_prompt))",
+            "ALTER TABLE predictions DROP CONSTRAINT IF EXISTS predictions_prediction_prompt_key",
+            "DROP INDEX CONCURRENTLY IF EXISTS predictions_prediction_prompt_key",
+        ],
+        down=[
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS predictions_prediction_prompt_key ON predictions (prediction_prompt)",
+            "DROP INDEX CONCURRENTLY IF EXISTS ux_predictions_prompt_md5",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_predictions_status",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_userqueries_subscribed_answer_last_updated",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_template_predictions_link_query_id",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_template_predictions_link_prediction_query",
+        ],
+    ),
+    Migration(
+        "0002_userquery_processing_error",
+        "Failure reason of the last background processing attempt of a query",
+        up=["ALTER TABLE userqueries ADD COLUMN IF NOT EXISTS processing_error TEXT"],
+        down=["ALTER TABLE userqueries DROP COLUMN IF EXISTS processing_error"],
+    ),
+    Migration(
+        "0003_document_full_vectors",
+        "Full-precision copies of compressed document vectors for candidate re-scoring",
+        up=["CREATE TABLE IF NOT EXISTS document_full_vectors (id VARCHAR(255) PRIMARY KEY, embedding BYTEA NOT NULL)"],
+        down=["DROP TABLE IF EXISTS document_full_vectors"],
+    ),
+]
+
+def supports_migrations(engine: Engine) -> bool:
+    return engine.dialect.name == MIGRATION_DIALECT
+
+def _autocommit(engine: Engine, search_path: Optional[str]):
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    if search_path:
+        conn.execute(text(f"SET search_path TO {search_path}"))
+    return conn
+
+def applied_versions(engine: Engine, search_path: Optional[str] = None) -> List[str]:
+    if not supports_migrations(engine):
+        return []
+    with _autocommit(engine, search_path) as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            f"version TEXT PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        return [row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version"))]
+
+def run_migrations(engine: Engine, search_path: Optional[str] = None) -> List[str]:
+    """Uygulanmamış migration'ları sırayla uygular ve uygulananların sürümlerini döndürür."""
+    if not supports_migrations(engine):
+        logger.info(f"Skipping schema migrations on '{engine.dialect.name}'; the schema is created from the models.")
+        return []
+    done = set(applied_versions(engine, search_path))
+    applied = []
+    with _autocommit(engine, search_path) as conn:
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                continue
+            logger.info(f"Applying migration {migration.version}: {migration.description}")
+            for statement in migration.up:
+                conn.execute(text(statement))
+            conn.execute(text(f"INSERT INTO {MIGRATIONS_TABLE} (version) VALUES (:version)"), {"version": migration.version})
+            applied.append(migration.version)
+    if not applied:
+        logger.info("Database schema is up to date.")
+    return applied
+
+def stamp_migrations(engine: Engine, search_path: Optional[str] = None) -> List[str]:
+    """
+    Migration'ları DDL çalıştırmadan uygulanmış olarak kaydeder. Şema modellerden (create_all)
+    yeni oluşturulduğunda kullanılır; modeller tüm migration'ların son halini zaten içerir.
+    """
+    if not supports_migrations(engine):
+        return []
+    done = set(applied_versions(engine, search_path))
+    stamped = [migration.version for migration in MIGRATIONS if migration.version not in done]
+    with _autocommit(engine, search_path) as conn:
+        for version in stamped:
+            conn.execute(text(f"INSERT INTO {MIGRATIONS_TABLE} (version) VALUES (:version)"), {"version": version})
+    if stamped:
+        logger.info(f"Recorded {len(stamped)} migrations as applied on a freshly created schema.")
+    return stamped
+
+def rollback_migration(engine: Engine, version: str, search_path: Optional[str] = None):
+    """Tek bir migration'ın `down` adımlarını çalıştırır ve kaydını siler."""
+    migration = next((m for m in MIGRATIONS if m.version == version), None)
+    if migration is None:
+        raise ValueError(f"Unknown migration version '{version}'.")
+    if not supports_migrations(engine):
+        raise ValueError(f"Schema migrations are only supported on PostgreSQL, not '{engine.dialect.name}'.")
+    applied_versions(engine, search_path)
+    with _autocommit(engine, search_path) as conn:
+        for statement in migration.down:
+            conn.execute(text(statement))
+        conn.execute(text(f"DELETE FROM {MIGRATIONS_TABLE} WHERE version = :version"), {"version": version})
+    logger.info(f"Rolled back migration {version}.")
@@ -0,0 +1,234 @@
+import json
+import logging
+from typing import List, Sequence
+
+import numpy as np
+from sqlalchemy import text
+
+from src import config
+from src.database import engine, Prediction
+from src.processing import create_embeddings
+from src.vector_store import VectorStore, DOCUMENTS, PREDICTIONS, CHUNKS
+
+logger = logging.getLogger(__name__)
+
+_TABLES = {
+    DOCUMENTS: {"table": "document_vectors", "owner": "document_id", "columns": {"source_url": "TEXT"}},
+    CHUNKS: {"table": "document_chunk_vectors", "owner": "document_id", "columns": {
+        "source_url": "TEXT", "chunk_index": "INTEGER", "start_offset": "INTEGER", "end_offset": "INTEGER", "heading": "TEXT",
+    }},
+    PREDICTIONS: {"table": "prediction_vectors", "owner": "prediction_id", "columns": {}},
+}
+
+def _vector_literal(embedding: Sequence[float]) -> str:
+    return "[" + ",".join(f"{float(x):.7g}" for x in embedding) + "]"
+
+def _parse_vector(value) -> np.ndarray:
+    # pgvector'ün metin biçimi ("[1,2,3]") geçerli bir JSON dizisidir
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+class PgVectorStore(VectorStore):
+    """
+    Vektörleri PostgreSQL'de (pgvector eklentisi) `documents`/`predictions` satırlarının
+    yanında saklayan uygulama. Birden fazla uygulama süreci aynı indeksi paylaşabilir ve
+    aday arama ile satır getirme tek bir SQL sorgusunda birleştirilebilir.
+
+    Mesafeler kosinüs mesafesinin iki katıdır (2 - 2 * kosinüs); Chroma uygulamasıyla aynı ölçek.
+
+    DOCUMENT_VECTOR_PRECISION=float16 ile doküman ve parça vektörleri `halfvec` sütununda
+    saklanır; tablo ve HNSW/IVFFlat indeksi yarı yer kaplar. Boyut veya hassasiyet
+    değiştiğinde tabloların `reset` ile yeniden oluşturulması gerekir.
+    """
+
+    DOCUMENT_PRECISIONS = ("float32", "float16")
+
+    def __init__(self):
+        super().__init__()
+        self.engine = engine
+        self.ensure_schema()
+        logger.info(f"VectorStore initialized with pgvector tables ({config.PGVECTOR_INDEX_TYPE} index).")
+
+    def _vector_type(self, kind: str) -> str:
+        if kind != PREDICTIONS and self.document_precision == "float16":
+            return "halfvec"
+        return "vector"
+
+    def _vector_dim(self, kind: str) -> int:
+        if kind != PREDICTIONS and self.document_dim is not None:
+            return self.document_dim
+        return config.EMBEDDING_DIM
+
+    def ensure_schema(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            for kind, spec in _TABLES.items():
+                table, owner = spec["table"], spec["owner"]
+                vector_type = self._vector_type(kind)
+                if config.PGVECTOR_INDEX_TYPE.lower() == "ivfflat":
+                    index_clause = f"USING ivfflat (embedding {vector_type}_cosine_ops) WITH (lists = {config.PGVECTOR_IVF_LISTS})"
+                else:
+                    index_clause = f"USING hnsw (embedding {vector_type}_cosine_ops) WITH (m = 16, ef_construction = 64)"
+                extra = "".join(f", {column} {column_type}" for column, column_type in spec["columns"].items())
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    f"id TEXT PRIMARY KEY, {owner} INTEGER NOT NULL, type VARCHAR(32) NOT NULL, "
+                    f"text TEXT NOT NULL{extra}, embedding {vector_type}({self._vector_dim(kind)}) NOT NULL)"
+                ))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{owner} ON {table} ({owner})"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_embedding ON {table} {index_clause}"))
+
+    def _select_columns(self, kind: str) -> List[str]:
+        spec = _TABLES[kind]
+        return ["id", spec["owner"], "type", "text"] + list(spec["columns"])
+
+    @staticmethod
+    def _row_meta(kind: str, row) -> dict:
+        spec = _TABLES[kind]
+        meta = {spec["owner"]: row[spec["owner"]], "type": row["type"], "text": row["text"]}
+        for column in spec["columns"]:
+            meta[column] = row[column]
+        return meta
+
+    @staticmethod
+    def _query_vectors_clause(query_embeddings: Sequence[Sequence[float]], params: dict, vector_type: str = "vector") -> str:
+        values = []
+        for i, embedding in enumerate(query_embeddings):
+            params[f"q{i}"] = _vector_literal(embedding)
+            values.append(f"({i}, CAST(:q{i} AS {vector_type}))")
+        return "(VALUES " + ", ".join(values) + ") AS q(ord, vec)"
+
+    @staticmethod
+    def _search_setting(k: int):
+        # Yaklaşık aramanın genişliği; işlem (transaction) sonunda varsayılana döner
+        if config.PGVECTOR_INDEX_TYPE.lower() == "ivfflat":
+            return text(f"SET LOCAL ivfflat.probes = {max(1, config.PGVECTOR_IVF_LISTS // 10)}")
+        return text(f"SET LOCAL hnsw.ef_search = {max(config.PGVECTOR_EF_SEARCH, int(k))}")
+
+    # --- Depolama ilkelleri ---
+
+    def _upsert(self, kind, ids, embeddings, metadatas):
+        spec = _TABLES[kind]
+        columns = [spec["owner"], "type", "text"] + list(spec["columns"])
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns + ["embedding"])
+        statement = text(
+            f"INSERT INTO {spec['table']} (id, {', '.join(columns)}, embedding) "
+            f"VALUES (:id, {', '.join(':' + c for c in columns)}, CAST(:embedding AS {self._vector_type(kind)})) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        )
+        rows = [
+            {"id": meta_id, **{c: meta.get(c) for c in columns}, "embedding": _vector_literal(embedding)}
+            for meta_id, embedding, meta in zip(ids, embeddings, metadatas)
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(statement, rows)
+
+    def _query(self, kind, query_embeddings, n_results, types):
+        if not len(query_embeddings):
+            return [], []
+        spec = _TABLES[kind]
+        params = {"types": list(types), "k": int(n_results)}
+        vectors = self._query_vectors_clause(query_embeddings, params, self._vector_type(kind))
+        columns = self._select_columns(kind)
+        statement = text(
+            f"SELECT q.ord, {', '.join('v.' + c for c in columns)}, (v.embedding <=> q.vec) * 2 AS distance FROM {vectors} "
+            f"CROSS JOIN LATERAL (SELECT {', '.join(columns)}, embedding FROM {spec['table']} "
+            f"WHERE type = ANY(:types) ORDER BY embedding <=> q.vec LIMIT :k) v "
+            f"ORDER BY q.ord, distance"
+        )
+        result_metas = [[] for _ in query_embeddings]
+        result_distances = [[] for _ in query_embeddings]
+        with self.engine.begin() as conn:
+            conn.execute(self._search_setting(n_results))
+            for row in conn.execute(statement, params).mappings():
+                result_metas[row["ord"]].append(self._row_meta(kind, row))
+                result_distances[row["ord"]].append(float(row["distance"]))
+        return result_metas, result_distances
+
+    def _get_by_owner(self, kind, owner_ids):
+        spec = _TABLES[kind]
+        statement = text(
+            f"SELECT {', '.join(self._select_columns(kind))}, embedding::text AS embedding "
+            f"FROM {spec['table']} WHERE {spec['owner']} = ANY(:owners)"
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement, {"owners": list(owner_ids)}).mappings().all()
+        return [_parse_vector(row["embedding"]) for row in rows], [self._row_meta(kind, row) for row in rows]
+
+    def _get_by_ids(self, kind, ids):
+        statement = text(
+            f"SELECT {', '.join(self._select_columns(kind))}, embedding::text AS embedding "
+            f"FROM {_TABLES[kind]['table']} WHERE id = ANY(:ids)"
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement, {"ids": list(ids)}).mappings().all()
+        return [row["id"] for row in rows], [_parse_vector(row["embedding"]) for row in rows], [self._row_meta(kind, row) for row in rows]
+
+    def _scan(self, kind, include_embeddings):
+        embedding_column = ", embedding::text AS embedding" if include_embeddings else ""
+        statement = text(
+            f"SELECT {', '.join(self._select_columns(kind))}{embedding_column} FROM {_TABLES[kind]['table']} "
+            f"WHERE id > :after ORDER BY id LIMIT :limit"
+        )
+        after = ""
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(statement, {"after": after, "limit": self.COMPACTION_PAGE_SIZE}).mappings().all()
+            if not rows:
+                return
+            embeddings = [_parse_vector(row["embedding"]) for row in rows] if include_embeddings else None
+            yield [row["id"] for row in rows], embeddings, [self._row_meta(kind, row) for row in rows]
+            after = rows[-1]["id"]
+
+    def _delete(self, kind, ids):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {_TABLES[kind]['table']} WHERE id = ANY(:ids)"), {"ids": list(ids)})
+
+    def reset(self):
+        with self.engine.begin() as conn:
+            for spec in _TABLES.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS {spec['table']}"))
+        self.ensure_schema()
+        self._clear_full_document_vectors()
+        self._prediction_index_loaded = False
+        logger.info("pgvector tables 'document_vectors', 'document_chunk_vectors' and 'prediction_vectors' re-created.")
+
+    # --- Tek sorguda arama + satır getirme ---
+
+    def find_candidate_predictions(self, db, query_text: str, query_keywords: List[str], top_k: int = 5,
+                                   limit: int | None = None, max_text_distance: float | None = None,
+                                   max_keyword_distance: float | None = None) -> list:
+        if self.prediction_index is not None:
+            return super().find_candidate_predictions(db, query_text, query_keywords, top_k, limit,
+                                                      max_text_distance, max_keyword_distance)
+
+        texts = ([query_text] if query_text else []) + [kw for kw in (query_keywords or []) if kw]
+        if not texts:
+            return []
+        params = {"types": ["prompt_text", "keyword"], "k": int(top_k), "limit": limit}
+        limits = self._distance_limits(query_text, query_keywords, max_text_distance, max_keyword_distance)
+        having = ""
+        if limits is not None:
+            # Mesafe sınırı sorgu vektörüne göre (ord) seçilir; hiçbir vektörde sınırı geçmeyen aday elenir
+            params["limits"] = [float(bound) for bound in limits]
+            having = " HAVING bool_or(distance <= (CAST(:limits AS float8[]))[ord + 1])"
+        vectors = self._query_vectors_clause(create_embeddings(texts), params)
+        # Skor, PredictionSearchResult.scores ile aynıdır: sorgu vektörü başına en iyi mesafe üzerinden 1 / (1 + d)
+        statement = text(
+            f"WITH hits AS ("
+            f"  SELECT q.ord, v.prediction_id, (v.embedding <=> q.vec) * 2 AS distance FROM {vectors} "
+            f"  CROSS JOIN LATERAL (SELECT prediction_id, embedding FROM prediction_vectors "
+            f"    WHERE type = ANY(:types) ORDER BY embedding <=> q.vec LIMIT :k) v"
+            f"), best AS ("
+            f"  SELECT ord, prediction_id, MIN(distance) AS distance FROM hits GROUP BY ord, prediction_id"
+            f"), scored AS ("
+            f"  SELECT prediction_id, SUM(1.0 / (1.0 + distance)) AS score FROM best GROUP BY prediction_id{having}"
+            f") "
+            f"SELECT p.* FROM scored JOIN predictions p ON p.id = scored.prediction_id "
+            f"ORDER BY scored.score DESC, p.id LIMIT :limit"
+        )
+        db.execute(self._search_setting(top_k))
+        candidates = db.query(Prediction).from_statement(statement).params(**params).all()
+        logger.info(f"pgvector search yielded {len(candidates)} prediction candidates.")
+        return candidates
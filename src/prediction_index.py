@@ -0,0 +1,196 @@
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+META_TYPES = ("prompt_text", "keyword")
+_TYPE_CODES = {meta_type: code for code, meta_type in enumerate(META_TYPES)}
+
+class PredictionIndex:
+    """
+    'predictions' koleksiyonunun süreç içi, tam (exact) arama yapan kopyası.
+
+    Tüm prompt/anahtar kelime vektörleri bitişik, normalize bir float32 matriste; meta ID,
+    prediction ID, tip ve durum bilgileri paralel dizilerde tutulur. Top-k arama tek bir
+    matris çarpımı + argpartition ile yapılır. Prediction sayısı binler mertebesinde
+    olduğundan bu, Chroma'nın kalıcı istemcisi üzerinden `where` filtreli sorgudan hızlıdır.
+
+    Dönen mesafeler, normalize vektörler için Chroma'nın varsayılan 'l2' uzayıyla aynı
+    ölçektedir (2 - 2 * kosinüs), böylece iki yolun skorları karşılaştırılabilir kalır.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._size = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._prediction_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._types = np.zeros(initial_capacity, dtype=np.int8)
+        self._meta_ids: List[str] = []
+        self._texts: List[str] = []
+        self._row_by_meta_id: Dict[str, int] = {}
+        self._statuses: Dict[int, str] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def _grow(self, needed: int):
+        if self._vectors is not None and needed <= self._capacity:
+            return
+        capacity = max(self._capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        prediction_ids = np.zeros(capacity, dtype=np.int64)
+        types = np.zeros(capacity, dtype=np.int8)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            prediction_ids[:self._size] = self._prediction_ids[:self._size]
+            types[:self._size] = self._types[:self._size]
+        self._vectors, self._prediction_ids, self._types, self._capacity = vectors, prediction_ids, types, capacity
+
+    def add(self, meta_ids: Sequence[str], prediction_ids: Sequence[int], meta_types: Sequence[str],
+            texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Kayıtları ekler; aynı meta ID zaten varsa yerinde günceller (upsert)."""
+        if not meta_ids:
+            return
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}.")
+            new_count = sum(1 for meta_id in set(meta_ids) if meta_id not in self._row_by_meta_id)
+            self._grow(self._size + new_count)
+            for meta_id, prediction_id, meta_type, text, vector in zip(meta_ids, prediction_ids, meta_types, texts, vectors):
+                row = self._row_by_meta_id.get(meta_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._row_by_meta_id[meta_id] = row
+                    self._meta_ids.append(meta_id)
+                    self._texts.append(text)
+                else:
+                    self._texts[row] = text
+                self._vectors[row] = vector
+                self._prediction_ids[row] = int(prediction_id)
+                self._types[row] = _TYPE_CODES[meta_type]
+                self._statuses.setdefault(int(prediction_id), "FULFILLED")
+
+    def set_status(self, prediction_ids: Iterable[int], status: str):
+        """Prediction durumlarını günceller (ör. INACTIVE); aramalarda durum filtresiyle kullanılır."""
+        with self._lock:
+            for prediction_id in prediction_ids:
+                self._statuses[int(prediction_id)] = status
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._meta_ids = []
+            self._texts = []
+            self._row_by_meta_id = {}
+            self._statuses = {}
+
+    def _mask(self, types: Optional[Iterable[str]], statuses: Optional[Iterable[str]],
+              prediction_ids: Optional[Iterable[int]]) -> Optional[np.ndarray]:
+        n = self._size
+        mask = None
+        if types is not None and set(types) != set(META_TYPES):
+            mask = np.isin(self._types[:n], [_TYPE_CODES[t] for t in types])
+        if statuses is not None:
+            allowed = set(statuses)
+            allowed_ids = [pid for pid, status in self._statuses.items() if status in allowed]
+            status_mask = np.isin(self._prediction_ids[:n], allowed_ids)
+            mask = status_mask if mask is None else mask & status_mask
+        if prediction_ids is not None:
+            id_mask = np.isin(self._prediction_ids[:n], np.fromiter(prediction_ids, dtype=np.int64))
+            mask = id_mask if mask is None else mask & id_mask
+        return mask
+
+    def search(self, query_embeddings: Sequence[Sequence[float]], top_k: int,
+               types: Optional[Iterable[str]] = None, statuses: Optional[Iterable[str]] = None
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Her sorgu vektörü için en yakın `top_k` kaydı bulur.
+        Dönüş: (satır, mesafe, prediction_id, tip) düz dizileri; her satır içinde mesafeye göre sıralı.
+        """
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            n = self._size
+            if n == 0 or top_k <= 0:
+                empty = np.zeros(0, dtype=np.int64)
+                return empty, np.zeros(0, dtype=np.float32), empty, np.zeros(0, dtype=object)
+            mask = self._mask(types, statuses, None)
+            positions = np.flatnonzero(mask) if mask is not None else np.arange(n)
+            vectors = self._vectors[positions] if mask is not None else self._vectors[:n]
+            prediction_ids = self._prediction_ids[positions]
+            type_codes = self._types[positions]
+
+        if len(positions) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, np.zeros(0, dtype=np.float32), empty, np.zeros(0, dtype=object)
+
+        similarities = queries @ vectors.T
+        k = min(top_k, len(positions))
+        if k < len(positions):
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), (len(queries), k))
+        top_sims = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        rows = np.repeat(np.arange(len(queries)), k)
+        flat = top.ravel()
+        distances = (2.0 - 2.0 * top_sims.ravel()).astype(np.float32)
+        return rows, distances, prediction_ids[flat], np.asarray(META_TYPES, dtype=object)[type_codes[flat]]
+
+    def get_vectors(self, prediction_ids: Iterable[int]) -> Dict[int, Dict[str, np.ndarray]]:
+        """VectorStore.get_prediction_embeddings ile aynı yapıda, normalize vektörleri döndürür."""
+        with self._lock:
+            mask = self._mask(None, None, prediction_ids)
+            if mask is None or self._vectors is None:
+                return {}
+            positions = np.flatnonzero(mask)
+            vectors = self._vectors[positions].copy()
+            owners = self._prediction_ids[positions]
+            type_codes = self._types[positions]
+
+        grouped: Dict[int, Dict[str, np.ndarray]] = {}
+        for pid in np.unique(owners):
+            own = owners == pid
+            entry = {"keyword": vectors[own & (type_codes == _TYPE_CODES["keyword"])]}
+            prompt_rows = vectors[own & (type_codes == _TYPE_CODES["prompt_text"])]
+            if len(prompt_rows):
+                entry["prompt_text"] = prompt_rows[0]
+            grouped[int(pid)] = entry
+        return grouped
+
+    def load_from_collection(self, collection, page_size: int = 5000) -> int:
+        """Chroma koleksiyonundaki tüm kayıtları sayfa sayfa okuyarak indeksi doldurur."""
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            metas = page["metadatas"]
+            self.add(ids, [m["prediction_id"] for m in metas], [m["type"] for m in metas],
+                     [str(m["text"]) for m in metas], page["embeddings"])
+            offset += len(ids)
+        logger.info(f"In-memory prediction index loaded with {self._size} vectors.")
+        return self._size
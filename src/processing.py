@@ -2,16 +2,85 @@ from sentence_transformers import SentenceTransformer
 import logging
 import numpy as np
 from numpy.linalg import norm
+from src import config
+from src.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
 # Modeli bir kere yükleyip tekrar kullanmak için globalde tutalım
-embedding_model = SentenceTransformer('Qwen/Qwen3-Embedding-0.6B')
+embedding_model = SentenceTransformer(config.EMBEDDING_MODEL_NAME)
+
+# Süreç genelinde paylaşılan embedding önbelleği
+embedding_cache = EmbeddingCache(
+    model_name=config.EMBEDDING_MODEL_NAME,
+    cache_dir=config.EMBEDDING_CACHE_DIR or None,
+    max_memory_items=config.EMBEDDING_CACHE_MEMORY_SIZE
+)
+
+def _encode(texts: list[str]) -> np.ndarray:
+    """
+    Metinleri önbellek üzerinden encode eder. Sadece önbellekte olmayan metinler
+    tek bir forward pass ile modele gönderilir. Dönen matrisin satırları girdi sırasındadır.
+    """
+    if not texts:
+        return np.zeros((0, embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    cached = embedding_cache.get_many(texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+    if missing:
+        logger.debug(f"Encoding {len(missing)} uncached texts ({len(texts) - len(missing)} served from cache).")
+        new_vectors = embedding_model.encode(missing, show_progress_bar=False)
+        embedding_cache.put_many(missing, new_vectors)
+        computed = dict(zip(missing, new_vectors))
+        cached = [v if v is not None else computed[t] for t, v in zip(texts, cached)]
+    return np.vstack(cached).astype(np.float32, copy=False)
 
 def create_embedding(text: str) -> list[float]:
     """Verilen metin için bir embedding vektörü oluşturur."""
     logger.debug(f"Creating embedding for text snippet: '{text[:50]}...'")
-    return embedding_model.encode(text, show_progress_bar=False).tolist()
+    return _encode([text])[0].tolist()
+
+def create_embeddings(texts: list[str]) -> list[list[float]]:
+    """Verilen metin listesi için embedding vektörlerini (önbellek üzerinden) oluşturur."""
+    return _encode(texts).tolist()
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Matrisin her satırını L2 normuna böler (sıfır vektörler olduğu gibi kalır)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def encode_normalized(texts: list[str]) -> np.ndarray:
+    """
+    Bir metin listesini tek bir forward pass ile encode eder ve L2-normalize edilmiş
+    (n, dim) matrisi döndürür. Normalize vektörlerde kosinüs benzerliği düz bir
+    nokta çarpımıdır; böylece çoklu karşılaştırmalar tek bir matris çarpımına iner.
+    """
+    return normalize_rows(_encode(texts))
+
+def keyword_set_scores(keyword_embs: np.ndarray, owner_index: np.ndarray, num_sets: int,
+                       reference_embs: np.ndarray, similarity_threshold: float = 0.7) -> np.ndarray:
+    """
+    calculate_keyword_set_similarity'nin vektörize hali: birden fazla anahtar kelime
+    setini tek seferde referans sete karşı skorlar.
+
+    keyword_embs: Tüm setlerin anahtar kelimelerinin normalize vektörleri (alt alta).
+    owner_index:  keyword_embs'teki her satırın hangi sete ait olduğu (0..num_sets-1).
+    Dönen dizi, her set için eşiği geçen en iyi eşleşmelerin ortalamasıdır (yoksa 0.0).
+    """
+    scores = np.zeros(num_sets, dtype=np.float32)
+    if num_sets == 0 or len(keyword_embs) == 0 or len(reference_embs) == 0:
+        return scores
+
+    best_per_keyword = np.max(keyword_embs @ reference_embs.T, axis=1)
+    passing = best_per_keyword >= similarity_threshold
+    owners = np.asarray(owner_index)[passing]
+    sums = np.bincount(owners, weights=best_per_keyword[passing], minlength=num_sets)
+    counts = np.bincount(owners, minlength=num_sets)
+    np.divide(sums, counts, out=scores, where=counts > 0, casting="unsafe")
+    return scores
 
 def get_cosine_similarity(text1: str, text2: str) -> float:
     """
@@ -21,8 +90,7 @@ def get_cosine_similarity(text1: str, text2: str) -> float:
     if not text1 or not text2:
         return 0.0
     try:
-        embedding1 = embedding_model.encode(text1, show_progress_bar=False)
-        embedding2 = embedding_model.encode(text2, show_progress_bar=False)
+        embedding1, embedding2 = _encode([text1, text2])
         cosine_similarity = np.dot(embedding1, embedding2) / (norm(embedding1) * norm(embedding2))
         return float(cosine_similarity)
     except Exception as e:
@@ -40,8 +108,8 @@ def calculate_keyword_set_similarity(keywords1: list[str], keywords2: list[str],
         return 0.0
 
     try:
-        embs1 = embedding_model.encode([kw for kw in keywords1 if kw], show_progress_bar=False)
-        embs2 = embedding_model.encode([kw for kw in keywords2 if kw], show_progress_bar=False)
+        embs1 = _encode([kw for kw in keywords1 if kw])
+        embs2 = _encode([kw for kw in keywords2 if kw])
 
         if embs1.shape[0] == 0 or embs2.shape[0] == 0:
             return 0.0
@@ -0,0 +1,57 @@
+from typing import Tuple
+
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+# En az bir vektör deposunun (pgvector: halfvec) yerel olarak saklayabildiği hassasiyetler. int8 kodlaması
+# hiçbir depoda saklanamaz; yalnızca benchmark'ta karşılaştırma için kullanılır.
+STORABLE_PRECISIONS = ("float32", "float16")
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def truncate(vectors: np.ndarray, dim: int | None) -> np.ndarray:
+    """
+    Matryoshka kesme: ilk `dim` boyutu alır ve yeniden normalize eder. Qwen3-Embedding gibi
+    Matryoshka ile eğitilmiş modellerde ön boyutlar anlamın büyük kısmını taşır.
+    `dim` boş veya tam boyuttan büyükse vektörler sadece normalize edilir.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    if dim and dim < vectors.shape[1]:
+        vectors = vectors[:, :dim]
+    return normalize(vectors)
+
+def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vektörleri (kodlar, vektör başına ölçek) çiftine dönüştürür.
+    int8: simetrik, vektör başına ölçek = max|x| / 127; float16/float32: ölçek 1.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "int8":
+        scales = np.max(np.abs(vectors), axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    if precision == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if precision == "float32":
+        return vectors, np.ones(len(vectors), dtype=np.float32)
+    raise ValueError(f"Unknown vector precision '{precision}', expected one of {PRECISIONS}.")
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+def quantized_scores(queries: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Sorgu (q, d) ile kodlanmış matris (n, d) arasındaki yaklaşık iç çarpımlar (q, n)."""
+    return (np.asarray(queries, dtype=np.float32) @ codes.astype(np.float32).T) * scales[None, :]
+
+def bytes_per_vector(dim: int, precision: str) -> int:
+    """Saklama maliyeti (indeks yapısı hariç): kodlar + int8 için 4 baytlık ölçek."""
+    itemsize = {"float32": 4, "float16": 2, "int8": 1}[precision]
+    return dim * itemsize + (4 if precision == "int8" else 0)
@@ -0,0 +1,131 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from src import config
+
+try:
+    from celery import Celery
+except ImportError:  # celery yalnızca TASK_QUEUE_BACKEND=celery iken gereklidir
+    Celery = None
+
+logger = logging.getLogger(__name__)
+
+def task_name(fn: Callable) -> str:
+    # Modül yolundan bağımsız isim: app.py core_logic'i "src." öneki olmadan import eder,
+    # worker ise "src.core_logic" olarak; iki taraf da aynı görev adını üretmelidir.
+    return f"proactive_rag.{fn.__name__}"
+
+class LocalTask:
+    """
+    Celery task'larının `delay` arayüzünü taklit eden, süreç içi bir thread havuzunda
+    çalışan görev sarmalayıcısı. Testlerde ve broker olmayan ortamlarda kullanılır.
+    """
+
+    def __init__(self, queue: "LocalTaskQueue", fn: Callable, name: str):
+        self._queue = queue
+        self._fn = fn
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return self._fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs) -> Future:
+        return self._queue.submit(self, *args, **kwargs)
+
+class LocalTaskQueue:
+    """Görevleri süreç içinde, sınırlı sayıda iş parçacığıyla arka planda çalıştırır."""
+
+    backend = "local"
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task")
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def task(self, fn: Callable) -> LocalTask:
+        return LocalTask(self, fn, task_name(fn))
+
+    def submit(self, task: LocalTask, *args, **kwargs) -> Future:
+        def run():
+            try:
+                return task(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Task {task.name} failed: {e}", exc_info=True)
+                raise
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        logger.debug(f"Enqueued task {task.name} (in-process).")
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def join(self):
+        """Kuyruktaki tüm görevler bitene kadar bekler (testler ve CLI betikleri için)."""
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            for future in pending:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+class CeleryTaskQueue:
+    """
+    Görevleri Redis broker'ı üzerinden Celery worker'larına gönderir.
+    Worker şöyle başlatılır:
+        celery -A src.task_queue:celery_app worker --loglevel=info
+    """
+
+    backend = "celery"
+
+    def __init__(self, broker_url: str, result_backend: str):
+        if Celery is None:
+            raise ImportError("TASK_QUEUE_BACKEND=celery requires the 'celery' and 'redis' packages.")
+        self.app = Celery("proactive_rag", broker=broker_url, backend=result_backend, include=["src.core_logic"])
+        self.app.conf.update(
+            task_serializer="json",
+            accept_content=["json"],
+            result_serializer="json",
+            task_acks_late=True,             # worker çökerse görev başka bir worker'a verilir
+            worker_prefetch_multiplier=1,    # uzun LLM görevleri worker'lar arasında dengeli dağılsın
+        )
+
+    def task(self, fn: Callable):
+        return self.app.task(name=task_name(fn))(fn)
+
+    def pending_count(self) -> int:
+        return 0
+
+    def join(self):
+        # Görevler ayrı worker süreçlerinde çalışır; burada beklenecek bir şey yoktur
+        pass
+
+def create_task_queue() -> Any:
+    backend = config.TASK_QUEUE_BACKEND.lower()
+    if backend == "celery":
+        logger.info(f"Using Celery task queue (broker: {config.CELERY_BROKER_URL}).")
+        return CeleryTaskQueue(config.CELERY_BROKER_URL, config.CELERY_RESULT_BACKEND)
+    if backend != "local":
+        logger.warning(f"Unknown TASK_QUEUE_BACKEND '{config.TASK_QUEUE_BACKEND}', falling back to in-process queue.")
+    return LocalTaskQueue(config.LOCAL_TASK_WORKERS)
+
+# Singleton instance
+task_queue = create_task_queue()
+
+# `celery -A src.task_queue:celery_app worker` için
+celery_app = task_queue.app if isinstance(task_queue, CeleryTaskQueue) else None
@@ -1,144 +1,709 @@
+import hashlib
 import logging
-from typing import List
-import chromadb
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 from src import config
-from src.processing import embedding_model, create_embedding
+from src.processing import create_embedding, create_embeddings, normalize_rows
+from src import quantization
+from src.metrics import stage_timer
+from src.chunking import estimate_tokens
+from src.prediction_index import PredictionIndex
+from src.database import DocumentFullVector, session_scope
 
 logger = logging.getLogger(__name__)
 
+DOCUMENTS = "documents"
+PREDICTIONS = "predictions"
+CHUNKS = "document_chunks"
+
+def _content_hash(value: str) -> str:
+    # hash() süreç başına tuzlandığı (PYTHONHASHSEED) için kalıcı ID'lerde kullanılamaz
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:32]
+
+def document_meta_id(doc_id: int, meta_type: str, value: str) -> str:
+    return f"doc_{doc_id}_{meta_type}_{_content_hash(value)}"
+
+def prediction_meta_id(prediction_id: int, meta_type: str, value: str) -> str:
+    return f"pred_{prediction_id}_{meta_type}_{_content_hash(value)}"
+
+def chunk_meta_id(doc_id: int, chunk_index: int, value: str) -> str:
+    return f"chunk_{doc_id}_{chunk_index}_{_content_hash(value)}"
+
+def _fused_scores(rows: np.ndarray, distances: np.ndarray, owner_index: np.ndarray, num_owners: int,
+                  text_row: int, fusion: str) -> np.ndarray:
+    """
+    Satır (sorgu vektörü) sırasına göre dizilmiş isabetleri sahip bazında birleştirir.
+    Her (sorgu vektörü, sahip) çifti yalnızca en iyi isabetiyle bir kez katkı verir.
+    """
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    _, first = np.unique(rows * num_owners + owner_index, return_index=True)
+    weights = np.where(rows[first] == text_row, config.DOCUMENT_SEARCH_TEXT_WEIGHT, 1.0)
+    if fusion == "weighted":
+        contributions = weights / (1.0 + distances[first])
+    else:
+        contributions = weights / (config.DOCUMENT_SEARCH_RRF_K + ranks[first] + 1)
+    return np.bincount(owner_index[first], weights=contributions, minlength=num_owners)
+
+class PredictionSearchResult:
+    """
+    find_similar_predictions sonuçlarının prediction bazında toplanmış, dizi tabanlı hali.
+
+    prediction_ids: (n,) benzersiz Prediction ID'leri
+    best_distance:  (n, q) her sorgu vektörü için prediction'ın en iyi parça mesafesi (eşleşme yoksa inf)
+    hit_counts:     (n,) prediction'ın parçalarının toplam isabet sayısı
+    keyword_hits:   (n,) bu isabetlerden 'keyword' tipindekilerin sayısı
+    Sorgu vektörlerinin sırası: (varsa) metin, ardından boş olmayan anahtar kelimeler.
+    """
+
+    def __init__(self, prediction_ids: np.ndarray, best_distance: np.ndarray, hit_counts: np.ndarray, keyword_hits: np.ndarray):
+        self.prediction_ids = prediction_ids
+        self.best_distance = best_distance
+        self.hit_counts = hit_counts
+        self.keyword_hits = keyword_hits
+
+    @classmethod
+    def empty(cls, num_queries: int) -> "PredictionSearchResult":
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, num_queries), dtype=np.float32),
+                   np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.prediction_ids)
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Sorgu vektörleri üzerinden toplanmış yakınlık skoru (yüksek daha iyi)."""
+        return np.sum(1.0 / (1.0 + self.best_distance), axis=1)
+
+    def ranked_ids(self, limit: int | None = None) -> List[int]:
+        order = np.argsort(-self.scores, kind="stable")[:limit]
+        return self.prediction_ids[order].tolist()
+
+    def within(self, max_distance: np.ndarray) -> "PredictionSearchResult":
+        """
+        En az bir sorgu vektöründe en iyi mesafesi o vektörün sınırını (max_distance, (q,))
+        geçmeyen prediction'ları bırakır; hiçbir vektörde eşleşmeyenler (inf) elenir.
+        """
+        keep = np.any(self.best_distance <= np.asarray(max_distance, dtype=np.float32), axis=1)
+        return PredictionSearchResult(self.prediction_ids[keep], self.best_distance[keep],
+                                      self.hit_counts[keep], self.keyword_hits[keep])
+
 class VectorStore:
+    """
+    Doküman ve prediction metadata vektörleri için ortak arayüz.
+
+    Arama, füzyon, sıkıştırma ve süreç içi prediction indeksi mantığı burada bulunur;
+    alt sınıflar (ChromaVectorStore, PgVectorStore) yalnızca depolama ilkellerini
+    (_upsert, _query, _get_by_owner, _get_by_ids, _scan, _delete, reset) uygular.
+    Mesafeler, normalize vektörler için 'l2' (kare) ölçeğindedir: 2 - 2 * kosinüs.
+
+    Doküman ve parça (chunk) vektörleri isteğe bağlı olarak Matryoshka ile kesilmiş boyutta ve/veya düşük
+    hassasiyette saklanabilir (DOCUMENT_VECTOR_DIM, DOCUMENT_VECTOR_PRECISION); bu durumda
+    arama fazladan aday getirir ve adaylar, yazılırken ayrıca saklanan tam hassasiyetli
+    vektörlerle (DocumentFullVector) yeniden puanlanır.
+    """
+
+    COMPACTION_PAGE_SIZE = 5000
+    # Bu deponun doküman vektörleri için yerel olarak saklayabildiği hassasiyetler
+    DOCUMENT_PRECISIONS = ("float32",)
+
     def __init__(self):
-        self.client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
-        self.document_collection = self.client.get_or_create_collection(name="documents")
-        self.prediction_collection = self.client.get_or_create_collection(name="predictions")
-        logger.info("VectorStore initialized with 'documents' and 'predictions' collections.")
+        # İsteğe bağlı süreç içi hızlı yol; ilk kullanımda depodan yüklenir
+        self.prediction_index = PredictionIndex() if config.PREDICTION_INDEX_ENABLED else None
+        self._prediction_index_loaded = False
+        self._prediction_index_lock = threading.Lock()
+        self.document_dim = config.DOCUMENT_VECTOR_DIM if config.DOCUMENT_VECTOR_DIM > 0 else None
+        self.document_precision = self._resolve_document_precision(config.DOCUMENT_VECTOR_PRECISION.lower())
+
+    def _resolve_document_precision(self, requested: str) -> str:
+        # Desteklenmeyen hassasiyet sessizce başka birine düşürülmez; bellek hesabı yanlış olurdu
+        if requested not in self.DOCUMENT_PRECISIONS:
+            raise ValueError(f"DOCUMENT_VECTOR_PRECISION '{requested}' is not supported by {type(self).__name__}; "
+                             f"expected one of {self.DOCUMENT_PRECISIONS}.")
+        return requested
+
+    @property
+    def document_vectors_compressed(self) -> bool:
+        return self.document_dim is not None or self.document_precision != "float32"
+
+    # --- Depolama ilkelleri (alt sınıflar uygular) ---
+
+    def _upsert(self, kind: str, ids: List[str], embeddings: Sequence[Sequence[float]], metadatas: List[dict]):
+        raise NotImplementedError
+
+    def _query(self, kind: str, query_embeddings: Sequence[Sequence[float]], n_results: int,
+               types: List[str]) -> Tuple[List[List[dict]], List[List[float]]]:
+        """Her sorgu vektörü için mesafeye göre sıralı (metadatas, distances) satırları döndürür."""
+        raise NotImplementedError
+
+    def _get_by_owner(self, kind: str, owner_ids: List[int]) -> Tuple[List[Sequence[float]], List[dict]]:
+        raise NotImplementedError
+
+    def _get_by_ids(self, kind: str, ids: List[str]) -> Tuple[List[str], List[Sequence[float]], List[dict]]:
+        raise NotImplementedError
+
+    def _scan(self, kind: str, include_embeddings: bool) -> Iterator[Tuple[List[str], Optional[List[Sequence[float]]], List[dict]]]:
+        """Koleksiyonu COMPACTION_PAGE_SIZE'lık sayfalar halinde (ids, embeddings, metadatas) olarak okur."""
+        raise NotImplementedError
+
+    def _delete(self, kind: str, ids: List[str]):
+        raise NotImplementedError
+
+    def reset(self):
+        """Tüm vektörleri siler ve depoyu boş olarak yeniden oluşturur."""
+        raise NotImplementedError
+
+    # --- Prediction indeksi ---
+
+    def _get_prediction_index(self) -> PredictionIndex | None:
+        if self.prediction_index is None:
+            return None
+        if not self._prediction_index_loaded:
+            with self._prediction_index_lock:
+                if not self._prediction_index_loaded:
+                    self.prediction_index.clear()
+                    for ids, embeddings, metas in self._scan(PREDICTIONS, include_embeddings=True):
+                        self.prediction_index.add(ids, [m["prediction_id"] for m in metas], [m["type"] for m in metas],
+                                                  [str(m["text"]) for m in metas], embeddings)
+                    logger.info(f"In-memory prediction index loaded with {len(self.prediction_index)} vectors.")
+                    self._prediction_index_loaded = True
+        return self.prediction_index
+
+    # --- Yazma ---
 
     def add_document_meta(self, doc_id: int, source_url: str, meta_type: str, value: str, embedding: list[float]):
-        meta_id = f"doc_{doc_id}_{meta_type}_{abs(hash(value))}"
-        self.document_collection.add(
-            ids=[meta_id],
-            embeddings=[embedding],
-            metadatas=[{"document_id": doc_id, "source_url": source_url, "type": meta_type, "text": value}]
-        )
+        self.add_document_metas([(doc_id, source_url, meta_type, value)], [embedding])
 
     def add_prediction_meta(self, prediction_id: int, meta_type: str, value: str, embedding: list[float]):
-        meta_id = f"pred_{prediction_id}_{meta_type}_{abs(hash(value))}"
-        self.prediction_collection.add(
-            ids=[meta_id],
-            embeddings=[embedding],
-            metadatas=[{"type": meta_type, "text": value, "prediction_id": prediction_id}]
-        )
+        self.add_prediction_metas([(prediction_id, meta_type, value)], [embedding])
+
+    def add_document_metas(self, entries: List[Tuple[int, str, str, str]], embeddings: Sequence[Sequence[float]]):
+        """
+        (doc_id, source_url, meta_type, value) kayıtlarını ve vektörlerini 'documents'
+        koleksiyonuna tek bir `upsert` çağrısıyla yazar. ID'ler içerikten türetildiği için
+        aynı kaydı tekrar yazmak kopya oluşturmaz.
+        """
+        ids, metadatas = [], []
+        for doc_id, source_url, meta_type, value in entries:
+            ids.append(document_meta_id(doc_id, meta_type, value))
+            metadatas.append({"document_id": doc_id, "source_url": source_url, "type": meta_type, "text": value})
+        self._store_full_document_vectors(ids, embeddings)
+        self._add_batch(DOCUMENTS, ids, self._prepare_document_embeddings(embeddings), metadatas)
+
+    def add_document_chunks(self, entries: List[Tuple[int, str, dict]], embeddings: Sequence[Sequence[float]]):
+        """
+        (doc_id, source_url, chunk) kayıtlarını 'document_chunks' koleksiyonuna tek yazımda ekler.
+        `chunk`, src.chunking.chunk_markdown çıktısıdır; metin, ofsetler ve başlık metadata olarak saklanır.
+        """
+        ids, metadatas = [], []
+        for doc_id, source_url, chunk in entries:
+            ids.append(chunk_meta_id(doc_id, chunk["index"], chunk["text"]))
+            metadatas.append({
+                "document_id": doc_id, "source_url": source_url, "type": "chunk", "text": chunk["text"],
+                "chunk_index": chunk["index"], "start_offset": chunk["start"], "end_offset": chunk["end"],
+                "heading": chunk.get("heading") or "",
+            })
+        self._store_full_document_vectors(ids, embeddings)
+        self._add_batch(CHUNKS, ids, self._prepare_document_embeddings(embeddings), metadatas)
+
+    def _prepare_document_embeddings(self, embeddings: Sequence[Sequence[float]]) -> Sequence[Sequence[float]]:
+        if self.document_dim is None or not len(embeddings):
+            return embeddings
+        return quantization.truncate(embeddings, self.document_dim)
+
+    # --- Yeniden puanlama için tam hassasiyetli kopyalar ---
+
+    def _store_full_document_vectors(self, ids: List[str], embeddings: Sequence[Sequence[float]]):
+        """Vektörler sıkıştırılmış saklanıyorsa tam boyutlu, normalize float32 kopyalarını parça ID'siyle yazar."""
+        if not self.document_vectors_compressed or not ids or len(ids) != len(embeddings):
+            return
+        rows = {meta_id: vector.tobytes() for meta_id, vector in zip(ids, quantization.normalize(embeddings))}
+        with session_scope() as db:
+            # Aynı parça tekrar yazılabilir; üzerine yaz
+            db.query(DocumentFullVector).filter(DocumentFullVector.id.in_(list(rows))).delete(synchronize_session=False)
+            db.add_all(DocumentFullVector(id=meta_id, embedding=embedding) for meta_id, embedding in rows.items())
+            db.commit()
+
+    @staticmethod
+    def _load_full_document_vectors(ids: List[str]) -> Dict[str, np.ndarray]:
+        if not ids:
+            return {}
+        with session_scope() as db:
+            rows = db.query(DocumentFullVector.id, DocumentFullVector.embedding).filter(DocumentFullVector.id.in_(ids)).all()
+        return {row.id: np.frombuffer(row.embedding, dtype=np.float32) for row in rows}
+
+    @staticmethod
+    def _clear_full_document_vectors():
+        try:
+            with session_scope() as db:
+                db.query(DocumentFullVector).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Could not clear full-precision document vectors (table might not exist): {e}")
+
+    @staticmethod
+    def _document_fragment_id(kind: str, meta: dict) -> str:
+        if kind == CHUNKS:
+            return chunk_meta_id(int(meta["document_id"]), int(meta["chunk_index"]), str(meta["text"]))
+        return document_meta_id(int(meta["document_id"]), meta["type"], str(meta["text"]))
+
+    def add_prediction_metas(self, entries: List[Tuple[int, str, str]], embeddings: Sequence[Sequence[float]]):
+        """
+        (prediction_id, meta_type, value) kayıtlarını ve vektörlerini 'predictions'
+        koleksiyonuna tek bir `upsert` çağrısıyla yazar.
+        """
+        ids, metadatas = [], []
+        for prediction_id, meta_type, value in entries:
+            ids.append(prediction_meta_id(prediction_id, meta_type, value))
+            metadatas.append({"type": meta_type, "text": value, "prediction_id": prediction_id})
+        self._add_batch(PREDICTIONS, ids, embeddings, metadatas)
+        if self.prediction_index is not None and self._prediction_index_loaded:
+            self.prediction_index.add(ids, [m["prediction_id"] for m in metadatas], [m["type"] for m in metadatas],
+                                      [m["text"] for m in metadatas], embeddings)
+
+    def _add_batch(self, kind: str, ids: List[str], embeddings: Sequence[Sequence[float]], metadatas: List[dict]):
+        if len(ids) != len(embeddings):
+            raise ValueError(f"Got {len(ids)} metadata entries but {len(embeddings)} embeddings.")
+        # Aynı batch içinde tekrar eden ID'ler hataya yol açar; ilk kayıt tutulur
+        seen = set()
+        keep = [i for i, meta_id in enumerate(ids) if not (meta_id in seen or seen.add(meta_id))]
+        if not keep:
+            return
+        self._upsert(kind, [ids[i] for i in keep], [list(map(float, embeddings[i])) for i in keep], [metadatas[i] for i in keep])
+        logger.debug(f"Upserted {len(keep)} vectors to '{kind}' in a single write.")
+
+    # --- Okuma ---
+
+    def get_prediction_embeddings(self, prediction_ids: List[int]) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Verilen Prediction ID'leri için 'predictions' koleksiyonunda saklanan vektörleri
+        tek bir toplu okuma ile getirir; yeniden embedding hesaplanmaz.
+        Dönen yapı: {prediction_id: {"prompt_text": (dim,) dizi veya yok, "keyword": (k, dim) matris}}
+        """
+        if not prediction_ids:
+            return {}
+
+        index = self._get_prediction_index()
+        if index is not None:
+            return index.get_vectors(prediction_ids)
+
+        embeddings, metadatas = self._get_by_owner(PREDICTIONS, [int(pid) for pid in prediction_ids])
+        grouped: Dict[int, Dict[str, list]] = {}
+        for emb, meta in zip(embeddings, metadatas):
+            entry = grouped.setdefault(meta["prediction_id"], {"prompt_text": [], "keyword": []})
+            if meta["type"] in entry:
+                entry[meta["type"]].append(emb)
+
+        vectors = {}
+        for pid, entry in grouped.items():
+            vectors[pid] = {"keyword": np.asarray(entry["keyword"], dtype=np.float32)}
+            if entry["prompt_text"]:
+                vectors[pid]["prompt_text"] = np.asarray(entry["prompt_text"][0], dtype=np.float32)
+        logger.debug(f"Fetched stored vectors for {len(vectors)}/{len(prediction_ids)} predictions.")
+        return vectors
 
-    def query_document_metas(self, query_text: str, query_keywords: List[str], n_results: int = 5) -> List[dict]:
+    @stage_timer.timed("vector_search.query_document_metas")
+    def query_document_metas(self, query_text: str, query_keywords: List[str], n_results: int = 5,
+                             depth: int | None = None, fusion: str | None = None) -> List[dict]:
         """
         Verilen bir metin ve anahtar kelimeler üzerinden DOKÜMANLAR içinde HEDEFLİ hibrit arama yapar.
         Query text'i 'summary' VE 'keywords' alanlarında, anahtar kelimeleri sadece 'keywords' alanında arar.
+
+        Metin ve anahtar kelimeler tek batch'te embed edilir ve tek sorguyla aranır. Her sorgu
+        vektörünün sonuç listesi `depth` adaydan oluşur; listeler doküman bazında birleştirilir
+        ("rrf": reciprocal rank fusion, "weighted": mesafeye göre ağırlıklı toplam).
+        Dönen her kayıt bir dokümandır: document_id, source_url, score (yüksek daha iyi),
+        distance (en iyi parça mesafesi), type (en iyi parçanın tipi), text (eşleşen
+        parçaların tekilleştirilmiş birleşimi) ve fragments.
+
+        Doküman vektörleri sıkıştırılmış saklanıyorsa her sorgu vektörü için
+        DOCUMENT_RESCORE_FACTOR kat aday getirilir ve tam hassasiyetle yeniden puanlanır.
         """
-        if not query_text and not query_keywords:
+        depth = depth or config.DOCUMENT_SEARCH_DEPTH
+        fusion = (fusion or config.DOCUMENT_SEARCH_FUSION).lower()
+        valid_keywords = [kw for kw in (query_keywords or []) if kw]
+        texts = ([query_text] if query_text else []) + valid_keywords
+        if not texts:
             return []
 
-        all_hits = {}
+        result_metas, result_distances = self._search_document_vectors(
+            DOCUMENTS, create_embeddings(texts), max(depth, n_results), ["summary", "keywords"])
+        rows, distances, metas = self._flatten(result_metas, result_distances)
+        if not metas:
+            return []
+        types = np.asarray([meta["type"] for meta in metas])
 
-        # 1. query_text'i 'summary' VE 'keywords' alanlarında ara
-        if query_text:
-            text_embedding = embedding_model.encode(query_text).tolist()
-            text_results = self.document_collection.query(
-                query_embeddings=[text_embedding],
-                n_results=n_results,
-                where={"type": {"$in": ["summary", "keywords"]}} # Hem summary hem keywords ile eşleştir
-            )
-            if text_results and text_results["ids"]:
-                for i in range(len(text_results["ids"])):
-                    for j in range(len(text_results["ids"][i])):
-                        hit_id = text_results["ids"][i][j]
-                        # Mevcut mesafeden daha iyi (daha düşük) bir mesafe bulursak güncelle
-                        meta = text_results["metadatas"][i][j]
-                        distance = text_results["distances"][i][j]
-                        if hit_id not in all_hits or distance < all_hits[hit_id]["distance"]:
-                            all_hits[hit_id] = {
-                                "document_id": meta["document_id"],
-                                "type": meta["type"],
-                                "text": str(meta["text"]),
-                                "distance": distance
-                            }
-        
-        # 2. query_keywords'ü sadece 'keywords' alanında ara
-        # Bu kısım önceki gibi kalır, çünkü buradaki hedef Prediction'ın keywords'lerini
-        # Dokümanın keywords'leri ile eşleştirmektir.
-        if query_keywords:
-            valid_keywords = [kw for kw in query_keywords if kw]
-            if valid_keywords:
-                keyword_embeddings = embedding_model.encode(valid_keywords).tolist()
-                keyword_results = self.document_collection.query(
-                    query_embeddings=keyword_embeddings,
-                    n_results=n_results,
-                    where={"type": "keywords"} # Sadece keywords tipi ile eşleştir
-                )
-                if keyword_results and keyword_results["ids"]:
-                    for i in range(len(keyword_results["ids"])):
-                        for j in range(len(keyword_results["ids"][i])):
-                            hit_id = keyword_results["ids"][i][j]
-                            meta = keyword_results["metadatas"][i][j]
-                            distance = keyword_results["distances"][i][j]
-                            if hit_id not in all_hits or distance < all_hits[hit_id]["distance"]:
-                                all_hits[hit_id] = {
-                                    "document_id": meta["document_id"],
-                                    "type": meta["type"],
-                                    "text": str(meta["text"]),
-                                    "distance": distance
-                                }
-        
-        # Sonuçları mesafeye göre sırala
-        return sorted(list(all_hits.values()), key=lambda x: x["distance"])
+        # Anahtar kelime vektörleri sadece 'keywords' parçalarıyla eşleşebilir
+        text_row = 0 if query_text else -1
+        mask = (rows == text_row) | (types == "keywords")
+        rows, distances, types = rows[mask], distances[mask], types[mask]
+        metas = [meta for meta, keep in zip(metas, mask) if keep]
+        if not metas:
+            return []
+
+        doc_ids, doc_index = np.unique(np.asarray([int(meta["document_id"]) for meta in metas]), return_inverse=True)
+        scores = _fused_scores(rows, distances, doc_index, len(doc_ids), text_row, fusion)
+        best_distance = np.full(len(doc_ids), np.inf)
+        np.minimum.at(best_distance, doc_index, distances)
+
+        top = np.argsort(-scores, kind="stable")[:n_results]
+        order = np.argsort(distances, kind="stable")
+        hits = []
+        for d in top:
+            fragment_positions = order[doc_index[order] == d]
+            fragments, seen = [], set()
+            for pos in fragment_positions:
+                key = (str(types[pos]), str(metas[pos]["text"]))
+                if key not in seen:
+                    seen.add(key)
+                    fragments.append({"type": key[0], "text": key[1], "distance": float(distances[pos])})
+            # Özet, anahtar kelimelerden önce gelsin
+            fragments.sort(key=lambda f: f["type"] != "summary")
+            best = metas[fragment_positions[0]]
+            hits.append({
+                "document_id": int(doc_ids[d]),
+                "source_url": best.get("source_url"),
+                "score": float(scores[d]),
+                "distance": float(best_distance[d]),
+                "type": best["type"],
+                "text": "\n".join(f["text"] for f in fragments),
+                "fragments": fragments,
+            })
+        return hits
+
+    @stage_timer.timed("vector_search.query_document_passages")
+    def query_document_passages(self, query_text: str, query_keywords: List[str], max_tokens: int | None = None,
+                                depth: int | None = None, fusion: str | None = None) -> List[dict]:
+        """
+        Doküman gövdelerinden, metin ve anahtar kelimelerle en alakalı parçaları (passage)
+        `max_tokens` bağlam bütçesine sığacak şekilde seçer. Parçalar metin + anahtar kelime
+        sonuç listelerinin füzyonuyla puanlanır ve skor sırasıyla bütçe dolana kadar eklenir;
+        sığmayan parça atlanır, daha kısa olanlar denenmeye devam eder.
+        Dönen her kayıt: document_id, source_url, chunk_index, start_offset, end_offset,
+        heading, text, tokens, score, distance.
+        """
+        max_tokens = max_tokens or config.CONTEXT_TOKEN_BUDGET
+        depth = depth or config.CHUNK_SEARCH_DEPTH
+        fusion = (fusion or config.DOCUMENT_SEARCH_FUSION).lower()
+        texts = ([query_text] if query_text else []) + [kw for kw in (query_keywords or []) if kw]
+        if not texts:
+            return []
+
+        result_metas, result_distances = self._search_document_vectors(CHUNKS, create_embeddings(texts), depth, ["chunk"])
+        rows, distances, metas = self._flatten(result_metas, result_distances)
+        if not metas:
+            return []
+
+        keys = [(int(meta["document_id"]), int(meta["chunk_index"])) for meta in metas]
+        unique_keys = list(dict.fromkeys(keys))
+        position = {key: i for i, key in enumerate(unique_keys)}
+        chunk_index = np.asarray([position[key] for key in keys], dtype=np.int64)
+        scores = _fused_scores(rows, distances, chunk_index, len(unique_keys), 0 if query_text else -1, fusion)
+        best_distance = np.full(len(unique_keys), np.inf)
+        np.minimum.at(best_distance, chunk_index, distances)
+        first_meta = {}
+        for i, meta in zip(chunk_index.tolist(), metas):
+            first_meta.setdefault(i, meta)
+
+        passages, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            meta = first_meta[int(i)]
+            tokens = estimate_tokens(str(meta["text"]))
+            if used + tokens > max_tokens:
+                continue
+            used += tokens
+            passages.append({
+                "document_id": int(meta["document_id"]),
+                "source_url": meta.get("source_url"),
+                "chunk_index": int(meta["chunk_index"]),
+                "start_offset": int(meta["start_offset"]),
+                "end_offset": int(meta["end_offset"]),
+                "heading": meta.get("heading") or None,
+                "text": str(meta["text"]),
+                "tokens": tokens,
+                "score": float(scores[i]),
+                "distance": float(best_distance[i]),
+            })
+        logger.debug(f"Selected {len(passages)} passages ({used}/{max_tokens} tokens) from {len(unique_keys)} chunk candidates.")
+        return passages
+
+    def _search_document_vectors(self, kind: str, query_embeddings: Sequence[Sequence[float]], keep: int,
+                                 types: List[str]) -> Tuple[List[List[dict]], List[List[float]]]:
+        """Doküman/parça vektörlerinde arama; vektörler sıkıştırılmışsa adaylar tam hassasiyetle yeniden puanlanır."""
+        if not self.document_vectors_compressed:
+            return self._query(kind, query_embeddings, keep, types)
+        search_embeddings = quantization.truncate(query_embeddings, self.document_dim).tolist()
+        result_metas, result_distances = self._query(kind, search_embeddings, keep * max(1, config.DOCUMENT_RESCORE_FACTOR), types)
+        return self._rescore_document_rows(kind, query_embeddings, result_metas, result_distances, keep)
+
+    @staticmethod
+    def _flatten(result_metas: List[List[dict]], result_distances: List[List[float]]) -> Tuple[np.ndarray, np.ndarray, List[dict]]:
+        """Sonuçları düz dizilere açar (her satır bir sorgu vektörü, mesafeye göre sıralı)."""
+        rows, distances, metas = [], [], []
+        for row, (row_metas, row_distances) in enumerate(zip(result_metas, result_distances)):
+            rows.extend([row] * len(row_metas))
+            distances.extend(row_distances)
+            metas.extend(row_metas)
+        return np.asarray(rows, dtype=np.int64), np.asarray(distances, dtype=np.float64), metas
+
+    def _rescore_document_rows(self, kind: str, query_embeddings: Sequence[Sequence[float]], result_metas: List[List[dict]],
+                               result_distances: List[List[float]], keep: int) -> Tuple[List[List[dict]], List[List[float]]]:
+        """
+        Sıkıştırılmış vektörlerle bulunan adayları, saklanan tam boyutlu float32 kopyalarıyla
+        yeniden puanlar ve her satırda en iyi `keep` adayı bırakır. Kopyası olmayan adaylar
+        (ör. sıkıştırma açılmadan önce yazılanlar) yeniden encode edilmez; sıkıştırılmış
+        mesafeleriyle sıralamaya girer.
+        """
+        fragment_ids = [[self._document_fragment_id(kind, meta) for meta in row] for row in result_metas]
+        full_vectors = self._load_full_document_vectors(list(dict.fromkeys(i for row in fragment_ids for i in row)))
+        queries = normalize_rows(query_embeddings)
+
+        rescored_metas, rescored_distances, missing = [], [], 0
+        for query, row_metas, row_ids, row_distances in zip(queries, result_metas, fragment_ids, result_distances):
+            distances = np.asarray(row_distances, dtype=np.float64)
+            for i, fragment_id in enumerate(row_ids):
+                vector = full_vectors.get(fragment_id)
+                if vector is not None and len(vector) == len(query):
+                    distances[i] = 2.0 - 2.0 * float(vector @ query)
+                else:
+                    missing += 1
+            order = np.argsort(distances, kind="stable")[:keep]
+            rescored_metas.append([row_metas[i] for i in order])
+            rescored_distances.append(distances[order].tolist())
+        if missing:
+            logger.debug(f"{missing} '{kind}' candidates have no full-precision copy; kept their compressed distances.")
+        return rescored_metas, rescored_distances
 
     def query_prediction_metas(self, query_text: str, n_results: int = 5) -> List[dict]:
         """Verilen bir metne göre prediction'lar içinde anlamsal arama yapar (analiz script'i için)."""
         emb = create_embedding(query_text)
-        results = self.prediction_collection.query(
-            query_embeddings=[emb],
-            n_results=n_results,
-            where={"type": {"$in": ["prompt_text", "keyword"]}}
-        )
+        result_metas, result_distances = self._query(PREDICTIONS, [emb], n_results, ["prompt_text", "keyword"])
         hits = []
-        if results and results["metadatas"] and results["distances"]:
-            for meta, dist in zip(results["metadatas"][0], results["distances"][0]):
+        if result_metas and result_distances:
+            for meta, dist in zip(result_metas[0], result_distances[0]):
                 hits.append({"prediction_id": meta["prediction_id"], "type": meta["type"], "text": str(meta["text"]), "distance": dist})
         return sorted(hits, key=lambda x: x["distance"])
 
+    @stage_timer.timed("vector_search.find_similar_predictions")
+    def search_predictions(self, query_text: str, query_keywords: List[str], top_k: int = 5) -> PredictionSearchResult:
+        """
+        Prompt metni ve anahtar kelimeler üzerinden tek sorguluk hibrit arama yapar ve
+        sonuçları prediction bazında skorlanmış dizilere indirger (bkz. PredictionSearchResult).
+        """
+        texts = ([query_text] if query_text else []) + [kw for kw in (query_keywords or []) if kw]
+        if not texts:
+            return PredictionSearchResult.empty(0)
+
+        query_embeddings = create_embeddings(texts)
+        index = self._get_prediction_index()
+        if index is not None:
+            rows, distances, owners, types = index.search(query_embeddings, top_k, types=("prompt_text", "keyword"))
+            is_keyword = types == "keyword"
+        else:
+            result_metas, result_distances = self._query(PREDICTIONS, query_embeddings, top_k, ["prompt_text", "keyword"])
+            rows, distances, owners, is_keyword = [], [], [], []
+            for row, (row_metas, row_distances) in enumerate(zip(result_metas, result_distances)):
+                for meta, distance in zip(row_metas, row_distances):
+                    rows.append(row)
+                    distances.append(distance)
+                    owners.append(int(meta["prediction_id"]))
+                    is_keyword.append(meta["type"] == "keyword")
+        if not len(owners):
+            return PredictionSearchResult.empty(len(texts))
+
+        prediction_ids, owner_index = np.unique(np.asarray(owners, dtype=np.int64), return_inverse=True)
+        rows = np.asarray(rows, dtype=np.int64)
+        distances = np.asarray(distances, dtype=np.float32)
+
+        best_distance = np.full((len(prediction_ids), len(texts)), np.inf, dtype=np.float32)
+        np.minimum.at(best_distance, (owner_index, rows), distances)
+        hit_counts = np.bincount(owner_index, minlength=len(prediction_ids))
+        keyword_hits = np.bincount(owner_index, weights=np.asarray(is_keyword, dtype=np.float32), minlength=len(prediction_ids))
+
+        search = PredictionSearchResult(prediction_ids, best_distance, hit_counts, keyword_hits.astype(np.int64))
+        logger.info(f"Hybrid search yielded a total of {len(prediction_ids)} unique prediction candidates.")
+        return search
+
     def find_similar_predictions(self, query_text: str, query_keywords: List[str], top_k: int = 5) -> List[int]:
         """
         Prompt metni ve anahtar kelimeler üzerinden verimli bir hibrit arama yapar
-        ve en alakalı Prediction ID'lerini döndürür.
+        ve en alakalı Prediction ID'lerini (skora göre azalan sırada) döndürür.
         """
-        if not query_text and not query_keywords:
-            return []
+        return self.search_predictions(query_text, query_keywords, top_k).ranked_ids()
+
+    @staticmethod
+    def _distance_limits(query_text: str, query_keywords: List[str], max_text_distance: float | None,
+                         max_keyword_distance: float | None) -> np.ndarray | None:
+        """Sorgu vektörü sırasıyla (metin, anahtar kelimeler) mesafe sınırları; sınır verilmediyse None."""
+        if max_text_distance is None and max_keyword_distance is None:
+            return None
+        num_keywords = len([kw for kw in (query_keywords or []) if kw])
+        limits = ([np.inf if max_text_distance is None else max_text_distance] if query_text else []) + \
+                 [np.inf if max_keyword_distance is None else max_keyword_distance] * num_keywords
+        return np.asarray(limits, dtype=np.float32)
 
-        query_embeddings = []
-        texts_to_embed = []
-        if query_text:
-            texts_to_embed.append(query_text)
-        if query_keywords:
-            texts_to_embed.extend([kw for kw in query_keywords if kw])
-            
-        if not texts_to_embed:
+    def find_candidate_predictions(self, db, query_text: str, query_keywords: List[str], top_k: int = 5,
+                                   limit: int | None = None, max_text_distance: float | None = None,
+                                   max_keyword_distance: float | None = None) -> list:
+        """
+        Hibrit aramanın en iyi `limit` adayını Prediction satırları olarak (skora göre sıralı) döndürür.
+        `max_text_distance`/`max_keyword_distance` verilirse, metin veya herhangi bir anahtar kelime
+        vektörüne bu mesafeden yakın parçası olmayan adaylar sıralamadan önce elenir.
+        Varsayılan uygulama arama + `Prediction.id IN (...)` sorgusudur; PgVectorStore ikisini
+        tek SQL sorgusunda yapar.
+        """
+        from src.database import Prediction
+
+        search = self.search_predictions(query_text, query_keywords, top_k)
+        limits = self._distance_limits(query_text, query_keywords, max_text_distance, max_keyword_distance)
+        if limits is not None and len(search):
+            search = search.within(limits)
+        ranked_ids = search.ranked_ids(limit)
+        if not ranked_ids:
             return []
+        rows = {pred.id: pred for pred in db.query(Prediction).filter(Prediction.id.in_(ranked_ids)).all()}
+        return [rows[pid] for pid in ranked_ids if pid in rows]
+
+    # --- Bakım ---
 
-        query_embeddings = embedding_model.encode(texts_to_embed).tolist()
+    def compact_duplicates(self, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Eski (hash() tabanlı) ID'lerle yazılmış ve aynı içeriği tekrarlayan vektörleri bulur.
+        Her (sahip, tip, metin) grubu için kanonik içerik-hash ID'li tek kayıt bırakılır;
+        kanonik kaydı olmayan gruplar önce o ID ile yeniden yazılır, ardından eskiler silinir.
+        """
+        report = {}
+        for kind, owner_key, make_id in (
+            (DOCUMENTS, "document_id", document_meta_id),
+            (PREDICTIONS, "prediction_id", prediction_meta_id),
+        ):
+            report[kind] = self._compact_collection(kind, owner_key, make_id, dry_run)
+        if not dry_run:
+            # ID'ler değişti; indeks bir sonraki kullanımda depodan yeniden yüklenir
+            self._prediction_index_loaded = False
+        return report
+
+    def _compact_collection(self, kind: str, owner_key: str, make_id, dry_run: bool) -> Dict[str, int]:
+        groups: Dict[str, List[str]] = {}
+        total = 0
+        for ids, _, metas in self._scan(kind, include_embeddings=False):
+            for meta_id, meta in zip(ids, metas):
+                groups.setdefault(make_id(meta[owner_key], meta["type"], meta["text"]), []).append(meta_id)
+            total += len(ids)
+
+        to_delete: List[str] = []
+        to_migrate: Dict[str, str] = {}   # kanonik ID -> kopyalanacak mevcut kayıt
+        for canonical_id, member_ids in groups.items():
+            if canonical_id in member_ids:
+                to_delete.extend(meta_id for meta_id in member_ids if meta_id != canonical_id)
+            else:
+                to_migrate[canonical_id] = member_ids[0]
+                to_delete.extend(member_ids)
+
+        stats = {"total": total, "unique": len(groups), "migrated": len(to_migrate), "deleted": len(to_delete)}
+        logger.info(f"Compaction plan for '{kind}': {stats}{' (dry run)' if dry_run else ''}.")
+        if dry_run:
+            return stats
+
+        migrate_items = list(to_migrate.items())
+        for start in range(0, len(migrate_items), self.COMPACTION_PAGE_SIZE):
+            chunk = migrate_items[start:start + self.COMPACTION_PAGE_SIZE]
+            source_ids, source_embeddings, source_metas = self._get_by_ids(kind, [old_id for _, old_id in chunk])
+            by_id = {meta_id: (emb, meta) for meta_id, emb, meta in zip(source_ids, source_embeddings, source_metas)}
+            self._upsert(
+                kind,
+                [new_id for new_id, _ in chunk],
+                [list(map(float, by_id[old_id][0])) for _, old_id in chunk],
+                [by_id[old_id][1] for _, old_id in chunk]
+            )
+        for start in range(0, len(to_delete), self.COMPACTION_PAGE_SIZE):
+            self._delete(kind, to_delete[start:start + self.COMPACTION_PAGE_SIZE])
+        return stats
 
-        results = self.prediction_collection.query(
+class ChromaVectorStore(VectorStore):
+    """Yerel, kalıcı ChromaDB dizini üzerinde çalışan uygulama (tek yazıcı süreç)."""
+
+    def __init__(self):
+        import chromadb
+
+        super().__init__()
+        self.client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
+        self.document_collection = self.client.get_or_create_collection(name=DOCUMENTS)
+        self.prediction_collection = self.client.get_or_create_collection(name=PREDICTIONS)
+        self.chunk_collection = self.client.get_or_create_collection(name=CHUNKS)
+        logger.info("VectorStore initialized with 'documents', 'document_chunks' and 'predictions' collections.")
+
+    def _collection(self, kind: str):
+        return {DOCUMENTS: self.document_collection, CHUNKS: self.chunk_collection}.get(kind, self.prediction_collection)
+
+    @staticmethod
+    def _owner_key(kind: str) -> str:
+        return "prediction_id" if kind == PREDICTIONS else "document_id"
+
+    def _upsert(self, kind, ids, embeddings, metadatas):
+        self._collection(kind).upsert(ids=ids, embeddings=embeddings, metadatas=metadatas)
+
+    def _query(self, kind, query_embeddings, n_results, types):
+        results = self._collection(kind).query(
             query_embeddings=query_embeddings,
-            n_results=top_k,
-            where={"type": {"$in": ["prompt_text", "keyword"]}}
+            n_results=n_results,
+            where={"type": {"$in": types}},
+            include=["metadatas", "distances"]
+        )
+        if not results or not results["ids"]:
+            return [], []
+        return results["metadatas"], results["distances"]
+
+    def _get_by_owner(self, kind, owner_ids):
+        results = self._collection(kind).get(
+            where={self._owner_key(kind): {"$in": owner_ids}},
+            include=["embeddings", "metadatas"]
         )
+        # Chroma gömmeleri NumPy dizisi olarak döndürür; doğruluk değeri belirsiz olduğu için `or` kullanılamaz
+        embeddings = results.get("embeddings")
+        embeddings = [] if embeddings is None else list(embeddings)
+        return embeddings, list(results.get("metadatas") or [])
+
+    def _get_by_ids(self, kind, ids):
+        results = self._collection(kind).get(ids=ids, include=["embeddings", "metadatas"])
+        return results["ids"], results["embeddings"], results["metadatas"]
+
+    def _scan(self, kind, include_embeddings):
+        collection = self._collection(kind)
+        include = ["embeddings", "metadatas"] if include_embeddings else ["metadatas"]
+        offset = 0
+        while True:
+            page = collection.get(include=include, limit=self.COMPACTION_PAGE_SIZE, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                return
+            yield ids, (page["embeddings"] if include_embeddings else None), page["metadatas"]
+            offset += len(ids)
+
+    def _delete(self, kind, ids):
+        self._collection(kind).delete(ids=ids)
 
-        candidate_ids = set()
-        if results and results['ids']:
-            for id_list in results['ids']:
-                for single_id, meta_data in zip(id_list, results['metadatas'][results['ids'].index(id_list)]):
-                    candidate_ids.add(meta_data['prediction_id'])
+    def reset(self):
+        for name in (DOCUMENTS, CHUNKS, PREDICTIONS):
+            try:
+                self.client.delete_collection(name=name)
+            except Exception as e:
+                logger.warning(f"Could not delete Chroma collection '{name}' (might not exist): {e}")
+        self.document_collection = self.client.get_or_create_collection(name=DOCUMENTS)
+        self.prediction_collection = self.client.get_or_create_collection(name=PREDICTIONS)
+        self.chunk_collection = self.client.get_or_create_collection(name=CHUNKS)
+        self._clear_full_document_vectors()
+        self._prediction_index_loaded = False
+        logger.info("ChromaDB 'documents', 'document_chunks' and 'predictions' collections re-created.")
 
-        logger.info(f"Hybrid search yielded a total of {len(candidate_ids)} unique prediction candidates.")
-        return list(candidate_ids)
+def create_vector_store() -> VectorStore:
+    backend = config.VECTOR_BACKEND.lower()
+    if backend == "pgvector":
+        from src.pgvector_store import PgVectorStore
+        return PgVectorStore()
+    if backend != "chroma":
+        logger.warning(f"Unknown VECTOR_BACKEND '{config.VECTOR_BACKEND}', falling back to Chroma.")
+    return ChromaVectorStore()
 
 # Singleton instance
-vector_store = VectorStore()
\ No newline at end of file
+vector_store = create_vector_store()
@@ -0,0 +1,142 @@
+"""
+Uçtan uca throughput benchmark'ı.
+
+Yerel sahte OpenAI sunucusunu (test/fake_openai_server.py) başlatır, N adet sentetik
+frontmatter dokümanı içeri aktarır ve M adet sorgu çalıştırır. Sonunda her aşama için
+p50/p95/p99 gecikmeleri ve ingest throughput'u (docs/s) raporlanır.
+
+Gerçek OpenAI API'si çağrılmaz. Veritabanı olarak varsayılan şekilde geçici bir SQLite
+dosyası ve geçici bir Chroma dizini kullanılır (--db-url ile Postgres verilebilir).
+
+Kullanım:
+    python test/benchmark_pipeline.py --docs 200 --queries 20 --latency-ms 300
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(project_root)
+sys.path.append(script_dir)
+
+from fake_openai_server import FakeOpenAIServer, DEFAULT_LATENCY_MS
+
+TOPICS = [
+    ("imar hakkı aktarımı", ["imar hakkı", "kamulaştırma", "kentsel dönüşüm"]),
+    ("elektrik üretimi", ["yenilenebilir enerji", "elektrik", "güneş"]),
+    ("otomobil satışları", ["otomotiv", "satış", "marka"]),
+    ("e-ticaret cezaları", ["e-ticaret", "rekabet kurumu", "ceza"]),
+    ("fintek yatırımları", ["fintek", "girişim", "yatırım"]),
+    ("orman projeleri", ["ağaçlandırma", "orman", "çevre"]),
+]
+
+def write_synthetic_documents(directory: str, count: int, seed: int = 42) -> list[str]:
+    """Yayın tarihine göre sıralı, deterministik sentetik markdown dokümanları üretir."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        topic, keywords = rng.choice(TOPICS)
+        day = 1 + i % 28
+        month = 1 + (i // 28) % 12
+        chosen = rng.sample(keywords, k=2)
+        body = " ".join(f"{topic} ile ilgili gelişme {i}-{j}: {rng.choice(keywords)}." for j in range(8))
+        path = os.path.join(directory, f"synthetic_{i:05d}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                "---\n"
+                f"url: https://example.com/synthetic/{i}\n"
+                f"pub_date: '2025-{month:02d}-{day:02d}'\n"
+                f"title: \"{topic.title()} #{i}\"\n"
+                f"summary: \"{topic} hakkında sentetik özet {i}. {body[:120]}\"\n"
+                "keywords:\n" + "".join(f"- {kw}\n" for kw in chosen) +
+                "entities:\n"
+                "- value: Çevre ve Şehircilik Bakanlığı\n"
+                "  type: ORGANIZATION\n"
+                "---\n"
+                f"# {topic.title()} #{i}\n{body}\n"
+            )
+        paths.append(path)
+    return paths
+
+def synthetic_queries(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    templates = ["{topic} nedir ve vatandaş ne kazanır?", "{topic} hakkında son gelişmeler nelerdir?", "{topic} neden önemli?"]
+    return [rng.choice(templates).format(topic=rng.choice(TOPICS)[0]) for _ in range(count)]
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="proactive_bench_")
+    latency = {t: args.latency_ms for t in DEFAULT_LATENCY_MS}
+    server = FakeOpenAIServer(latency_ms=latency).start_in_background()
+
+    # src modülleri config'i import anında okuduğu için ortam değişkenleri önce ayarlanır
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["POSTGRES_DB_URL"] = args.db_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CHROMA_DB_PATH"] = os.path.join(workdir, "chroma_db")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from src.database import create_tables
+    from src.core_logic import handle_new_query, orchestration_stats
+    from src.ingestion_pipeline import IngestionPipeline
+    from src.metrics import stage_timer
+
+    create_tables()
+    doc_dir = os.path.join(workdir, "documents")
+    os.makedirs(doc_dir)
+    doc_paths = write_synthetic_documents(doc_dir, args.docs)
+    queries = synthetic_queries(args.queries)
+
+    print(f"Benchmark workdir: {workdir}")
+    print(f"Fake OpenAI server: {server.base_url} (latency {args.latency_ms} ms per call)")
+
+    # Dokümanların yarısı sorgulardan önce (fulfill yolu için bağlam), yarısı sonra
+    # (sorguların oluşturduğu prediction'ları güncelleme yolu için) aktarılır.
+    half = len(doc_paths) // 2
+    ingest_seconds = 0.0
+    ingested = 0
+
+    started = time.perf_counter()
+    stats = IngestionPipeline(workers=args.workers, batch_size=args.batch_size).run(doc_paths[:half])
+    ingest_seconds += time.perf_counter() - started
+    ingested += stats["stored"]
+
+    query_latencies = []
+    for query_text in queries:
+        started = time.perf_counter()
+        handle_new_query(query_text, wait=True)
+        query_latencies.append(time.perf_counter() - started)
+        stage_timer.record("handle_new_query", query_latencies[-1])
+
+    started = time.perf_counter()
+    stats = IngestionPipeline(workers=args.workers, batch_size=args.batch_size).run(doc_paths[half:])
+    ingest_seconds += time.perf_counter() - started
+    ingested += stats["stored"]
+
+    server.stop()
+
+    print("\n" + "=" * 90)
+    print("                              BENCHMARK SONUÇLARI")
+    print("=" * 90)
+    print(f"Dokümanlar: {ingested}/{len(doc_paths)} aktarıldı, {ingest_seconds:.2f}s -> {ingested / ingest_seconds if ingest_seconds else 0:.2f} docs/s")
+    print(f"Sorgular:   {len(queries)} çalıştırıldı")
+    print(f"LLM çağrıları (sahte sunucu): {server.call_counts}")
+    orchestration = orchestration_stats()
+    print(f"Orkestrasyon: {orchestration['fast_path']} hızlı yol / {orchestration['llm_calls']} LLM "
+          f"({orchestration['fast_path_ratio']:.0%} atlandı, ~{orchestration['estimated_seconds_saved']:.2f}s kazanıldı)")
+    print("-" * 90)
+    print(stage_timer.format_summary())
+    print("=" * 90 + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against a local fake OpenAI server.")
+    parser.add_argument("--docs", type=int, default=100, help="Number of synthetic documents to ingest.")
+    parser.add_argument("--queries", type=int, default=10, help="Number of queries to issue.")
+    parser.add_argument("--latency-ms", type=int, default=200, help="Simulated LLM latency per call.")
+    parser.add_argument("--workers", type=int, default=4, help="Ingestion prediction update workers.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Ingestion embedding batch size.")
+    parser.add_argument("--db-url", type=str, default=None, help="SQLAlchemy URL (defaults to a temporary SQLite file).")
+    run_benchmark(parser.parse_args())
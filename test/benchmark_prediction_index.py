@@ -0,0 +1,117 @@
+"""
+Prediction araması için süreç içi NumPy indeksi (src/prediction_index.py) ile Chroma
+yolunun karşılaştırmalı benchmark'ı.
+
+Her boyut için rastgele (normalize) prompt/anahtar kelime vektörleri hem geçici bir
+Chroma koleksiyonuna hem de PredictionIndex'e yüklenir; ardından aynı sorgu batch'leri
+ile ortalama/p95 sorgu gecikmesi ve Chroma'nın (HNSW, yaklaşık) kesin top-k'ya göre
+recall@k değeri raporlanır. Embedding modeli yüklenmez.
+
+Kullanım:
+    python test/benchmark_prediction_index.py --sizes 1000 10000 100000 --dim 1024 --queries 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(project_root)
+
+from src.prediction_index import PredictionIndex
+
+CHROMA_MAX_BATCH = 5000
+
+def synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build_chroma(vectors: np.ndarray, workdir: str):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(workdir, f"chroma_{len(vectors)}"))
+    collection = client.get_or_create_collection(name="predictions")
+    for start in range(0, len(vectors), CHROMA_MAX_BATCH):
+        end = min(start + CHROMA_MAX_BATCH, len(vectors))
+        collection.add(
+            ids=[f"pred_{i // 4}_{'prompt_text' if i % 4 == 0 else 'keyword'}_{i}" for i in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            metadatas=[{"prediction_id": i // 4, "type": "prompt_text" if i % 4 == 0 else "keyword", "text": f"t{i}"} for i in range(start, end)],
+        )
+    return collection
+
+def build_index(vectors: np.ndarray) -> PredictionIndex:
+    index = PredictionIndex(dim=vectors.shape[1])
+    ids = range(len(vectors))
+    index.add([f"m{i}" for i in ids], [i // 4 for i in ids], ["prompt_text" if i % 4 == 0 else "keyword" for i in ids],
+              [f"t{i}" for i in ids], vectors)
+    return index
+
+def timed_queries(fn, query_batches):
+    latencies = []
+    results = []
+    for batch in query_batches:
+        started = time.perf_counter()
+        results.append(fn(batch))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return results, sum(latencies) / len(latencies), latencies[max(0, int(0.95 * len(latencies)) - 1)]
+
+def recall(found: list[set], expected: list[set]) -> float:
+    hits = sum(len(f & e) for f, e in zip(found, expected))
+    total = sum(len(e) for e in expected)
+    return hits / total if total else 0.0
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="prediction_index_bench_")
+    print(f"{'vectors':>9} {'path':<8} {'build s':>9} {'mean ms':>9} {'p95 ms':>9} {'recall@k':>9}")
+    for size in args.sizes:
+        vectors = synthetic_vectors(size, args.dim, seed=size)
+        queries = synthetic_vectors(args.queries * args.batch, args.dim, seed=size + 1)
+        query_batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+
+        started = time.perf_counter()
+        index = build_index(vectors)
+        index_build = time.perf_counter() - started
+        index_results, index_mean, index_p95 = timed_queries(
+            lambda batch: index.search(batch, args.top_k, types=("prompt_text", "keyword")), query_batches)
+
+        # Referans: tam matris çarpımıyla kesin top-k; recall prediction ID kümeleri üzerinden ölçülür
+        expected = []
+        for batch in query_batches:
+            top = np.argsort(-(batch @ vectors.T), axis=1)[:, :args.top_k]
+            expected.extend(set((row // 4).tolist()) for row in top)
+        found = []
+        for rows, _, owners, _ in index_results:
+            found.extend(set(owners[rows == r].tolist()) for r in range(args.batch) if np.any(rows == r))
+        print(f"{size:>9} {'numpy':<8} {index_build:>9.2f} {index_mean * 1000:>9.2f} {index_p95 * 1000:>9.2f} {recall(found, expected):>9.3f}")
+
+        if args.skip_chroma:
+            continue
+        started = time.perf_counter()
+        collection = build_chroma(vectors, workdir)
+        chroma_build = time.perf_counter() - started
+        chroma_results, chroma_mean, chroma_p95 = timed_queries(
+            lambda batch: collection.query(query_embeddings=batch.tolist(), n_results=args.top_k,
+                                           where={"type": {"$in": ["prompt_text", "keyword"]}}, include=["distances"]),
+            query_batches)
+
+        found = [
+            {int(meta_id.rsplit("_", 1)[1]) // 4 for meta_id in row_ids}
+            for result in chroma_results for row_ids in result["ids"]
+        ]
+        print(f"{size:>9} {'chroma':<8} {chroma_build:>9.2f} {chroma_mean * 1000:>9.2f} {chroma_p95 * 1000:>9.2f} {recall(found, expected):>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory prediction index against Chroma.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Number of stored vectors.")
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension.")
+    parser.add_argument("--queries", type=int, default=100, help="Number of query batches per size.")
+    parser.add_argument("--batch", type=int, default=8, help="Query vectors per batch (prompt + keywords).")
+    parser.add_argument("--top-k", type=int, default=50, help="Neighbours per query vector.")
+    parser.add_argument("--skip-chroma", action="store_true", help="Only benchmark the in-memory index.")
+    run(parser.parse_args())
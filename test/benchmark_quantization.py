@@ -0,0 +1,109 @@
+"""
+Doküman vektörlerinin sıkıştırılmış saklanması (src/quantization.py) için bellek ve
+recall@k benchmark'ı.
+
+Her (hassasiyet, boyut) yapılandırması için vektörler Matryoshka ile kesilip float16
+olarak kodlanır; sorgular kodlanmış matrise karşı aranır ve sonuçlar tam hassasiyetli
+(float32, tam boyut) kesin top-k ile karşılaştırılır. "rescored" sütunu, k * factor adayın
+tam vektörlerle yeniden puanlandığı (VectorStore.query_document_metas'taki yol) recall'dur.
+Bellek, indeks yapısı hariç saf vektör depolamasıdır.
+
+Varsayılan olarak yalnızca bir vektör deposunun saklayabildiği hassasiyetler ölçülür
+(quantization.STORABLE_PRECISIONS). int8 (vektör başına ölçekli) --precisions ile istenebilir;
+hiçbir depo bu kodlamayı saklamadığı için satırı '*' ile işaretlenir ve yalnızca karşılaştırma içindir.
+
+Gerçek vektörler için embedding önbelleği dizini verilebilir (--cache-dir); aksi halde,
+Matryoshka modellerine benzer şekilde varyansı ilk boyutlarda yoğunlaşan sentetik
+vektörler kullanılır. Embedding modeli yüklenmez.
+
+Kullanım:
+    python test/benchmark_quantization.py --size 100000 --dims 1024 512 256 --top-k 20
+    python test/benchmark_quantization.py --cache-dir ./embedding_cache --queries 500
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(project_root)
+
+from src import quantization
+
+def synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Kümeli veri + boyut indeksiyle azalan standart sapma (Matryoshka benzeri)
+    centers = rng.standard_normal((max(1, count // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors *= (1.0 / np.sqrt(1.0 + np.arange(dim) / 32.0)).astype(np.float32)
+    return quantization.normalize(vectors)
+
+def cached_vectors(cache_dir: str) -> np.ndarray:
+    with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+        dim = json.load(f)["dim"]
+    matrix = np.fromfile(os.path.join(cache_dir, "vectors.f32"), dtype=np.float32)
+    return quantization.normalize(matrix[:len(matrix) // dim * dim].reshape(-1, dim))
+
+def top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, similarities.shape[1])
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(similarities, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def recall(found: np.ndarray, expected: np.ndarray) -> float:
+    hits = sum(len(set(f.tolist()) & set(e.tolist())) for f, e in zip(found, expected))
+    return hits / expected.size if expected.size else 0.0
+
+def run(args):
+    if args.cache_dir:
+        data = cached_vectors(args.cache_dir)
+        print(f"Loaded {len(data)} vectors (dim {data.shape[1]}) from embedding cache '{args.cache_dir}'.")
+    else:
+        data = synthetic_vectors(args.size + args.queries, args.dim, seed=7)
+        print(f"Generated {len(data)} synthetic vectors (dim {data.shape[1]}).")
+    rng = np.random.default_rng(11)
+    query_rows = rng.choice(len(data), size=min(args.queries, len(data) // 10), replace=False)
+    base = np.delete(data, query_rows, axis=0)
+    queries = data[query_rows]
+    full_dim = base.shape[1]
+
+    expected = top_k(queries @ base.T, args.top_k)
+    baseline_bytes = len(base) * quantization.bytes_per_vector(full_dim, "float32")
+
+    print(f"{'precision':<10} {'dim':>5} {'MB':>9} {'ratio':>7} {'recall@k':>9} {'rescored':>9}")
+    for dim in args.dims:
+        dim = min(dim, full_dim)
+        truncated = quantization.truncate(base, dim)
+        truncated_queries = quantization.truncate(queries, dim)
+        for precision in args.precisions:
+            codes, scales = quantization.quantize(truncated, precision)
+            approx = quantization.quantized_scores(truncated_queries, codes, scales)
+            memory = len(base) * quantization.bytes_per_vector(dim, precision)
+
+            plain = top_k(approx, args.top_k)
+            # Tam hassasiyetle yeniden puanlama: k * factor aday arasından kesin top-k
+            candidates = top_k(approx, args.top_k * args.rescore_factor)
+            exact = np.einsum("qd,qcd->qc", queries, base[candidates])
+            rescored = np.take_along_axis(candidates, np.argsort(-exact, axis=1)[:, :args.top_k], axis=1)
+
+            label = precision if precision in quantization.STORABLE_PRECISIONS else f"{precision}*"
+            print(f"{label:<10} {dim:>5} {memory / 2**20:>9.1f} {baseline_bytes / memory:>6.1f}x "
+                  f"{recall(plain, expected):>9.3f} {recall(rescored, expected):>9.3f}")
+    if any(precision not in quantization.STORABLE_PRECISIONS for precision in args.precisions):
+        print("* Not storable by any vector backend; shown for comparison only.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory and recall@k of quantized document vectors.")
+    parser.add_argument("--size", type=int, default=50000, help="Number of synthetic stored vectors.")
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic embedding dimension.")
+    parser.add_argument("--cache-dir", default=None, help="Use real vectors from an embedding cache directory.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out query vectors.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024, 512, 256], help="Matryoshka dimensions to test.")
+    parser.add_argument("--precisions", nargs="+", default=list(quantization.STORABLE_PRECISIONS),
+                        choices=quantization.PRECISIONS, help="Precisions to test (int8 is comparison-only).")
+    parser.add_argument("--top-k", type=int, default=20, help="Neighbours per query.")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Candidate multiplier for exact re-scoring.")
+    run(parser.parse_args())
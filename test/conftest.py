@@ -0,0 +1,60 @@
+"""
+pytest ortak ayarları.
+
+Ortam değişkenleri src.config import edilmeden önce ayarlanır: testler geçici bir SQLite
+veritabanı ve Chroma dizini kullanır, .env dosyasındaki gerçek servislere dokunmaz.
+
+Embedding modeli indirilmeden çalışabilmek için SentenceTransformer, kelimeleri sabit boyutlu
+vektöre özetleyen deterministik bir kodlayıcıyla değiştirilir. Vektörler (Qwen3-Embedding gibi)
+L2-normalizedir ve ortak kelimesi olan metinler benzer vektörler alır; src.processing'in önbellek ve normalize mantığı olduğu gibi çalışır.
+"""
+import hashlib
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+import sentence_transformers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_TEST_DIR = tempfile.mkdtemp(prefix="reactive-answer-tests-")
+os.environ.update({
+    "POSTGRES_DB_URL": f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}",
+    "CHROMA_DB_PATH": os.path.join(_TEST_DIR, "chroma"),
+    "EMBEDDING_CACHE_DIR": "",
+    "LLM_CACHE_URL": "",
+    "ANSWER_EVENTS_BACKEND": "local",
+    "TASK_QUEUE_BACKEND": "local",
+    "OPENAI_API_KEY": "test-key",
+    "LOG_LEVEL": "WARNING",
+})
+
+class HashingSentenceTransformer:
+    DIM = 64
+
+    def __init__(self, model_name: str, *args, **kwargs):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.DIM
+
+    def encode(self, texts, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), self.DIM), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                vectors[row, digest[0] % self.DIM] += 1.0
+                vectors[row, digest[1] % self.DIM] += 0.5
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        return vectors[0] if single else vectors
+
+sentence_transformers.SentenceTransformer = HashingSentenceTransformer
+
+# Betik olarak çalıştırılan dosyalar (gerçek servis veya model indirmesi gerektirir)
+collect_ignore = ["run_full_test.py", "test_cos_similarity.py"]
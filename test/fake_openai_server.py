@@ -0,0 +1,205 @@
+"""
+OpenAI chat completions uç noktasının deterministik, yerel bir taklidi.
+
+Gerçek API yerine bu sunucu kullanıldığında LLMGateway / AsyncLLMGateway
+çağrıları ağ ve maliyet olmadan, sabit (ayarlanabilir) gecikmelerle yanıtlanır.
+Prompt tipi, gateway'in system prompt'undaki ROLE satırından tespit edilir:
+decompose, orchestrate, fulfill, update, translate.
+
+Kullanım:
+    python test/fake_openai_server.py --port 8765 --latency-ms 200
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python scripts/query.py query --text "..."
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+PROMPT_TYPES = {
+    "expert system analyst": "decompose",
+    "expert system orchestrator": "orchestrate",
+    "data extraction engine": "fulfill",
+    "intelligence update analyst": "update",
+    "high-fidelity translation service": "translate",
+}
+
+DEFAULT_LATENCY_MS = {"decompose": 0, "orchestrate": 0, "fulfill": 0, "update": 0, "translate": 0}
+
+def detect_prompt_type(prompt: str) -> str:
+    for marker, prompt_type in PROMPT_TYPES.items():
+        if marker in prompt:
+            return prompt_type
+    return "unknown"
+
+def _stable_int(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+def _extract_quoted_after(prompt: str, header: str) -> str:
+    match = re.search(re.escape(header) + r'\s*\n\s*"(.*?)"\s*\n', prompt, re.S)
+    return match.group(1) if match else ""
+
+def _extract_json_after(prompt: str, header: str) -> Any:
+    idx = prompt.find(header)
+    if idx < 0:
+        return None
+    try:
+        return json.JSONDecoder().raw_decode(prompt[idx + len(header):].strip())[0]
+    except json.JSONDecodeError:
+        return None
+
+# --- Prompt tiplerine göre kalıp cevaplar ---
+
+def respond_decompose(prompt: str) -> Dict[str, Any]:
+    query = _extract_quoted_after(prompt, "USER QUERY:")
+    words = [w.strip("?.,!").lower() for w in query.split() if len(w.strip("?.,!")) > 3]
+    # Sorgudaki her iki anlamlı kelime grubu bir task'e dönüşür (en fazla 4)
+    groups = [words[i:i + 2] for i in range(0, min(len(words), 8), 2)] or [["general", "information"]]
+    language = "tr" if re.search(r"[çğıöşüÇĞİÖŞÜ]", query) else "en"
+    return {
+        "user_language_code": language,
+        "potential_tasks": [
+            {"prompt": f"Provide information about {' '.join(group)}.", "keywords": group}
+            for group in groups
+        ],
+    }
+
+def respond_orchestrate(prompt: str) -> Dict[str, Any]:
+    render_plan = [{"type": "paragraph", "content": "Cevap:"}]
+    predictions = []
+    task_blocks = re.split(r"\n\s*- For the required task ", prompt)[1:]
+    for i, block in enumerate(task_blocks):
+        task_prompt = re.match(r"'(.*?)':", block, re.S)
+        task_prompt = task_prompt.group(1) if task_prompt else f"Task {i}"
+        placeholder = f"item_{i}"
+        render_plan.append({"type": "list", "placeholder": placeholder, "item_template": "- {summary}", "empty_message": "Bilgi yok."})
+        reuse = re.search(r"Found existing Prediction \[ID: (\d+)", block.split("\n- For the required task")[0])
+        if reuse:
+            predictions.append({"placeholder_name": placeholder, "reuse_prediction_id": int(reuse.group(1))})
+        else:
+            predictions.append({
+                "placeholder_name": placeholder,
+                "new_prediction_prompt": task_prompt,
+                "keywords": [w.strip(".").lower() for w in task_prompt.split()[-2:]],
+            })
+    return {"render_plan": render_plan, "predictions": predictions}
+
+def respond_fulfill(prompt: str) -> Dict[str, Any]:
+    task = prompt.split("TASK TO FULFILL:", 1)[-1].strip().split("\n", 1)[0]
+    return {"is_translatable": True, "data": [{"summary": f"Synthetic answer for: {task}"}]}
+
+def respond_update(prompt: str) -> Dict[str, Any]:
+    # Güncellemelerin yarısı deterministik olarak "no_change" döner
+    if _stable_int(prompt) % 2 == 0:
+        return {"status": "no_change"}
+    task = _extract_quoted_after(prompt, "ORIGINAL TASK:") or "task"
+    return {"status": "updated", "is_translatable": True, "data": [{"summary": f"Updated synthetic answer for: {task} ({_stable_int(prompt) % 1000})"}]}
+
+def respond_translate(prompt: str) -> Any:
+    value = _extract_json_after(prompt, "JSON TO TRANSLATE:")
+    return value if value is not None else {}
+
+RESPONDERS = {
+    "decompose": respond_decompose,
+    "orchestrate": respond_orchestrate,
+    "fulfill": respond_fulfill,
+    "update": respond_update,
+    "translate": respond_translate,
+}
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        prompt_type = detect_prompt_type(prompt)
+
+        latency_ms = self.server.latency_ms.get(prompt_type, 0)
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+        responder = RESPONDERS.get(prompt_type)
+        content = responder(prompt) if responder else {"error": "unknown_prompt"}
+        self.server.record_call(prompt_type)
+
+        content_str = json.dumps(content, ensure_ascii=False)
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{_stable_int(prompt)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content_str},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content_str) // 4,
+                "total_tokens": len(prompt) // 4 + len(content_str) // 4,
+            },
+        })
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: Optional[Dict[str, int]] = None):
+        super().__init__((host, port), FakeOpenAIHandler)
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+        self.call_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_call(self, prompt_type: str):
+        with self._counts_lock:
+            self.call_counts[prompt_type] = self.call_counts.get(prompt_type, 0) + 1
+
+    def start_in_background(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a deterministic local OpenAI-compatible chat completions stub.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Latency applied to every prompt type.")
+    for prompt_type in DEFAULT_LATENCY_MS:
+        parser.add_argument(f"--{prompt_type}-latency-ms", type=int, default=None, help=f"Override latency for '{prompt_type}' prompts.")
+    args = parser.parse_args()
+
+    latency = {t: getattr(args, f"{t}_latency_ms") if getattr(args, f"{t}_latency_ms") is not None else args.latency_ms for t in DEFAULT_LATENCY_MS}
+    server = FakeOpenAIServer(args.host, args.port, latency)
+    print(f"Fake OpenAI server listening on {server.base_url} (latency ms: {latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -11,7 +11,8 @@ sys.path.append(project_root)
 
 from src.logger_config import setup_logging
 from src.database import get_db, Document, Prediction, UserQuery, TemplatePredictionsLink 
-from src.core_logic import handle_new_document, handle_new_query, update_user_query_subscription, get_cosine_similarity 
+from src.core_logic import handle_new_document, handle_new_query, update_user_query_subscription
+from src.processing import get_cosine_similarity
 from scripts.reset_database import reset_databases 
 from sqlalchemy.orm import joinedload 
 
@@ -72,7 +73,7 @@ def run_test_scenario():
     query_text_1 = "İmar hakkı aktarımı nedir ve vatandaş ne kazanır?"
     query_id_1 = None 
     try:
-        query_id_1 = handle_new_query(query_text=query_text_1)
+        query_id_1 = handle_new_query(query_text=query_text_1, wait=True)
 
         if query_id_1:
             print(f"✅ Sorgu '{query_text_1}' başarıyla işlendi. ID: {query_id_1}")
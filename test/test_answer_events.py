@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+from src.answer_events import LocalAnswerEventBus, answer_events, answer_version
+
+UPDATED_AT = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+def test_answer_version_increases_with_update_time():
+    assert answer_version(UPDATED_AT + timedelta(microseconds=1)) == answer_version(UPDATED_AT) + 1
+
+def test_subscriptions_receive_only_watched_queries():
+    bus = LocalAnswerEventBus()
+    watching = bus.subscribe(query_ids=[1])
+    everything = bus.subscribe()
+
+    bus.publish_updates([(1, UPDATED_AT), (2, UPDATED_AT)])
+    bus.publish([{"type": "resync"}])
+
+    assert [(e["type"], e.get("query_id")) for e in watching.drain()] == [("answer_updated", 1), ("resync", None)]
+    assert [e.get("query_id") for e in everything.drain()] == [1, 2, None]
+    assert watching.get(timeout=0.01) is None
+
+    watching.close()
+    assert bus.subscriber_count() == 1
+
+def test_full_queue_drops_oldest_events():
+    bus = LocalAnswerEventBus()
+    with bus.subscribe(max_queued=2) as subscription:
+        bus.publish_updates([(query_id, UPDATED_AT) for query_id in (1, 2, 3)])
+        assert [e["query_id"] for e in subscription.drain()] == [2, 3]
+        assert subscription.dropped == 1
+    assert bus.subscriber_count() == 0
+
+def test_idle_subscriptions_are_dropped():
+    bus = LocalAnswerEventBus(idle_seconds=0.0)
+    subscription = bus.subscribe()
+    subscription.last_read -= 1.0
+    bus.publish_updates([(1, UPDATED_AT)])
+    assert subscription.closed
+    assert bus.subscriber_count() == 0
+    assert subscription.drain() == []
+
+def test_postgres_backend_falls_back_to_local_events_on_sqlite(monkeypatch):
+    from src import answer_events as module
+
+    monkeypatch.setattr(module.config, "ANSWER_EVENTS_BACKEND", "postgres")
+    assert type(module.create_answer_event_bus()) is LocalAnswerEventBus
+    assert type(answer_events) is LocalAnswerEventBus
+
+def test_watched_queries_can_be_changed():
+    bus = LocalAnswerEventBus()
+    subscription = bus.subscribe()
+    subscription.set_query_ids(set())
+    bus.publish_updates([(1, UPDATED_AT)])
+    assert subscription.drain() == []
+
+    subscription.set_query_ids({2})
+    bus.publish_updates([(1, UPDATED_AT), (2, UPDATED_AT)])
+    bus.publish([{"type": "resync"}])
+    assert [event.get("query_id") for event in subscription.drain()] == [2, None]
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from src.core_logic import AnswerRegenerator
+
+def _recording_regenerator(monkeypatch, **kwargs) -> tuple[AnswerRegenerator, list]:
+    regenerator = AnswerRegenerator(**kwargs)
+    runs = []
+    done = threading.Event()
+
+    def run(prediction_ids):
+        runs.append(sorted(prediction_ids))
+        done.set()
+
+    monkeypatch.setattr(regenerator, "_run", run)
+    regenerator.done = done
+    return regenerator, runs
+
+def test_requests_run_immediately_without_debounce(monkeypatch):
+    regenerator, runs = _recording_regenerator(monkeypatch, debounce_seconds=0)
+    regenerator.request([3, 1])
+    regenerator.request([])
+    regenerator.request([2])
+    assert runs == [[1, 3], [2]]
+
+def test_requests_within_window_are_coalesced(monkeypatch):
+    regenerator, runs = _recording_regenerator(monkeypatch, debounce_seconds=0.1)
+    regenerator.request([1, 2])
+    regenerator.request([2, 3])
+    regenerator.request([4])
+    assert runs == []
+
+    assert regenerator.done.wait(2.0)
+    time.sleep(0.15)
+    assert runs == [[1, 2, 3, 4]]
+
+def test_max_delay_bounds_the_wait(monkeypatch):
+    regenerator, runs = _recording_regenerator(monkeypatch, debounce_seconds=5.0, max_delay_seconds=0.1)
+    started = time.monotonic()
+    regenerator.request([1])
+    regenerator.request([2])
+    assert regenerator.done.wait(2.0)
+    assert time.monotonic() - started < 1.0
+    assert runs == [[1, 2]]
+
+def test_flush_runs_pending_requests_now(monkeypatch):
+    regenerator, runs = _recording_regenerator(monkeypatch, debounce_seconds=5.0)
+    regenerator.request([7, 5])
+    regenerator.flush()
+    assert runs == [[5, 7]]
+    # Zamanlayıcı iptal edildi; boş flush bir şey çalıştırmaz
+    regenerator.flush()
+    assert runs == [[5, 7]]
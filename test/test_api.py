@@ -0,0 +1,83 @@
+import asyncio
+import importlib
+import tempfile
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.database import UserQuery, create_tables, session_scope
+
+@pytest.fixture(scope="module")
+def api():
+    # api import edilirken loglama app.log'a yazacak şekilde kurulur; dosya çalışma dizininde oluşmasın
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tempfile.mkdtemp(prefix="reactive-answer-api-"))
+        return importlib.import_module("api")
+
+@pytest.fixture
+def client(api):
+    # Lifespan (olay pompası) başlatılmaz; sonsuz akış uç noktaları burada test edilmez
+    return TestClient(api.app)
+
+@pytest.fixture
+def queries():
+    create_tables()
+    with session_scope() as db:
+        rows = {
+            "ready": UserQuery(query_text="Hazır sorgu (api test)", language="tr", final_answer="Cevap",
+                               answer_last_updated=datetime(2025, 1, 1, 12, 0)),
+            "failed": UserQuery(query_text="Hatalı sorgu (api test)", language="tr", processing_error="RuntimeError: boom"),
+            "pending": UserQuery(query_text="Bekleyen sorgu (api test)", language="tr"),
+        }
+        db.add_all(rows.values())
+        db.commit()
+        return {name: row.id for name, row in rows.items()}
+
+def test_get_query_answer_reports_status(client, queries):
+    ready = client.get(f"/queries/{queries['ready']}").json()
+    assert (ready["status"], ready["final_answer"]) == ("ready", "Cevap")
+    assert ready["version"] is not None
+
+    failed = client.get(f"/queries/{queries['failed']}").json()
+    assert (failed["status"], failed["error"]) == ("failed", "RuntimeError: boom")
+    assert client.get(f"/queries/{queries['pending']}").json()["status"] == "pending"
+    assert client.get("/queries/999999").status_code == 404
+
+def test_subscription_endpoints(client, queries):
+    query_id = queries["ready"]
+    assert client.post(f"/queries/{query_id}/subscription").json() == {"query_id": query_id, "is_subscribed": True}
+    assert client.get(f"/queries/{query_id}").json()["is_subscribed"] is True
+    assert client.delete(f"/queries/{query_id}/subscription").json()["is_subscribed"] is False
+    assert client.post("/queries/999999/subscription").status_code == 404
+
+def test_snapshot_events_cover_ready_and_failed_queries(api, queries):
+    events = asyncio.run(api._snapshot_events(list(queries.values())))
+    by_query = {event["query_id"]: event for event in events}
+
+    assert set(by_query) == {queries["ready"], queries["failed"]}
+    assert by_query[queries["ready"]]["type"] == "answer_updated"
+    assert by_query[queries["failed"]] == {"type": "query_failed", "query_id": queries["failed"], "error": "RuntimeError: boom"}
+
+def test_event_hub_fans_out_to_watching_clients(api):
+    async def scenario():
+        hub = api.AnswerEventHub(max_queued=2)
+        watching = hub.connect([1])
+        everything = hub.connect(None)
+        hub.watch(watching, [2])
+        hub.unwatch(watching, [1])
+
+        for query_id in (1, 2):
+            hub._fanout({"type": "answer_updated", "query_id": query_id})
+        assert [watching.get_nowait()["query_id"]] == [2]
+        assert watching.empty()
+
+        # Yavaş istemci: kuyruk dolunca birikenler atılır ve tek bir 'resync' gönderilir
+        hub._fanout({"type": "answer_updated", "query_id": 3})
+        assert everything.get_nowait() == {"type": "resync"}
+        assert everything.empty()
+
+        hub.disconnect(watching)
+        assert hub.client_count() == 1
+
+    asyncio.run(scenario())
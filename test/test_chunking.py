@@ -0,0 +1,49 @@
+from src.chunking import chunk_markdown, estimate_tokens
+
+CONTENT = """# Ekonomi
+
+Enflasyon mart ayında yüzde 3 arttı. Merkez bankası faizleri sabit tuttu.
+
+İşsizlik oranı geriledi.
+
+## Nüfus
+
+İzmir'in nüfusu 4,4 milyondur.
+"""
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Merhaba dünya!") == 4   # ceil(3 * 1.3)
+
+def test_chunks_follow_headings_and_merge_paragraphs():
+    chunks = chunk_markdown(CONTENT, max_tokens=300)
+
+    assert [chunk["heading"] for chunk in chunks] == ["Ekonomi", "Nüfus"]
+    # Aynı bölümdeki iki paragraf tek parçada birleşir
+    assert "Enflasyon" in chunks[0]["text"] and "İşsizlik" in chunks[0]["text"]
+    assert chunks[1]["text"] == "Nüfus\nİzmir'in nüfusu 4,4 milyondur."
+    assert [chunk["index"] for chunk in chunks] == [0, 1]
+
+def test_offsets_point_back_into_content():
+    for chunk in chunk_markdown(CONTENT, max_tokens=20):
+        body = CONTENT[chunk["start"]:chunk["end"]].strip()
+        assert chunk["text"].endswith(body)
+        assert not body.startswith("#")
+
+def test_chunks_stay_within_token_budget():
+    long_paragraph = " ".join(f"Cümle numarası {i} burada biter." for i in range(60))
+    for max_tokens in (10, 25, 80):
+        chunks = chunk_markdown(f"# Başlık\n\n{long_paragraph}\n", max_tokens=max_tokens)
+        assert len(chunks) > 1
+        assert all(chunk["tokens"] <= max_tokens for chunk in chunks)
+        assert all(chunk["heading"] == "Başlık" for chunk in chunks)
+
+def test_sentence_longer_than_budget_is_split_by_words():
+    sentence = " ".join(["kelime"] * 50)
+    chunks = chunk_markdown(sentence, max_tokens=13)
+    assert len(chunks) == 5
+    assert " ".join(chunk["text"] for chunk in chunks) == sentence
+
+def test_empty_content():
+    assert chunk_markdown("") == []
+    assert chunk_markdown("# Sadece başlık\n") == []
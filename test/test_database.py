@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+
+from src.database import Prediction, create_tables, engine, session_scope
+from src.migrations import applied_versions, rollback_migration, run_migrations, stamp_migrations, supports_migrations
+
+def test_create_tables_on_sqlite_skips_postgres_only_ddl():
+    create_tables()
+    create_tables()  # tekrar çalıştırılabilir olmalı
+
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("predictions")}
+    assert "ux_predictions_prompt_md5" not in indexes
+    assert indexes["ux_predictions_prompt"]["unique"]
+    assert not supports_migrations(engine)
+    assert run_migrations(engine) == []
+    assert stamp_migrations(engine) == []
+    assert applied_versions(engine) == []
+    with pytest.raises(ValueError):
+        rollback_migration(engine, "0001_hot_path_indexes")
+
+def test_prediction_prompts_stay_unique_on_sqlite():
+    create_tables()
+    prompt = "Provide the current population of Ankara."
+    with session_scope() as db:
+        db.add(Prediction(prediction_prompt=prompt, base_language_code="en"))
+        db.commit()
+    with session_scope() as db:
+        db.add(Prediction(prediction_prompt=prompt, base_language_code="en"))
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+def test_session_scope_rolls_back_on_error():
+    create_tables()
+    prompt = "Provide the area of Konya (session scope test)."
+    with pytest.raises(RuntimeError):
+        with session_scope() as db:
+            db.add(Prediction(prediction_prompt=prompt, base_language_code="en"))
+            db.flush()
+            raise RuntimeError("boom")
+    with session_scope() as db:
+        assert db.query(Prediction).filter_by(prediction_prompt=prompt).first() is None
+
+def test_nested_thread_session_scopes_share_one_session():
+    import threading
+
+    from src.database import thread_session_scope
+
+    with thread_session_scope() as outer:
+        with thread_session_scope() as inner:
+            assert inner is outer
+        # İç kapsam bitince oturum açık kalır
+        assert outer.is_active
+        other = []
+
+        def use_session():
+            with thread_session_scope() as db:
+                other.append(db)
+
+        thread = threading.Thread(target=use_session)
+        thread.start()
+        thread.join()
+        assert other[0] is not outer
+    with thread_session_scope() as fresh:
+        assert fresh is not outer
+
+def test_pool_stats_reports_pool_and_checkout_counters():
+    from src.database import pool_stats
+
+    with session_scope() as db:
+        db.query(Prediction).first()
+        during = pool_stats()
+    assert during["checked_out"] >= 1
+    stats = pool_stats()
+    for key in ("pool_size", "checked_in", "overflow", "max_connections", "connects", "checkouts",
+                "invalidations", "checkout_wait_p95_ms"):
+        assert key in stats
+    assert stats["checkouts"] >= 1
+
+def test_create_tables_stamps_migrations_only_on_a_fresh_schema(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from src import database, migrations
+
+    calls = []
+    monkeypatch.setattr(database, "engine", create_engine(f"sqlite:///{tmp_path / 'fresh.db'}"))
+    monkeypatch.setattr(migrations, "stamp_migrations", lambda engine: calls.append("stamp"))
+    monkeypatch.setattr(migrations, "run_migrations", lambda engine: calls.append("run"))
+
+    database.create_tables()
+    database.create_tables()
+    # Yeni şemada migration DDL'i çalıştırılmaz; mevcut şemada eksikler uygulanır
+    assert calls == ["stamp", "run"]
@@ -0,0 +1,24 @@
+from datetime import date, datetime, timezone
+
+from src.core_logic import _parse_document_file, _parse_publication_date
+
+def test_publication_dates_become_timezone_aware_datetimes():
+    utc = timezone.utc
+    assert _parse_publication_date("2025-07-21") == datetime(2025, 7, 21, tzinfo=utc)
+    assert _parse_publication_date("2025-07-21T10:30:00Z") == datetime(2025, 7, 21, 10, 30, tzinfo=utc)
+    assert _parse_publication_date(date(2025, 7, 21)) == datetime(2025, 7, 21, tzinfo=utc)
+    assert _parse_publication_date(None) is None
+    assert _parse_publication_date("yesterday") is None
+
+def test_parse_document_file(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text(
+        "---\nurl: https://example.com/a\npub_date: '2025-07-22'\nsummary: Kısa özet\nkeywords: [enflasyon]\n"
+        "entities:\n  - value: TCMB\n---\n# Başlık\n\nİlk paragraf.\n", encoding="utf-8")
+
+    parsed = _parse_document_file(str(path))
+
+    assert parsed["source_url"] == "https://example.com/a"
+    assert parsed["publication_date"] == datetime(2025, 7, 22, tzinfo=timezone.utc)
+    assert sorted(parsed["keywords"]) == ["TCMB", "enflasyon"]
+    assert parsed["chunks"][0]["heading"] == "Başlık"
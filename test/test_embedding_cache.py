@@ -0,0 +1,64 @@
+import multiprocessing
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache
+
+MODEL = "test-model"
+
+def _vector(i: int, dim: int = 8) -> np.ndarray:
+    return np.full(dim, float(i), dtype=np.float32)
+
+def _write_range(cache_dir: str, start: int, count: int):
+    cache = EmbeddingCache(MODEL, cache_dir=cache_dir)
+    for i in range(start, start + count):
+        cache.put_many([f"text-{i}"], np.stack([_vector(i)]))
+
+def test_memory_and_disk_round_trip(tmp_path):
+    cache = EmbeddingCache(MODEL, cache_dir=str(tmp_path))
+    assert cache.get_many(["a", "b"]) == [None, None]
+    cache.put_many(["a", "b"], np.stack([_vector(1), _vector(2)]))
+
+    reloaded = EmbeddingCache(MODEL, cache_dir=str(tmp_path))
+    a, b, c = reloaded.get_many(["a", "b", "c"])
+    np.testing.assert_array_equal(a, _vector(1))
+    np.testing.assert_array_equal(b, _vector(2))
+    assert c is None
+    assert reloaded.stats()["disk_hits"] == 2
+
+def test_other_model_ignores_disk_tier(tmp_path):
+    EmbeddingCache(MODEL, cache_dir=str(tmp_path)).put_many(["a"], np.stack([_vector(1)]))
+    other = EmbeddingCache("other-model", cache_dir=str(tmp_path))
+    assert other.get_many(["a"]) == [None]
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = EmbeddingCache(MODEL, cache_dir=None, max_memory_items=2)
+    cache.put_many(["a", "b", "c"], np.stack([_vector(1), _vector(2), _vector(3)]))
+    assert cache.get_many(["a"]) == [None]
+    assert cache.stats()["memory_items"] == 2
+
+def test_rows_written_by_another_instance_are_loaded(tmp_path):
+    reader = EmbeddingCache(MODEL, cache_dir=str(tmp_path))
+    writer = EmbeddingCache(MODEL, cache_dir=str(tmp_path))
+    writer.put_many(["shared"], np.stack([_vector(7)]))
+
+    vector, = reader.get_many(["shared"])
+    np.testing.assert_array_equal(vector, _vector(7))
+
+def test_concurrent_processes_do_not_share_rows(tmp_path):
+    cache_dir = str(tmp_path)
+    # İlk satır meta.json'ı oluşturur; sonrasında süreçler aynı anda ekler
+    _write_range(cache_dir, 0, 1)
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_write_range, args=(cache_dir, 1 + w * 50, 50)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache(MODEL, cache_dir=cache_dir)
+    texts = [f"text-{i}" for i in range(201)]
+    for i, vector in enumerate(cache.get_many(texts)):
+        np.testing.assert_array_equal(vector, _vector(i))
+    assert cache.stats()["disk_items"] == 201
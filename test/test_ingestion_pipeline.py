@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+
+from src.database import Document, create_tables, session_scope
+from src.ingestion_pipeline import IngestionPipeline, KeyedSerialExecutor
+from src.vector_store import vector_store
+
+DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents")
+
+def test_keyed_executor_serialises_per_key_and_parallelises_across_keys():
+    executor = KeyedSerialExecutor(max_workers=4)
+    order, active, overlap = [], {}, []
+    lock = threading.Lock()
+
+    def work(key, item):
+        with lock:
+            if active.get(key):
+                overlap.append(key)
+            active[key] = True
+            running = sum(active.values())
+        time.sleep(0.01)
+        with lock:
+            order.append((key, item))
+            active[key] = False
+        return running
+
+    futures = [executor.submit(key, work, key, item) for item in range(5) for key in ("a", "b")]
+    executor.join()
+
+    assert overlap == []
+    assert [item for key, item in order if key == "a"] == list(range(5))
+    assert [item for key, item in order if key == "b"] == list(range(5))
+    assert max(future.result() for future in futures) == 2
+
+def test_pipeline_stores_documents_once():
+    vector_store.reset()
+    create_tables()
+    paths = sorted(os.path.join(DOCUMENTS_DIR, name) for name in os.listdir(DOCUMENTS_DIR))[:3]
+
+    stats = IngestionPipeline(workers=2, batch_size=2, report_interval=60).run(paths + paths[:1])
+
+    assert stats["stored"] == 3
+    assert stats["skipped"] == 1
+    assert stats["failed"] == 0
+    with session_scope() as db:
+        assert db.query(Document).count() == 3
+    vector_store.reset()
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from src.llm_cache import LLMResponseCache
+
+RESPONSE_FORMAT = {"type": "json_object"}
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(f"sqlite:///{tmp_path / 'llm_cache.db'}", ttl_seconds=3600, max_entries=3)
+
+def test_round_trip_and_stats(cache):
+    assert cache.get("m", "prompt", RESPONSE_FORMAT) is None
+    cache.put("m", "prompt", RESPONSE_FORMAT, '{"a": 1}', prompt_tokens=10, completion_tokens=5, latency_seconds=1.5)
+
+    assert cache.get("m", "prompt", RESPONSE_FORMAT) == '{"a": 1}'
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["saved_prompt_tokens"] + stats["saved_completion_tokens"] == 15
+    assert stats["saved_latency_seconds"] == 1.5
+
+def test_key_covers_model_prompt_and_response_format(cache):
+    cache.put("m", "prompt", RESPONSE_FORMAT, "json")
+    assert cache.get("m", "prompt", None) is None
+    assert cache.get("other", "prompt", RESPONSE_FORMAT) is None
+    assert cache.get("m", "prompt ", RESPONSE_FORMAT) is None
+    assert cache.make_key("m", "p", {"a": 1, "b": 2}) == cache.make_key("m", "p", {"b": 2, "a": 1})
+
+def test_expired_entries_are_misses(cache):
+    cache.put("m", "prompt", RESPONSE_FORMAT, "old")
+    cache.ttl_seconds = -1
+    assert cache.get("m", "prompt", RESPONSE_FORMAT) is None
+    # Süresi dolan kayıt okunurken silinir
+    cache.ttl_seconds = 3600
+    assert cache.get("m", "prompt", RESPONSE_FORMAT) is None
+
+def test_evict_removes_least_recently_used(cache):
+    for i in range(5):
+        cache.put("m", f"prompt {i}", RESPONSE_FORMAT, str(i))
+        time.sleep(0.01)
+    # İlk kayıt yeniden kullanıldığı için tutulur
+    assert cache.get("m", "prompt 0", RESPONSE_FORMAT) == "0"
+
+    assert cache.evict() == 2
+    kept = [i for i in range(5) if cache.get("m", f"prompt {i}", RESPONSE_FORMAT) is not None]
+    assert kept == [0, 3, 4]
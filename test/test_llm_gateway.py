@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm_gateway import AsyncLLMGateway
+
+class FakeCompletions:
+    """Yanıtı istemde geçen gecikmeye göre geciktiren, eşzamanlı çağrı sayısını ölçen sahte istemci."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    async def create(self, model, messages, response_format):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            prompt = messages[0]["content"]
+            await asyncio.sleep(float(prompt.split("delay=")[1].split()[0]) if "delay=" in prompt else 0.01)
+            content = json.dumps({"echo": prompt})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+@pytest.fixture
+def gateway():
+    gateway = AsyncLLMGateway(max_concurrency=2, cache=None)
+    completions = FakeCompletions()
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return gateway, completions
+
+def test_run_concurrently_keeps_input_order_and_respects_limit(gateway):
+    gateway, completions = gateway
+    delays = [0.08, 0.01, 0.05, 0.02, 0.03]
+    results = gateway.run_concurrently(gateway._chat_json("m", f"delay={d} #{i}", stage="test") for i, d in enumerate(delays))
+
+    assert [r["echo"] for r in results] == [f"delay={d} #{i}" for i, d in enumerate(delays)]
+    assert completions.max_active == 2
+    assert gateway.run_concurrently([]) == []
+
+def test_run_as_completed_yields_in_completion_order(gateway):
+    gateway, _ = gateway
+    gateway.max_concurrency = 3
+    gateway._semaphore = asyncio.Semaphore(3)
+    delays = [0.15, 0.01, 0.08]
+    order = [index for index, _ in gateway.run_as_completed(gateway._chat_json("m", f"delay={d}", stage="test") for d in delays)]
+    assert order == [1, 2, 0]
+
+def test_run_as_completed_cancels_remaining_calls_when_closed_early(gateway):
+    gateway, completions = gateway
+    calls = gateway.run_as_completed(gateway._chat_json("m", f"delay={d}", stage="test") for d in [0.01, 0.5, 0.5])
+    assert next(calls)[0] == 0
+    calls.close()
+    deadline = time.monotonic() + 1.0
+    while completions.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert completions.active == 0
+
+def test_translate_values_marks_missing_keys_as_failed(gateway, monkeypatch):
+    gateway, _ = gateway
+
+    async def translate_value(value, target_language_code, source_language_code="en"):
+        return {"a": {"text": "bir"}}
+
+    monkeypatch.setattr(gateway, "translate_value", translate_value)
+    result = gateway.run(gateway.translate_values({"a": {"text": "one"}, "b": {"text": "two"}, "n": 3}, "tr"))
+
+    assert result["a"] == {"text": "bir"}
+    assert result["b"]["error"] == "translation_failed"
+    # dict/list olmayan değerler çevrilmeden döner
+    assert result["n"] == 3
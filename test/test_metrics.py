@@ -0,0 +1,31 @@
+import pytest
+
+from src.metrics import StageTimer
+
+def test_summary_reports_nearest_rank_percentiles():
+    timer = StageTimer()
+    for ms in range(1, 101):
+        timer.record("stage", ms / 1000)
+
+    summary = timer.summary()["stage"]
+    assert summary["count"] == 100
+    assert summary["mean"] == pytest.approx(0.0505)
+    assert (summary["p50"], summary["p95"], summary["p99"]) == (0.05, 0.095, 0.099)
+    assert "stage" in timer.format_summary()
+
+def test_samples_are_bounded_and_decorator_records_failures():
+    timer = StageTimer(max_samples=3)
+
+    @timer.timed("work")
+    def work(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+
+    for _ in range(4):
+        work()
+    with pytest.raises(RuntimeError):
+        work(fail=True)
+
+    assert timer.summary()["work"]["count"] == 3
+    timer.reset()
+    assert timer.summary() == {}
@@ -0,0 +1,63 @@
+import uuid
+
+import pytest
+
+from src import core_logic
+from src.database import Prediction, TemplatePredictionsLink, UserQuery, create_tables, session_scope
+
+TASK = {"prompt": "Provide the current population of Ankara (fast path test).", "keywords": ["Ankara", "population"]}
+TR_PLAN = [
+    {"type": "paragraph", "content": "Ankara'nın güncel nüfusu:"},
+    {"type": "list", "placeholder": "nufus", "item_template": "- {yil}: {nufus}"},
+]
+
+@pytest.fixture
+def db():
+    create_tables()
+    with session_scope() as db:
+        yield db
+
+@pytest.fixture
+def answered(db):
+    """Ankara nüfusunu tek prediction ile Türkçe cevaplamış önceki bir sorgu."""
+    prediction = Prediction(prediction_prompt=f"{TASK['prompt']} #{uuid.uuid4().hex}", base_language_code="en")
+    previous = UserQuery(query_text="Ankara'nın nüfusu kaç?", language="tr", answer_template_text=TR_PLAN)
+    db.add_all([prediction, previous])
+    db.flush()
+    db.add(TemplatePredictionsLink(query_id=previous.id, prediction_id=prediction.id, placeholder_name="nufus"))
+    db.commit()
+    return prediction
+
+def _plan(db, language, tasks=(TASK,), candidates=None):
+    query = UserQuery(query_text="Ankara nüfusu nedir?", language=language)
+    db.add(query)
+    db.flush()
+    return core_logic._build_default_plan(db, query, list(tasks), candidates, language)
+
+def test_reuses_stored_plan_for_single_candidate_in_same_language(db, answered):
+    plan = _plan(db, "tr", candidates={TASK["prompt"]: [{"id": answered.id, "prompt": TASK["prompt"]}]})
+
+    assert plan == {"render_plan": TR_PLAN,
+                    "predictions": [{"placeholder_name": "nufus", "reuse_prediction_id": answered.id}]}
+
+def test_other_languages_go_to_the_llm(db, answered):
+    assert _plan(db, "de", candidates={TASK["prompt"]: [{"id": answered.id, "prompt": TASK["prompt"]}]}) is None
+
+def test_new_multi_task_and_ambiguous_queries_go_to_the_llm(db, answered):
+    candidate = {"id": answered.id, "prompt": TASK["prompt"]}
+    other = {"prompt": "Provide the area of Ankara (fast path test).", "keywords": ["Ankara"]}
+
+    assert _plan(db, "tr", candidates={}) is None
+    assert _plan(db, "tr", tasks=(TASK, other), candidates={TASK["prompt"]: [candidate]}) is None
+    assert _plan(db, "tr", candidates={TASK["prompt"]: [candidate, {"id": 999, "prompt": "x"}]}) is None
+
+def test_plans_shared_with_other_predictions_are_not_reused(db, answered):
+    shared = UserQuery(query_text="Ankara nüfusu ve yüzölçümü?", language="en", answer_template_text=TR_PLAN)
+    other = Prediction(prediction_prompt=f"Provide the area of Ankara #{uuid.uuid4().hex}", base_language_code="en")
+    db.add_all([shared, other])
+    db.flush()
+    db.add_all([TemplatePredictionsLink(query_id=shared.id, prediction_id=answered.id, placeholder_name="nufus"),
+                TemplatePredictionsLink(query_id=shared.id, prediction_id=other.id, placeholder_name="alan")])
+    db.commit()
+
+    assert _plan(db, "en", candidates={TASK["prompt"]: [{"id": answered.id, "prompt": TASK["prompt"]}]}) is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.prediction_index import PredictionIndex
+
+def _unit(*values) -> list[float]:
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+@pytest.fixture
+def index():
+    index = PredictionIndex(initial_capacity=2)
+    index.add(
+        ["p1_prompt", "p1_kw", "p2_prompt", "p3_kw"],
+        [1, 1, 2, 3],
+        ["prompt_text", "keyword", "prompt_text", "keyword"],
+        ["prompt one", "kw one", "prompt two", "kw three"],
+        [[1, 0, 0], [0, 1, 0], [0.8, 0.6, 0], [0, 0, 2]],
+    )
+    return index
+
+def test_add_grows_and_upserts_existing_ids(index):
+    assert len(index) == 4
+    index.add(["p1_kw"], [1], ["keyword"], ["kw one (updated)"], [[0, 0, 1]])
+    assert len(index) == 4
+    np.testing.assert_allclose(index.get_vectors([1])[1]["keyword"], [[0, 0, 1]])
+
+def test_add_rejects_other_dimensions(index):
+    with pytest.raises(ValueError):
+        index.add(["x"], [4], ["keyword"], ["x"], [[1, 0]])
+
+def test_search_returns_sorted_l2_scaled_distances(index):
+    rows, distances, prediction_ids, types = index.search([[1, 0, 0], [0, 0, 1]], top_k=2)
+
+    assert rows.tolist() == [0, 0, 1, 1]
+    assert prediction_ids[:2].tolist() == [1, 2]
+    assert types[:2].tolist() == ["prompt_text", "prompt_text"]
+    # Normalize vektörlerde mesafe = 2 - 2 * kosinüs
+    np.testing.assert_allclose(distances[:2], [0.0, 2 - 2 * 0.8], atol=1e-6)
+    assert prediction_ids[2] == 3 and distances[2] == pytest.approx(0.0, abs=1e-6)
+
+def test_search_filters_by_type_and_status(index):
+    _, _, prediction_ids, _ = index.search([_unit(1, 1, 1)], top_k=10, types=["keyword"])
+    assert sorted(prediction_ids.tolist()) == [1, 3]
+
+    index.set_status([3], "INACTIVE")
+    _, _, prediction_ids, _ = index.search([_unit(1, 1, 1)], top_k=10, types=["keyword"], statuses=["FULFILLED"])
+    assert prediction_ids.tolist() == [1]
+
+def test_get_vectors_groups_by_prediction(index):
+    vectors = index.get_vectors([1, 2, 99])
+    assert set(vectors) == {1, 2}
+    np.testing.assert_allclose(vectors[1]["prompt_text"], [1, 0, 0])
+    assert vectors[1]["keyword"].shape == (1, 3)
+    assert vectors[2]["keyword"].shape == (0, 3)
+
+def test_clear_and_empty_index():
+    index = PredictionIndex()
+    assert index.get_vectors([1]) == {}
+    rows, distances, _, _ = index.search([[1, 0, 0]], top_k=5)
+    assert len(rows) == len(distances) == 0
+
+    index.add(["a"], [1], ["keyword"], ["a"], [[1, 0, 0]])
+    index.clear()
+    assert len(index) == 0
+    assert index.get_vectors([1]) == {}
@@ -0,0 +1,24 @@
+import numpy as np
+
+from src.processing import (calculate_keyword_set_similarity, encode_normalized, keyword_set_scores,
+                            normalize_rows)
+
+def test_normalize_rows_keeps_zero_vectors():
+    rows = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    np.testing.assert_allclose(rows, [[0.6, 0.8], [0.0, 0.0]])
+
+def test_keyword_set_scores_matches_pairwise_similarity():
+    reference = ["inflation", "interest rate", "central bank"]
+    keyword_sets = [["inflation", "prices"], ["football"], ["central bank", "interest rate", "bonds"]]
+
+    flat = [kw for keywords in keyword_sets for kw in keywords]
+    owners = np.repeat(np.arange(len(keyword_sets)), [len(keywords) for keywords in keyword_sets])
+    scores = keyword_set_scores(encode_normalized(flat), owners, len(keyword_sets), encode_normalized(reference))
+
+    expected = [calculate_keyword_set_similarity(keywords, reference) for keywords in keyword_sets]
+    np.testing.assert_allclose(scores, expected, atol=1e-5)
+    assert scores[0] > 0 and scores[1] == 0
+
+def test_keyword_set_scores_handles_empty_inputs():
+    empty = np.zeros((0, 64), dtype=np.float32)
+    assert keyword_set_scores(empty, np.zeros(0, dtype=np.int64), 2, encode_normalized(["a"])).tolist() == [0.0, 0.0]
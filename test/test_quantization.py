@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src import quantization
+
+@pytest.fixture
+def vectors():
+    return quantization.normalize(np.random.default_rng(0).standard_normal((20, 32)))
+
+def test_int8_round_trip_error_is_bounded(vectors):
+    codes, scales = quantization.quantize(vectors, "int8")
+    assert codes.dtype == np.int8
+    # Yuvarlama hatası en fazla yarım adımdır
+    error = np.abs(quantization.dequantize(codes, scales) - vectors)
+    assert np.all(error <= scales[:, None] / 2 + 1e-7)
+
+def test_quantized_scores_match_dequantized_dot_products(vectors):
+    codes, scales = quantization.quantize(vectors, "int8")
+    queries = vectors[:3]
+    np.testing.assert_allclose(quantization.quantized_scores(queries, codes, scales),
+                               queries @ quantization.dequantize(codes, scales).T, rtol=1e-5, atol=1e-6)
+    # Yaklaşık skorlar tam hassasiyetli sıralamayı korur
+    assert np.argmax(quantization.quantized_scores(queries, codes, scales), axis=1).tolist() == [0, 1, 2]
+
+def test_float_precisions_and_zero_vectors(vectors):
+    codes, scales = quantization.quantize(vectors, "float16")
+    assert codes.dtype == np.float16 and np.all(scales == 1)
+    np.testing.assert_allclose(quantization.dequantize(codes, scales), vectors, atol=1e-3)
+
+    codes, scales = quantization.quantize(np.zeros((1, 4)), "int8")
+    assert np.all(codes == 0) and scales.tolist() == [1.0]
+
+def test_unknown_precision_is_rejected(vectors):
+    with pytest.raises(ValueError):
+        quantization.quantize(vectors, "int4")
+
+def test_truncate_renormalizes_prefix(vectors):
+    truncated = quantization.truncate(vectors, 8)
+    assert truncated.shape == (20, 8)
+    np.testing.assert_allclose(np.linalg.norm(truncated, axis=1), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(truncated, quantization.normalize(vectors[:, :8]), rtol=1e-6)
+    assert quantization.truncate(vectors, None).shape == (20, 32)
+    assert quantization.truncate(vectors[0], 64).shape == (1, 32)
+
+def test_bytes_per_vector():
+    assert quantization.bytes_per_vector(1024, "float32") == 4096
+    assert quantization.bytes_per_vector(1024, "float16") == 2048
+    assert quantization.bytes_per_vector(1024, "int8") == 1028
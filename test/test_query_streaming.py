@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from src import core_logic
+
+def _fake_stream(threads, closed):
+    def stream_new_query(query_text):
+        try:
+            for index in range(3):
+                threads.append(threading.get_ident())
+                yield {"type": "placeholder", "index": index, "query_text": query_text}
+            threads.append(threading.get_ident())
+            yield {"type": "final", "final_answer": "done"}
+        finally:
+            closed.set()
+    return stream_new_query
+
+async def _collect(limit=None):
+    events = []
+    async for event in core_logic.astream_new_query("soru"):
+        events.append(event)
+        if limit is not None and len(events) == limit:
+            break
+    return events
+
+def test_async_stream_runs_the_generator_on_one_thread(monkeypatch):
+    threads, closed = [], threading.Event()
+    monkeypatch.setattr(core_logic, "stream_new_query", _fake_stream(threads, closed))
+
+    events = asyncio.run(_collect())
+
+    assert [event["type"] for event in events] == ["placeholder"] * 3 + ["final"]
+    assert len(set(threads)) == 1
+    assert threads[0] != threading.get_ident()
+    assert closed.wait(5)
+
+def test_async_stream_stops_the_generator_when_the_consumer_leaves(monkeypatch):
+    threads, closed = [], threading.Event()
+    monkeypatch.setattr(core_logic, "stream_new_query", _fake_stream(threads, closed))
+
+    events = asyncio.run(_collect(limit=1))
+
+    assert len(events) == 1
+    assert closed.wait(5)
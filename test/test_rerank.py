@@ -0,0 +1,30 @@
+from src import core_logic
+from src.database import Prediction, create_tables, session_scope
+from src.processing import create_embeddings
+from src.vector_store import vector_store
+
+def test_rerank_keeps_only_candidates_that_can_pass_the_cut_off():
+    vector_store.reset()
+    create_tables()
+    entries = {
+        "summary": ("Central bank raises the policy interest rate to fight inflation", ["interest rate", "inflation"]),
+        "keyword": ("What is the latest consumer price index?", ["inflation", "consumer prices"]),
+        "unrelated": ("Football league champions list", ["football", "league"]),
+    }
+    with session_scope() as db:
+        rows = {name: Prediction(prediction_prompt=f"{prompt} (rerank test)", keywords=kws) for name, (prompt, kws) in entries.items()}
+        db.add_all(rows.values())
+        db.commit()
+        metas = []
+        for name, (prompt, kws) in entries.items():
+            metas.append((rows[name].id, "prompt_text", prompt))
+            metas.extend((rows[name].id, "keyword", kw) for kw in kws)
+        vector_store.add_prediction_metas(metas, create_embeddings([value for _, _, value in metas]))
+
+        ranked = core_logic._find_and_rerank_relevant_predictions(
+            db, "The central bank raised the interest rate as inflation climbed", ["inflation", "central bank"])
+
+    assert ranked[0] == rows["summary"].id
+    assert rows["keyword"].id in ranked
+    assert rows["unrelated"].id not in ranked
+    vector_store.reset()
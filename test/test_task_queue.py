@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from src import core_logic
+from src.answer_events import answer_events
+from src.answer_monitor import answer_monitor
+from src.database import UserQuery, create_tables, session_scope
+from src.task_queue import LocalTaskQueue
+
+def test_local_task_queue_runs_tasks_in_background():
+    queue = LocalTaskQueue(workers=2)
+    release = threading.Event()
+
+    @queue.task
+    def add(a, b):
+        release.wait(5)
+        return a + b
+
+    futures = [add.delay(i, 1) for i in range(3)]
+    assert queue.pending_count() == 3
+    release.set()
+    assert add(2, 2) == 4
+    queue.join()
+    assert [future.result() for future in futures] == [1, 2, 3]
+    assert queue.pending_count() == 0
+    assert add.name == "proactive_rag.add"
+
+def test_local_task_queue_propagates_failures():
+    queue = LocalTaskQueue(workers=1)
+
+    @queue.task
+    def fail():
+        raise RuntimeError("boom")
+
+    future = fail.delay()
+    queue.join()
+    with pytest.raises(RuntimeError):
+        future.result()
+
+def test_failed_query_processing_is_recorded(monkeypatch):
+    create_tables()
+
+    def decompose(query_text):
+        raise RuntimeError("analyst unavailable")
+
+    monkeypatch.setattr(core_logic.llm_gateway, "decompose_query_into_tasks", decompose)
+    with answer_events.subscribe() as subscription:
+        query_id = core_logic.handle_new_query("Nüfus kaç?", wait=False)
+        core_logic.task_queue.join()
+        events = subscription.drain()
+
+    answer = answer_monitor.get_answers([query_id])[query_id]
+    assert answer["status"] == "failed"
+    assert "analyst unavailable" in answer["error"]
+    assert {"type": "query_failed", "query_id": query_id, "error": answer["error"]} in events
+
+    # Metin değiştirilip yeniden işlenirken hata temizlenir ve sorgu tekrar 'pending' olur
+    monkeypatch.setattr(core_logic, "_run_query_processing", lambda query_id, wait: query_id)
+    core_logic.update_query_text(query_id, "Ankara'nın nüfusu kaç?")
+    assert answer_monitor.get_answers([query_id])[query_id]["status"] == "pending"
+    with session_scope() as db:
+        assert db.get(UserQuery, query_id).processing_error is None
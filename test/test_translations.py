@@ -0,0 +1,47 @@
+import pytest
+
+from src import core_logic
+from src.database import Prediction, TemplatePredictionsLink, UserQuery, create_tables, session_scope
+
+@pytest.fixture
+def translation_calls(monkeypatch):
+    calls = []
+
+    async def translate_values(values, target_language_code, source_language_code="en"):
+        calls.append((source_language_code, target_language_code, sorted(values)))
+        return {key: {k: f"{v} [{target_language_code}]" for k, v in value.items()} for key, value in values.items()}
+
+    monkeypatch.setattr(core_logic.async_llm_gateway, "translate_values", translate_values)
+    return calls
+
+def _create_query(db, language: str, prompts: list[str]) -> int:
+    user_query = UserQuery(query_text="Nüfus nedir?", language=language)
+    db.add(user_query)
+    for i, prompt in enumerate(prompts):
+        prediction = Prediction(prediction_prompt=prompt, base_language_code="en",
+                                predicted_value={"is_translatable": True, "content": {"en": {"text": f"value {i}"}}})
+        db.add(prediction)
+        db.add(TemplatePredictionsLink(user_query=user_query, prediction=prediction, placeholder_name=f"p{i}"))
+    db.commit()
+    return user_query.id
+
+def test_batched_translations_are_persisted(translation_calls):
+    create_tables()
+    with session_scope() as db:
+        query_id = _create_query(db, "tr", ["Population of Izmir (translations test)?", "Area of Izmir (translations test)?"])
+
+    with session_scope() as db:
+        core_logic._ensure_translations(db, [db.get(UserQuery, query_id)])
+
+    # İki değer tek bir (en -> tr) çağrısında çevrilir
+    assert len(translation_calls) == 1
+    assert translation_calls[0][:2] == ("en", "tr")
+    with session_scope() as db:
+        for link in db.get(UserQuery, query_id).predictions:
+            content = link.prediction.predicted_value["content"]
+            assert content["tr"] == {"text": f"{content['en']['text']} [tr]"}
+
+    # Kaydedilen çeviri tekrar kullanılır; yeni LLM çağrısı yapılmaz
+    with session_scope() as db:
+        core_logic._ensure_translations(db, [db.get(UserQuery, query_id)])
+    assert len(translation_calls) == 1
@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+
+from src.processing import create_embeddings
+from src.vector_store import vector_store
+
+@pytest.fixture
+def store():
+    vector_store.reset()
+    yield vector_store
+    vector_store.reset()
+
+def _add_predictions(store, entries):
+    store.add_prediction_metas(entries, create_embeddings([value for _, _, value in entries]))
+
+def test_get_prediction_embeddings_groups_stored_vectors(store):
+    _add_predictions(store, [
+        (1, "prompt_text", "What is the capital of France?"),
+        (1, "keyword", "capital"),
+        (1, "keyword", "France"),
+        (2, "keyword", "population"),
+    ])
+
+    vectors = store.get_prediction_embeddings([1, 2, 3])
+
+    assert set(vectors) == {1, 2}
+    assert vectors[1]["keyword"].shape == (2, 64)
+    np.testing.assert_allclose(vectors[1]["prompt_text"], create_embeddings(["What is the capital of France?"])[0], rtol=1e-6)
+    assert "prompt_text" not in vectors[2]
+
+def test_get_prediction_embeddings_without_matches(store):
+    assert store.get_prediction_embeddings([42]) == {}
+    assert store.get_prediction_embeddings([]) == {}
+
+def test_search_result_within_keeps_candidates_close_to_any_query_vector():
+    from src.vector_store import PredictionSearchResult
+
+    search = PredictionSearchResult(
+        np.array([1, 2, 3]),
+        np.array([[0.2, np.inf], [1.5, 0.4], [1.5, 0.9]], dtype=np.float32),
+        np.array([1, 2, 2]), np.array([0, 1, 1]),
+    )
+    kept = search.within(np.array([1.0, 0.6], dtype=np.float32))
+    assert kept.prediction_ids.tolist() == [1, 2]
+    assert kept.hit_counts.tolist() == [1, 2]
+
+def test_find_candidate_predictions_prunes_by_distance(store):
+    from src.database import Prediction, create_tables, session_scope
+
+    create_tables()
+    prompts = {"close": "inflation rate of turkey in march", "far": "football league standings table"}
+    with session_scope() as db:
+        rows = {name: Prediction(prediction_prompt=f"{prompt} (vector store test)") for name, prompt in prompts.items()}
+        db.add_all(rows.values())
+        db.commit()
+        _add_predictions(store, [(rows[name].id, "prompt_text", prompt) for name, prompt in prompts.items()])
+
+        unpruned = store.find_candidate_predictions(db, "turkey inflation rate", [], top_k=10)
+        pruned = store.find_candidate_predictions(db, "turkey inflation rate", [], top_k=10, max_text_distance=1.0)
+
+    assert {pred.id for pred in unpruned} == {rows["close"].id, rows["far"].id}
+    assert [pred.id for pred in pruned] == [rows["close"].id]
+
+def test_batched_writes_skip_duplicate_ids_within_a_batch(store):
+    _add_predictions(store, [
+        (5, "keyword", "inflation"),
+        (5, "keyword", "inflation"),
+        (5, "keyword", "turkey"),
+    ])
+    assert store.prediction_collection.count() == 2
+
+    # Aynı kayıtları tekrar yazmak kopya oluşturmaz
+    _add_predictions(store, [(5, "keyword", "inflation")])
+    assert store.prediction_collection.count() == 2
+
+def test_batched_writes_reject_mismatched_embeddings(store):
+    with pytest.raises(ValueError):
+        store.add_document_metas([(1, "http://example.com", "summary", "text")], [])
+
+def test_meta_ids_are_derived_from_content():
+    from src.vector_store import document_meta_id, prediction_meta_id
+
+    assert prediction_meta_id(1, "keyword", "inflation") == prediction_meta_id(1, "keyword", "inflation")
+    assert prediction_meta_id(1, "keyword", "inflation") != prediction_meta_id(1, "keyword", "turkey")
+    assert prediction_meta_id(1, "keyword", "inflation") != prediction_meta_id(2, "keyword", "inflation")
+    assert document_meta_id(1, "summary", "text").startswith("doc_1_summary_")
+
+def test_compact_duplicates_keeps_one_canonical_vector_per_value(store):
+    from src.vector_store import PREDICTIONS, prediction_meta_id
+
+    values = ["inflation", "inflation", "turkey", "capital"]
+    embeddings = create_embeddings(values)
+    # Eski sürümlerin hash() tabanlı ID'leri; "capital" zaten kanonik ID ile yazılmış
+    legacy_ids = ["pred_9_keyword_111", "pred_9_keyword_222", "pred_9_keyword_333", prediction_meta_id(9, "keyword", "capital")]
+    store._upsert(PREDICTIONS, legacy_ids, embeddings, [{"type": "keyword", "text": v, "prediction_id": 9} for v in values])
+
+    assert store.compact_duplicates(dry_run=True)[PREDICTIONS] == {"total": 4, "unique": 3, "migrated": 2, "deleted": 3}
+    assert store.prediction_collection.count() == 4
+
+    store.compact_duplicates()
+    stored = store.prediction_collection.get(include=["metadatas"])
+    assert sorted(stored["ids"]) == sorted(prediction_meta_id(9, "keyword", v) for v in ["inflation", "turkey", "capital"])
+    assert store.get_prediction_embeddings([9])[9]["keyword"].shape == (3, 64)
+
+@pytest.mark.parametrize("fusion", ["rrf", "weighted"])
+def test_fused_scores_count_each_owner_once_per_query_vector(fusion, monkeypatch):
+    from src import config
+    from src.vector_store import _fused_scores
+
+    monkeypatch.setattr(config, "DOCUMENT_SEARCH_TEXT_WEIGHT", 2.0)
+    monkeypatch.setattr(config, "DOCUMENT_SEARCH_RRF_K", 60.0)
+    # Satır 0 (metin): sahip 0 iki kez isabet eder, yalnızca en iyisi (sıra 0) sayılır
+    rows = np.array([0, 0, 0, 1, 1])
+    owners = np.array([0, 0, 1, 1, 0])
+    distances = np.array([0.1, 0.2, 0.3, 0.4, 0.5])
+
+    scores = _fused_scores(rows, distances, owners, 2, text_row=0, fusion=fusion)
+
+    if fusion == "rrf":
+        expected = [2.0 / 61 + 1.0 / 62, 2.0 / 63 + 1.0 / 61]
+    else:
+        expected = [2.0 / 1.1 + 1.0 / 1.5, 2.0 / 1.3 + 1.0 / 1.4]
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
+
+@pytest.fixture
+def truncated_store(store, monkeypatch):
+    from src.database import create_tables
+
+    create_tables()
+    monkeypatch.setattr(store, "document_dim", 16)
+    return store
+
+def test_compressed_search_rescores_with_stored_full_vectors(truncated_store):
+    from src.database import DocumentFullVector, session_scope
+
+    summaries = ["inflation in turkey rose in march", "football league results of the weekend"]
+    truncated_store.add_document_metas([(i, f"http://example.com/{i}", "summary", text) for i, text in enumerate(summaries)],
+                                       create_embeddings(summaries))
+    with session_scope() as db:
+        assert db.query(DocumentFullVector).count() == 2
+
+    hits = truncated_store.query_document_metas("turkey inflation march", [], n_results=2)
+    query, best = create_embeddings(["turkey inflation march", summaries[0]])
+    assert hits[0]["document_id"] == 0
+    assert hits[0]["distance"] == pytest.approx(2 - 2 * float(np.dot(query, best)), abs=1e-5)
+
+def test_rescoring_without_full_vectors_does_not_reencode(truncated_store, monkeypatch):
+    from src import processing
+    from src.database import DocumentFullVector, session_scope
+
+    summaries = ["inflation in turkey rose in march"]
+    truncated_store.add_document_metas([(0, "http://example.com/0", "summary", summaries[0])], create_embeddings(summaries))
+    with session_scope() as db:
+        db.query(DocumentFullVector).delete()
+        db.commit()
+    # Sorgu vektörü önbelleğe alınır; aramada yalnızca aday parçalar encode edilebilirdi
+    create_embeddings(["turkey inflation"])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("candidate passages must not be re-encoded")
+
+    monkeypatch.setattr(processing.embedding_model, "encode", fail)
+    hits = truncated_store.query_document_metas("turkey inflation", [], n_results=1)
+    assert [hit["document_id"] for hit in hits] == [0]
+    # Kopya yoksa sıkıştırılmış (kesilmiş) mesafe kullanılır
+    assert np.isfinite(hits[0]["distance"])
+
+@pytest.mark.parametrize("precision", ["int8", "float16", "bfloat16"])
+def test_unsupported_document_precision_is_rejected(store, precision):
+    # Chroma yalnızca float32 saklar; sessizce başka bir hassasiyete düşülmez
+    with pytest.raises(ValueError):
+        store._resolve_document_precision(precision)
+    assert store._resolve_document_precision("float32") == "float32"